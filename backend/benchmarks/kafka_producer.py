@@ -0,0 +1,94 @@
+"""
+Benchmark of the Kafka send path of the API routes.
+
+Compares creating, starting and stopping an `AIOKafkaProducer` for every
+request (the previous behaviour of `/chat` and `/generate-room-suggestion`)
+against sending through the shared, long-lived producer, both sequentially
+and with concurrent requests. Needs a reachable broker at KAFKA_BROKER_URL.
+
+Run from the repository root:
+
+    PYTHONPATH=backend python backend/benchmarks/kafka_producer.py
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from aiokafka import AIOKafkaProducer
+
+from conf import settings
+from services.kafka_producer import KafkaProducerManager
+
+REQUESTS = 200
+CONCURRENCY = 20
+TOPIC = f"{settings.KAFKA_AGENT_TOPIC}.benchmark"
+
+
+def payload() -> bytes:
+    return json.dumps({
+        "uuid": str(uuid.uuid4()),
+        "room_id": "benchmark-room",
+        "messages": [{"sender": "user", "role": "user", "content": "Hola, ¿cómo estás?"}] * 20,
+    }).encode("utf-8")
+
+
+async def send_per_request() -> None:
+    producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BROKER_URL)
+    await producer.start()
+    try:
+        await producer.send_and_wait(TOPIC, payload())
+    finally:
+        await producer.stop()
+
+
+async def measure(send, requests: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def timed() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await send()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(timed() for _ in range(requests)))
+    return timings
+
+
+def row(name: str, timings: list, elapsed: float) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    return f"{name:<34}{statistics.median(ordered):>10.2f}{p95:>10.2f}{len(ordered) / elapsed:>12.1f}"
+
+
+async def main() -> None:
+    shared = KafkaProducerManager()
+    await shared.start()
+
+    async def send_shared() -> None:
+        await shared.send(TOPIC, payload())
+
+    print(f"{'send path':<34}{'p50 (ms)':>10}{'p95 (ms)':>10}{'req/s':>12}")
+    try:
+        for concurrency in (1, CONCURRENCY):
+            requests = REQUESTS if concurrency > 1 else REQUESTS // 4
+            for name, send in (("per-request producer", send_per_request), ("shared producer", send_shared)):
+                start = time.perf_counter()
+                timings = await measure(send, requests, concurrency)
+                elapsed = time.perf_counter() - start
+                print(row(f"{name} (concurrency {concurrency})", timings, elapsed))
+    finally:
+        await shared.stop()
+
+    print(
+        f"\nshared producer: linger_ms={settings.KAFKA_PRODUCER_LINGER_MS}, "
+        f"max_batch_size={settings.KAFKA_PRODUCER_MAX_BATCH_SIZE}, "
+        f"compression={settings.KAFKA_PRODUCER_COMPRESSION or 'none'}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
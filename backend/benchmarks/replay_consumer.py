@@ -0,0 +1,348 @@
+"""
+Offline replay of recorded Kafka payloads through the consumer pipeline.
+
+Feeds a JSONL file of payloads through `run_consumer_loop`, the same
+fetch/schedule/process/commit path the consumer runs in production, with:
+
+- an in-memory broker stand-in releasing messages at a configurable
+  arrival rate (constant or Poisson) over several partitions,
+- a local stub webhook server with configurable latency and failure rate,
+- fake workflows in place of the LLM-backed graphs, sleeping for a
+  lognormal latency around a median; `--llm module:factory` plugs in any
+  callable returning an object with `ainvoke` for a workflow name.
+
+Each line of the input is either a bare payload, sent to `--topic`, or an
+envelope ``{"topic": ..., "key": ..., "value": {...}}``. Concurrency is
+tuned through the usual settings (e.g. ``CONSUMER_CHAT_LANE_MAX_IN_FLIGHT``),
+so runs with different values can be compared on one machine.
+
+Run from the repository root:
+
+    PYTHONPATH=backend python backend/benchmarks/replay_consumer.py payloads.jsonl --rate 20
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import time
+import zlib
+from collections import deque, namedtuple
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from aiokafka import TopicPartition
+
+from conf import settings
+from services.agent.workflow_registry import WORKFLOW_BUILDERS, workflow_registry
+from services.kafka_producer import message_key
+from workers.agent_consumer import ConsumerContext, build_lanes, run_consumer_loop
+from workers.backpressure import PartitionPauser
+from workers.coalescer import BurstCoalescer
+from workers.idempotency import InMemoryIdempotencyStore
+from workers.offsets import OffsetTracker
+from workers.retry import RetryPolicy
+from workers.room_batches import RoomBatchAggregator
+from workers.webhook_delivery import WebhookDispatcher, create_webhook_session
+
+Record = namedtuple("Record", "topic partition offset timestamp key value headers")
+
+
+def load_payloads(path: str, default_topic: str, repeat: int) -> List[Tuple[str, bytes, bytes, str]]:
+    """
+    Read the recorded payloads as (topic, key, value, uuid) tuples.
+
+    With `repeat` > 1 the file is replayed several times; copies get a
+    suffixed uuid so the idempotency check does not skip them.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and "topic" in entry and "value" in entry:
+                entries.append((entry["topic"], entry.get("key"), entry["value"]))
+            else:
+                entries.append((default_topic, None, entry))
+
+    payloads = []
+    for copy in range(repeat):
+        for topic, key, value in entries:
+            if isinstance(value, dict):
+                value = dict(value)
+                if copy and value.get("uuid"):
+                    value["uuid"] = f"{value['uuid']}-{copy}"
+            # Without a recorded key, keyed the way the API produces them.
+            if key is not None:
+                raw_key = key.encode("utf-8")
+            elif isinstance(value, dict):
+                raw_key = message_key(topic, value)
+            else:
+                raw_key = None
+            uuid = value.get("uuid", "") if isinstance(value, dict) else ""
+            raw = value if isinstance(value, str) else json.dumps(value)
+            payloads.append((topic, raw_key, raw.encode("utf-8"), uuid))
+    return payloads
+
+
+class ReplayConsumer:
+    """
+    In-memory stand-in for `AIOKafkaConsumer`.
+
+    Messages are spread over partitions by key (unkeyed ones at random)
+    and become available at their scheduled arrival time. Paused
+    partitions are not fetched from, so backpressure and lane pauses behave
+    as against a real broker, and the time a message waits behind a pause
+    counts towards its latency.
+    """
+
+    def __init__(self, payloads, rate: float, poisson: bool, partitions: int) -> None:
+        self._queues: Dict[TopicPartition, Deque[Tuple[float, Record]]] = {}
+        self._paused = set()
+        self._wakeup = asyncio.Event()
+        self.arrivals: Dict[Tuple[TopicPartition, int], float] = {}
+        self.arrivals_by_uuid: Dict[str, float] = {}
+        self.committed: Dict[TopicPartition, int] = {}
+
+        t0, wall_t0 = time.monotonic(), time.time()
+        at = 0.0
+        for topic, key, value, uuid in payloads:
+            # Like the producer, unkeyed messages land on any partition.
+            partition = zlib.crc32(key) % partitions if key else random.randrange(partitions)
+            tp = TopicPartition(topic, partition)
+            queue = self._queues.setdefault(tp, deque())
+            offset = queue[-1][1].offset + 1 if queue else 0
+            record = Record(topic, tp.partition, offset, int((wall_t0 + at) * 1000), key, value, ())
+            queue.append((t0 + at, record))
+            self.arrivals[(tp, offset)] = t0 + at
+            self.arrivals_by_uuid.setdefault(uuid, t0 + at)
+            if rate > 0:
+                at += random.expovariate(rate) if poisson else 1.0 / rate
+
+    def assignment(self):
+        return set(self._queues)
+
+    def pause(self, *partitions) -> None:
+        self._paused.update(partitions)
+
+    def resume(self, *partitions) -> None:
+        self._paused.difference_update(partitions)
+        self._wakeup.set()
+
+    def highwater(self, tp: TopicPartition) -> Optional[int]:
+        queue = self._queues.get(tp)
+        return queue[-1][1].offset + 1 if queue else None
+
+    async def commit(self, offsets=None) -> None:
+        self.committed.update(offsets or {})
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Record:
+        while True:
+            if not any(self._queues.values()):
+                raise StopAsyncIteration
+
+            ready = [
+                queue[0] for tp, queue in self._queues.items()
+                if queue and tp not in self._paused
+            ]
+            timeout = None
+            if ready:
+                arrival, record = min(ready, key=lambda item: item[0])
+                delay = arrival - time.monotonic()
+                if delay <= 0:
+                    self._queues[TopicPartition(record.topic, record.partition)].popleft()
+                    return record
+                timeout = delay
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+class MemoryProducer:
+    """In-memory stand-in for `AIOKafkaProducer` recording what is sent."""
+
+    def __init__(self) -> None:
+        self.sent: List[Tuple[str, bytes]] = []
+
+    async def send_and_wait(self, topic: str, value: bytes, key=None, headers=None) -> None:
+        self.sent.append((topic, value))
+
+
+class TimedOffsetTracker(OffsetTracker):
+    """Offset tracker recording when every message finished."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.finished: Dict[Tuple[TopicPartition, int], float] = {}
+
+    def complete(self, tp: TopicPartition, offset: int) -> None:
+        self.finished.setdefault((tp, offset), time.monotonic())
+        super().complete(tp, offset)
+
+
+class StubWebhook:
+    """Local webhook server answering after a fixed latency."""
+
+    def __init__(self, latency: float, failure_rate: float) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.received: List[Tuple[str, float]] = []
+        self.failed = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            self.failed += 1
+            return web.Response(status=500, text="stub failure")
+        self.received.append((payload.get("uuid", ""), time.monotonic()))
+        return web.json_response({"ok": True})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/{path:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class FakeWorkflow:
+    """Workflow stand-in sleeping like an LLM call and returning a canned answer."""
+
+    def __init__(self, name: str, latency: float, jitter: float, parts: int) -> None:
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.parts = parts
+
+    async def ainvoke(self, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency * random.lognormvariate(0, self.jitter))
+        if self.name == "chat":
+            return {
+                "list_message": [f"Respuesta simulada {i + 1}" for i in range(self.parts)],
+                "agent_id_executed": "",
+            }
+        if self.name == "final_room_analysis":
+            return {"room_suggestion": {}}
+        return {}
+
+
+def load_factory(path: str) -> Callable[[str], Any]:
+    """Import a `module:callable` workflow factory."""
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def report(title: str, values: List[float]) -> None:
+    if not values:
+        print(f"{title:<28}{'n/a':>10}")
+        return
+    cells = [percentile(values, pct) * 1000 for pct in (50, 90, 95, 99)] + [max(values) * 1000]
+    print(f"{title:<28}{len(values):>8}" + "".join(f"{cell:>12.1f}" for cell in cells))
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    payloads = load_payloads(args.payloads, args.topic, args.repeat)
+
+    factory = load_factory(args.llm) if args.llm else (
+        lambda name: FakeWorkflow(name, args.llm_latency, args.llm_jitter, args.parts)
+    )
+    for name in WORKFLOW_BUILDERS:
+        workflow_registry.override(name, factory(name))
+
+    webhook = StubWebhook(args.webhook_latency, args.webhook_failure_rate)
+    base_url = await webhook.start()
+    settings.WEBHOOK_URL = f"{base_url}/chat"
+    settings.WEBHOOK_URL_ROOM_SUGGESTION = f"{base_url}/room-suggestion"
+    # Every message must finish so the latencies cover the whole replay.
+    settings.CONSUMER_DRAIN_TIMEOUT_SECONDS = 24 * 3600
+
+    consumer = ReplayConsumer(payloads, args.rate, args.poisson, args.partitions)
+    producer = MemoryProducer()
+    tracker = TimedOffsetTracker()
+
+    started = time.monotonic()
+    async with create_webhook_session() as session:
+        ctx = ConsumerContext(
+            producer=producer,
+            lanes=build_lanes(PartitionPauser()),
+            dispatcher=WebhookDispatcher(session, min_interval=args.webhook_interval),
+            store=InMemoryIdempotencyStore(len(payloads) + 1),
+            coalescer=BurstCoalescer(args.coalesce_window),
+            retry_policy=RetryPolicy(settings.CONSUMER_RETRY_DELAYS_SECONDS),
+            batches=RoomBatchAggregator(settings.CONSUMER_ROOM_BATCH_TTL_SECONDS),
+        )
+        try:
+            await run_consumer_loop(consumer, ctx, tracker)
+        finally:
+            await webhook.stop()
+    elapsed = time.monotonic() - started
+
+    processing = [
+        tracker.finished[key] - arrival
+        for key, arrival in consumer.arrivals.items()
+        if key in tracker.finished
+    ]
+    webhook_latencies = [
+        received - consumer.arrivals_by_uuid[uuid]
+        for uuid, received in webhook.received
+        if uuid in consumer.arrivals_by_uuid
+    ]
+    retried = sum(1 for topic, _ in producer.sent if ".retry." in topic)
+    dead_lettered = sum(1 for topic, _ in producer.sent if topic.endswith(".dlq"))
+
+    print()
+    print(f"messages: {len(payloads)}  finished: {len(tracker.finished)}  elapsed: {elapsed:.2f}s  "
+          f"throughput: {len(tracker.finished) / elapsed:.2f} msg/s")
+    print(f"webhooks delivered: {len(webhook.received)}  stub failures: {webhook.failed}  "
+          f"retries: {retried}  dead letters: {dead_lettered}")
+    print()
+    print(f"{'latency (ms)':<28}{'n':>8}{'p50':>12}{'p90':>12}{'p95':>12}{'p99':>12}{'max':>12}")
+    report("arrival -> processed", processing)
+    report("arrival -> webhook", webhook_latencies)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("payloads", help="JSONL file of recorded payloads.")
+    parser.add_argument("--topic", default=settings.KAFKA_AGENT_TOPIC, help="Topic of bare payloads.")
+    parser.add_argument("--repeat", type=int, default=1, help="Times the file is replayed.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Arrivals per second (0 = all at once).")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a constant rate.")
+    parser.add_argument("--partitions", type=int, default=6, help="Partitions per topic.")
+    parser.add_argument("--llm", help="module:callable returning a workflow stand-in for a workflow name.")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Median fake workflow latency in seconds.")
+    parser.add_argument("--llm-jitter", type=float, default=0.5, help="Sigma of the lognormal latency.")
+    parser.add_argument("--parts", type=int, default=2, help="Chat replies returned by the fake workflow.")
+    parser.add_argument("--webhook-latency", type=float, default=0.05, help="Stub webhook latency in seconds.")
+    parser.add_argument("--webhook-failure-rate", type=float, default=0.0, help="Share of stub webhook 500s.")
+    parser.add_argument("--webhook-interval", type=float, default=0.0, help="Pacing between replies of a room.")
+    parser.add_argument("--coalesce-window", type=float, default=settings.CONSUMER_COALESCE_WINDOW_SECONDS)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,88 @@
+"""
+Benchmark of JSON serialization on realistic chat payloads.
+
+Encodes and decodes a chat request carrying a 500-message history the way
+a request travels through the service: the API dumps the validated
+request and serializes it for Kafka, the consumer parses it back, and the
+reply is serialized again for the webhook. Reports the CPU time per
+request of every available backend of `utils.serialization`.
+
+Run from the repository root:
+
+    PYTHONPATH=backend python backend/benchmarks/serialization.py
+"""
+
+import random
+import statistics
+import time
+import uuid
+
+from schemas.agent import InvokeWorkflowRequest
+from utils.serialization import BACKENDS, load_backend
+
+HISTORY_LENGTH = 500
+ITERATIONS = 200
+
+WORDS = (
+    "hola que tal el partido de ayer estuvo buenísimo 😂 alguien vio las noticias "
+    "mañana hay reunión en la oficina #futbol @maria jajaja no puedo creerlo 🔥"
+).split()
+
+
+def build_request() -> InvokeWorkflowRequest:
+    rng = random.Random(42)
+    users = [(str(uuid.UUID(int=rng.getrandbits(128))), f"User {i}") for i in range(12)]
+    messages = []
+    for _ in range(HISTORY_LENGTH):
+        user_id, sender = rng.choice(users)
+        messages.append({
+            "user_id": user_id,
+            "role": rng.choice(["user", "user", "user", "assistant"]),
+            "sender": sender,
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 60))),
+        })
+    return InvokeWorkflowRequest(
+        room_id=str(uuid.uuid4()),
+        messages=messages,
+        uuid=str(uuid.uuid4()),
+        metadata={"source": "benchmark"},
+    )
+
+
+def cpu_per_request(func) -> list:
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.process_time()
+        func()
+        timings.append((time.process_time() - start) * 1e6)
+    return timings
+
+
+def main() -> None:
+    request = build_request()
+    reply = {"uuid": request.uuid, "message": [m.content for m in request.messages[:5]], "user_id": "", "send_message": True}
+
+    print(f"payload: {len(request.model_dump_json())} bytes, {HISTORY_LENGTH} messages\n")
+    results = {}
+    for name in BACKENDS:
+        backend, dumps, loads = load_backend(name)
+        if backend != name:
+            print(f"{name}: not installed, skipped")
+            continue
+
+        raw = dumps(request.model_dump())
+        results[name] = (
+            statistics.median(cpu_per_request(lambda: dumps(request.model_dump()))),
+            statistics.median(cpu_per_request(lambda: InvokeWorkflowRequest(**loads(raw)))),
+            statistics.median(cpu_per_request(lambda: dumps(reply))),
+        )
+
+    baseline = sum(results["json"])
+    print(f"{'backend':<10}{'produce (µs)':>14}{'consume (µs)':>14}{'webhook (µs)':>14}{'total (µs)':>12}{'saved (µs)':>12}")
+    for name, (produce, consume, webhook) in results.items():
+        total = produce + consume + webhook
+        print(f"{name:<10}{produce:>14.0f}{consume:>14.0f}{webhook:>14.0f}{total:>12.0f}{baseline - total:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
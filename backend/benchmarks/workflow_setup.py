@@ -0,0 +1,53 @@
+"""
+Benchmark of the per-request workflow setup cost.
+
+Compares building `MultiAgents` and compiling a graph on every request
+(the previous behaviour of the consumer and the API routes) against
+fetching the already compiled graph from the process-wide registry.
+
+Run from the repository root:
+
+    PYTHONPATH=backend python backend/benchmarks/workflow_setup.py
+"""
+
+import asyncio
+import statistics
+import time
+
+from conf import settings
+from services.agent.multi_agents import MultiAgents
+from services.agent.workflow_registry import WORKFLOW_BUILDERS, workflow_registry
+
+ITERATIONS = 20
+
+
+async def build_per_request(name: str) -> None:
+    agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
+    WORKFLOW_BUILDERS[name](agent).compile()
+
+
+async def build_from_registry(name: str) -> None:
+    await workflow_registry.get(name)
+
+
+async def measure(func, name: str) -> list:
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        await func(name)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main() -> None:
+    await workflow_registry.warm_up()
+
+    print(f"{'workflow':<22}{'per request (ms)':>18}{'registry (ms)':>16}{'saved (ms)':>13}")
+    for name in WORKFLOW_BUILDERS:
+        rebuilt = statistics.median(await measure(build_per_request, name))
+        cached = statistics.median(await measure(build_from_registry, name))
+        print(f"{name:<22}{rebuilt:>18.3f}{cached:>16.4f}{rebuilt - cached:>13.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,29 @@
-import json
-from fastapi import APIRouter, Body, HTTPException
-from aiokafka import AIOKafkaProducer
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from core.logging_config import get_logger
 from schemas.agent import (
+    BulkTopicSuggestionsRequest,
     InvokeWorkflowRequest,
     TopicSuggestionsRequest,
     MessageSuggestionsRequest, 
+    SSEStreamResponseSchema,
 )
 from schemas.suggested_rooms import RoomSuggestionsRequest, RoleCreationWizardRequest
 from langfuse.callback import CallbackHandler
 import uuid
 from langfuse import Langfuse
-from services.agent.multi_agents import MultiAgents
+from services.agent.tools.get_chat_info import get_chat_info
+from services.agent.workflow_registry import workflow_registry
+from services.kafka_producer import kafka_producer, message_key
+from services.kafka_replies import kafka_replies, reply_headers
+from utils import serialization
+from utils.admission import admission_control
+from utils.singleflight import singleflight
+from utils.streaming import stream_workflow
 from schemas.langfuse import LangfuseReceiveFeedbackRequest, LangfuseReceiveFeedbackResponse
 from conf import settings
-from services.llm_manager import LLMManager
 from langchain_core.prompts import ChatPromptTemplate
 
 router = APIRouter(
@@ -28,30 +37,144 @@ logger = get_logger(__name__)
 @router.post("/chat", summary="Invoke Chat Agent Workflow (Kafka)")
 async def invoke_chat_workflow(
     request: InvokeWorkflowRequest = Body(...),
+    wait: bool = Query(False, description="Wait for the workflow result instead of receiving it on the webhook"),
+    timeout: Optional[float] = Query(
+        None,
+        gt=0,
+        le=settings.CHAT_WAIT_MAX_TIMEOUT_SECONDS,
+        description="Seconds to wait for the result when `wait` is true",
+    ),
 ) -> dict:
+    """
+    Queues a chat request for the agent consumer.
+
+    By default the answer is delivered to the webhook. With `wait=true` the
+    request carries this process's reply topic and a correlation id, and the
+    answer is returned in the response; a 504 is returned if it does not
+    arrive within `timeout` seconds. A 503 is returned while Kafka (or,
+    with `wait=true`, the reply listener) is not connected.
+    """
+    if not kafka_producer.started:
+        raise HTTPException(status_code=503, detail="Kafka is not available")
+    if wait and not kafka_replies.started:
+        raise HTTPException(status_code=503, detail="Waiting for the workflow result is not available")
+
     try:
         uuid_ = request.uuid or str(uuid.uuid4())
         message = request.model_dump()
         message["uuid"] = uuid_
 
-        producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BROKER_URL)
-        await producer.start()
-        await producer.send_and_wait(
-            settings.KAFKA_AGENT_TOPIC,
-            json.dumps(message).encode("utf-8")
-        )
-        await producer.stop()
+        if not wait:
+            await kafka_producer.send(
+                settings.KAFKA_AGENT_TOPIC,
+                serialization.dumps(message),
+                key=message_key(settings.KAFKA_AGENT_TOPIC, message),
+            )
 
-        return {
-            "status": "message_sent",
-            "uui_id": uuid_,
-            "detail": "Message successfully sent to Kafka for processing"
-        }
+            return {
+                "status": "message_sent",
+                "uui_id": uuid_,
+                "detail": "Message successfully sent to Kafka for processing"
+            }
+
+        correlation_id, reply = kafka_replies.expect()
+        try:
+            await kafka_producer.send(
+                settings.KAFKA_AGENT_TOPIC,
+                serialization.dumps(message),
+                key=message_key(settings.KAFKA_AGENT_TOPIC, message),
+                headers=reply_headers(kafka_replies.topic, kafka_replies.partition, correlation_id),
+            )
+            result = await asyncio.wait_for(reply, timeout or settings.CHAT_WAIT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"No workflow result for {uuid_} within the timeout")
+        finally:
+            kafka_replies.discard(correlation_id)
+
+        return {**result, "uui_id": uuid_}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Kafka error: {e}")
     
+@router.post(
+    "/chat/stream",
+    summary="Stream Chat Agent Workflow (SSE)",
+    responses={
+        200: {
+            "model": SSEStreamResponseSchema,
+            "description": "Server-Sent Events stream of the workflow progress and answer tokens",
+            "content": {"text/event-stream": {}},
+        },
+    },
+)
+@admission_control("chat_stream", settings.ADMISSION_CHAT_STREAM_MAX_IN_FLIGHT)
+async def stream_chat_workflow(
+    request: InvokeWorkflowRequest = Body(...),
+) -> StreamingResponse:
+    """
+    Runs the chat workflow in the request and streams it as Server-Sent Events.
+
+    Emits a signal as each node completes and the answer tokens as the
+    final LLM call produces them, so the first bytes arrive long before the
+    whole workflow is done. The END signal carries the split messages.
+    """
+    uuid_ = request.uuid or str(uuid.uuid4())
+    workflow = await workflow_registry.get("chat")
+
+    callback_handlers = []
+    if settings.LANGFUSE_IS_ENABLE:
+        callback_handlers.append(
+            CallbackHandler(
+                public_key=settings.LANGFUSE_PUBLIC_KEY,
+                secret_key=settings.LANGFUSE_SECRET_KEY,
+                host=settings.LANGFUSE_HOST,
+                trace_name="siscom-agent-chat-stream",
+                debug=settings.LANGFUSE_DEBUG,
+                metadata=request.metadata if request.metadata else {},
+            )
+        )
+
+    events = stream_workflow(
+        workflow,
+        {
+            "room_id": request.room_id,
+            "messages": request.messages,
+            "uui_id": uuid_,
+        },
+        config={
+            "uui_id": uuid_,
+            "callbacks": callback_handlers,
+            "recursion_limit": 200,
+        },
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def topic_suggestions_callbacks(request: TopicSuggestionsRequest) -> list:
+    """Langfuse callbacks of a topic-suggestion request, single or bulk."""
+    callback_handlers = []
+    if settings.LANGFUSE_IS_ENABLE:
+        callback_handlers.append(
+            CallbackHandler(
+                public_key=settings.LANGFUSE_PUBLIC_KEY,
+                secret_key=settings.LANGFUSE_SECRET_KEY,
+                host=settings.LANGFUSE_HOST,
+                trace_name="siscom-agent-topic-suggestions",
+                debug=settings.LANGFUSE_DEBUG,
+                metadata=request.metadata if request.metadata else {},
+            )
+        )
+    return callback_handlers
+
+
 @router.post("/generate-topic-suggestions", summary="Generate Topic Suggestions")
+@admission_control("topic_suggestions", settings.ADMISSION_TOPIC_SUGGESTIONS_MAX_IN_FLIGHT)
 async def generate_topic_suggestions(
     request: TopicSuggestionsRequest = Body(...)
 ) -> dict:
@@ -64,14 +187,15 @@ async def generate_topic_suggestions(
     3. Generates a list of relevant topic suggestions using an LLM.
     """
     try:
-        agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
-        workflow = agent.create_suggestions_workflow().compile()
+        workflow = await workflow_registry.get("suggestions")
 
         # The workflow expects 'messages' and 'room_id' in the initial state,
         # which are provided by the TopicSuggestionsRequest schema.
         result = await workflow.ainvoke({
             "room_id": request.room_id,
             "messages": request.historical_messages,
+        }, config={
+            "callbacks": topic_suggestions_callbacks(request),
         })
 
         if error := result.get("error"):
@@ -84,7 +208,90 @@ async def generate_topic_suggestions(
         logger.exception(f"Error generating topic suggestions: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating topic suggestions: {e}")
     
+async def fetch_room_details(room_id: str):
+    """Fetches a room's details, or None if they cannot be retrieved."""
+    try:
+        return await get_chat_info.ainvoke(room_id)
+    except Exception as e:
+        logger.error(f"Error fetching room info for {room_id}: {e}")
+        return None
+
+
+async def stream_topic_suggestions(requests: List[TopicSuggestionsRequest]):
+    """
+    Runs the topic-suggestion workflow for every request and yields one NDJSON
+    line per request as soon as it completes.
+
+    At most TOPIC_SUGGESTIONS_BULK_CONCURRENCY rooms run at the same time,
+    all on the same compiled workflow, and the details of each distinct room
+    are fetched once and shared by every request for that room. With
+    admission control enabled, every room also holds a slot of the
+    single-room route while it runs, so the fan-out counts against the
+    same in-flight budget; rooms wait for their slot instead of being shed.
+    """
+    workflow = await workflow_registry.get("suggestions")
+    semaphore = asyncio.Semaphore(settings.TOPIC_SUGGESTIONS_BULK_CONCURRENCY)
+    admission = getattr(generate_topic_suggestions, "admission", None)
+    room_details = {}
+
+    async def run(request: TopicSuggestionsRequest) -> dict:
+        if request.room_id and request.room_id not in room_details:
+            room_details[request.room_id] = asyncio.ensure_future(fetch_room_details(request.room_id))
+        details = await room_details[request.room_id] if request.room_id else None
+
+        return await workflow.ainvoke({
+            "room_id": request.room_id,
+            "messages": request.historical_messages,
+            "room_details": details,
+        }, config={
+            "callbacks": topic_suggestions_callbacks(request),
+        })
+
+    async def suggest(index: int, request: TopicSuggestionsRequest) -> dict:
+        item = {"index": index, "room_id": request.room_id, "uuid": request.uuid}
+        async with semaphore:
+            try:
+                if admission is None:
+                    result = await run(request)
+                else:
+                    async with admission.admit(shed=False):
+                        result = await run(request)
+                if error := result.get("error"):
+                    return {**item, "error": error}
+                return {**item, "topics": result.get("suggestions", [])}
+            except Exception as e:
+                logger.exception(f"Error generating topic suggestions for room {request.room_id}: {e}")
+                return {**item, "error": str(e)}
+
+    tasks = [asyncio.create_task(suggest(index, request)) for index, request in enumerate(requests)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield serialization.dumps(await completed) + b"\n"
+    finally:
+        # The client disconnected: do not keep generating for nobody.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.post("/generate-topic-suggestions/bulk", summary="Generate Topic Suggestions for Many Rooms")
+async def generate_topic_suggestions_bulk(
+    request: BulkTopicSuggestionsRequest = Body(...)
+) -> StreamingResponse:
+    """
+    Generates topic suggestions for many rooms concurrently.
+
+    The response is NDJSON: one line per request, in completion order, with
+    its `index` in the request list and either its `topics` or an `error`.
+    """
+    return StreamingResponse(
+        stream_topic_suggestions(request.requests),
+        media_type="application/x-ndjson",
+    )
+
 @router.post("/generate-message-suggestion", summary="Generate Message Suggestions")
+@singleflight()
+@admission_control("message_suggestions", settings.ADMISSION_MESSAGE_SUGGESTIONS_MAX_IN_FLIGHT)
 async def generate_message_suggestions(
     request: MessageSuggestionsRequest = Body(...)
 ) -> dict:
@@ -97,8 +304,7 @@ async def generate_message_suggestions(
     3. Generates a list of relevant topic suggestions using an LLM.
     """
     try:
-        agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
-        workflow = agent.create_message_suggestions_workflow().compile()
+        workflow = await workflow_registry.get("message_suggestions")
         
         callback_handlers = []
 
@@ -144,6 +350,7 @@ async def generate_message_suggestions(
 
 
 @router.post("/test-completion", summary="Simple LLM completion for testing")
+@admission_control("test_completion", settings.ADMISSION_TEST_COMPLETION_MAX_IN_FLIGHT)
 async def test_completion(payload: dict = Body(...)) -> dict:
     """
     Devuelve una inferencia directa del LLM a partir de 'prompt'.
@@ -153,7 +360,7 @@ async def test_completion(payload: dict = Body(...)) -> dict:
     if not prompt:
         raise HTTPException(status_code=400, detail="Campo 'prompt' requerido")
 
-    llm = LLMManager(settings.LLM_MODEL_NAME)
+    llm = (await workflow_registry.get_agent()).llm_manager
     template = ChatPromptTemplate.from_messages([("user", "{prompt}")])
     try:
         text = await llm.ainvoke(template, prompt=prompt)
@@ -169,20 +376,23 @@ async def generate_room_suggestions(
     Queues a request to generate room suggestions based on conversation history.
 
     This endpoint sends the request to a Kafka topic for asynchronous processing.
-    The result will be sent via a webhook.
+    The result will be sent via a webhook. A 503 is returned while Kafka is
+    not connected.
     """
+    if not kafka_producer.started:
+        raise HTTPException(status_code=503, detail="Kafka is not available")
     try:
         uuid_ = request.uuid or str(uuid.uuid4())
         message = request.model_dump()
         message["uuid"] = uuid_
 
-        producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BROKER_URL)
-        await producer.start()
-        await producer.send_and_wait(
+        # Keyed by batch so every room of a batch lands on one partition,
+        # and is consumed in order by the process aggregating the batch.
+        await kafka_producer.send(
             settings.KAFKA_ROOM_SUGGESTION_TOPIC,
-            json.dumps(message).encode("utf-8")
+            serialization.dumps(message),
+            key=message_key(settings.KAFKA_ROOM_SUGGESTION_TOPIC, message),
         )
-        await producer.stop()
 
         return {
             "status": "request_queued",
@@ -194,6 +404,8 @@ async def generate_room_suggestions(
         raise HTTPException(status_code=500, detail=f"Kafka error: {e}")
 
 @router.post("/role-creation-wizard", summary="Generate Role Creation Wizard")
+@singleflight()
+@admission_control("role_creation_wizard", settings.ADMISSION_ROLE_WIZARD_MAX_IN_FLIGHT)
 async def generate_role_creation_wizard(
     request: RoleCreationWizardRequest = Body(...)
 ) -> dict:
@@ -204,8 +416,7 @@ async def generate_role_creation_wizard(
     The result will be sent via a webhook.
     """
     try:
-        agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
-        workflow = agent.rule_creation_wizard_workflow().compile()
+        workflow = await workflow_registry.get("rule_creation_wizard")
         
         callback_handlers = []
 
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, Summary
+from prometheus_client import Counter, Gauge, Histogram, Summary
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_fastapi_instrumentator.metrics import Info
 
@@ -34,6 +34,93 @@ LATENCY = Histogram(
     buckets=[0.1, 0.5, 1.0],
 )
 
+SINGLEFLIGHT_REQUESTS = Counter(
+    "singleflight_requests_total",
+    "Requests by handler that started a call (miss) or joined an identical in-flight one (hit).",
+    ["handler", "result"],
+)
+
+SINGLEFLIGHT_IN_FLIGHT = Gauge(
+    "singleflight_in_flight",
+    "Distinct calls in flight by handler.",
+    ["handler"],
+)
+
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "Admission decisions by route: admitted, or rejected (queue_full, slo, timeout).",
+    ["route", "decision"],
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests running by route.",
+    ["route"],
+)
+
+ADMISSION_QUEUED = Gauge(
+    "admission_queued",
+    "Requests waiting for a slot by route.",
+    ["route"],
+)
+
+ADMISSION_SERVICE_SECONDS = Histogram(
+    "admission_service_seconds",
+    "Service time of admitted requests by route.",
+    ["route"],
+    buckets=[0.5, 1, 2.5, 5, 10, 20, 30, 60, 120],
+)
+
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "LLM calls by model answered from the response cache (hit), sent to the provider (miss) or bypassing it.",
+    ["model", "result"],
+)
+
+LLM_SEMANTIC_CACHE_REQUESTS = Counter(
+    "llm_semantic_cache_requests_total",
+    "LLM calls by prompt answered from the semantic cache (hit), sent to the provider (miss) or bypassing it.",
+    ["prompt", "result"],
+)
+
+LLM_CALLS_IN_FLIGHT = Gauge(
+    "llm_calls_in_flight",
+    "LLM provider calls holding a slot of the rate limiter, by provider.",
+    ["provider"],
+)
+
+LLM_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time LLM calls waited for the provider's RPM/TPM budget.",
+    ["provider"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+
+LLM_RATE_LIMITED = Counter(
+    "llm_rate_limited_total",
+    "LLM calls rejected by the provider with a 429.",
+    ["provider"],
+)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "Latency of successful LLM calls by model.",
+    ["model"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+
+LLM_HEDGED_REQUESTS = Counter(
+    "llm_hedged_requests_total",
+    "Hedged duplicate LLM calls sent to a model because the previous one was slow.",
+    ["model"],
+)
+
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Failed LLM calls of a routed request, by the model that failed.",
+    ["model"],
+)
+
 
 def count_dbid(info: Info) -> None:
     """
@@ -123,6 +123,81 @@ if "OPENAI_API_KEY" not in os.environ:
 
 LLM_RESPONSE_DELAY: float = float(get_env("LLM_RESPONSE_DELAY", "0.1"))
 
+# Exact-match LLM response cache (opt-in). The backend is one of "memory"
+# (per process), "sqlite" (per host) or "redis" (shared); entries expire
+# after the TTL and the least recently used ones are evicted past the
+# maximum (for Redis, by the server's maxmemory policy).
+LLM_CACHE_ENABLED: bool = bool_from_str(get_env("LLM_CACHE_ENABLED", "f"))
+LLM_CACHE_BACKEND: str = get_env("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL_SECONDS: float = float(get_env("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES: int = int(get_env("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_SQLITE_PATH: str = get_env("LLM_CACHE_SQLITE_PATH", "/tmp/agent_llm_cache.db")
+LLM_CACHE_REDIS_URL: str = get_env("LLM_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Semantic LLM response cache (opt-in), applied only to the prompts listed
+# by name. A prompt hits when the embedding of its last user message is at
+# least THRESHOLD cosine-similar to a cached one with the same model, system
+# messages and parameters. The backend is "memory" (per process) or
+# "pgvector" (shared, stored in the vector store database).
+LLM_SEMANTIC_CACHE_ENABLED: bool = bool_from_str(get_env("LLM_SEMANTIC_CACHE_ENABLED", "f"))
+LLM_SEMANTIC_CACHE_BACKEND: str = get_env("LLM_SEMANTIC_CACHE_BACKEND", "memory")
+LLM_SEMANTIC_CACHE_PROMPTS: list = [
+    name.strip()
+    for name in get_env("LLM_SEMANTIC_CACHE_PROMPTS", "group_topic_suggester").split(",")
+    if name.strip()
+]
+LLM_SEMANTIC_CACHE_THRESHOLD: float = float(get_env("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+LLM_SEMANTIC_CACHE_TTL_SECONDS: float = float(get_env("LLM_SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = int(get_env("LLM_SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+LLM_SEMANTIC_CACHE_COLLECTION: str = get_env("LLM_SEMANTIC_CACHE_COLLECTION", "llm_semantic_cache")
+
+# Rate limiting of LLM provider calls (opt-in). LLM_RATE_LIMITS lists
+# "prefix=rpm:tpm" budgets matched against the model name, e.g.
+# "openai=500:200000,anthropic=50:40000" (0 = unlimited). Budgets are per
+# process with the "memory" backend and shared through Redis with "redis".
+# Each process also runs at most MAX_CONCURRENCY calls per provider at once
+# (0 = unbounded). A 429 pauses the provider for its Retry-After delay, or
+# the default below when the provider sends none.
+LLM_RATE_LIMIT_ENABLED: bool = bool_from_str(get_env("LLM_RATE_LIMIT_ENABLED", "f"))
+LLM_RATE_LIMIT_BACKEND: str = get_env("LLM_RATE_LIMIT_BACKEND", "memory")
+LLM_RATE_LIMITS: str = get_env("LLM_RATE_LIMITS", "")
+LLM_RATE_LIMIT_MAX_CONCURRENCY: int = int(get_env("LLM_RATE_LIMIT_MAX_CONCURRENCY", "8"))
+LLM_RATE_LIMIT_COMPLETION_TOKENS: int = int(get_env("LLM_RATE_LIMIT_COMPLETION_TOKENS", "512"))
+LLM_RATE_LIMIT_RETRY_AFTER_SECONDS: float = float(get_env("LLM_RATE_LIMIT_RETRY_AFTER_SECONDS", "10"))
+LLM_RATE_LIMIT_REDIS_URL: str = get_env("LLM_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+
+# Models tried after LLM_MODEL_NAME, in order, e.g.
+# "hosted_vllm/llama-3.1-70b,ollama/llama3.1". A failing model falls back to
+# the next one at once. With hedging, a model still running after its p95
+# latency (over the last WINDOW successful calls, once it has MIN_SAMPLES;
+# DEFAULT_DELAY before that) gets a duplicate request on the next model, and
+# the first answer wins.
+LLM_FALLBACK_MODELS: list = [
+    name.strip()
+    for name in get_env("LLM_FALLBACK_MODELS", "").split(",")
+    if name.strip()
+]
+LLM_HEDGE_ENABLED: bool = bool_from_str(get_env("LLM_HEDGE_ENABLED", "t"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(get_env("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+LLM_HEDGE_MIN_DELAY_SECONDS: float = float(get_env("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+LLM_HEDGE_LATENCY_WINDOW: int = int(get_env("LLM_HEDGE_LATENCY_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES: int = int(get_env("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Token budgets of prompts. LLM_CONTEXT_WINDOWS lists "prefix=tokens"
+# context windows matched against the model name; other models get the
+# default. LLM_TOKENIZERS maps prefixes to a tiktoken encoding or to
+# "hf:<repo>" for a Hugging Face tokenizer, e.g.
+# "ollama/llama3=hf:meta-llama/Meta-Llama-3-8B"; tiktoken is used otherwise.
+# Prompts keep COMPLETION_RESERVE tokens of the window for the answer.
+LLM_CONTEXT_WINDOWS: str = get_env("LLM_CONTEXT_WINDOWS", "deepseek=65536")
+LLM_DEFAULT_CONTEXT_WINDOW: int = int(get_env("LLM_DEFAULT_CONTEXT_WINDOW", "32768"))
+LLM_TOKENIZERS: str = get_env("LLM_TOKENIZERS", "")
+LLM_COMPLETION_RESERVE_TOKENS: int = int(get_env("LLM_COMPLETION_RESERVE_TOKENS", "2048"))
+
+# JSON serializer of Kafka payloads, webhooks and API responses: auto
+# (orjson, then msgspec, then the standard library), orjson, msgspec or json.
+JSON_SERIALIZER: str = get_env("JSON_SERIALIZER", "auto")
+
 #
 #
 #
@@ -132,7 +207,101 @@ KAFKA_AGENT_RESPONSE_TOPIC:str = get_env("KAFKA_AGENT_RESPONSE_TOPIC", "agent-ch
 KAFKA_ANALYTICS_TOPIC: str = get_env("KAFKA_ANALYTICS_TOPIC", "analytics-topic-suggestions")
 KAFKA_ROOM_SUGGESTION_TOPIC: str = get_env("KAFKA_ROOM_SUGGESTION_TOPIC", "room-suggestion-topic")
 
-KAFKA_ENABLED = os.getenv("KAFKA_ENABLED", "false").lower() == "true"
+# Connects the API to Kafka (shared producer and reply listener). Set it to
+# false only to run the API without a broker; the Kafka routes answer 503.
+KAFKA_ENABLED = os.getenv("KAFKA_ENABLED", "true").lower() == "true"
+
+# Shared producer: milliseconds to wait for more messages before sending a
+# batch, maximum batch size in bytes and compression codec (gzip, snappy,
+# lz4, zstd, or empty for none).
+KAFKA_PRODUCER_LINGER_MS: int = int(get_env("KAFKA_PRODUCER_LINGER_MS", "5"))
+KAFKA_PRODUCER_MAX_BATCH_SIZE: int = int(get_env("KAFKA_PRODUCER_MAX_BATCH_SIZE", "65536"))
+KAFKA_PRODUCER_COMPRESSION: str = get_env("KAFKA_PRODUCER_COMPRESSION", "lz4")
+
+# Synchronous chat (`/v1/chat?wait=true`): default and maximum seconds a
+# request waits for its workflow result. Replies travel on the
+# pre-provisioned KAFKA_AGENT_RESPONSE_TOPIC, one partition per API process.
+CHAT_WAIT_TIMEOUT_SECONDS: float = float(get_env("CHAT_WAIT_TIMEOUT_SECONDS", "60"))
+CHAT_WAIT_MAX_TIMEOUT_SECONDS: float = float(get_env("CHAT_WAIT_MAX_TIMEOUT_SECONDS", "300"))
+
+# Bulk topic suggestions (`/v1/generate-topic-suggestions/bulk`): maximum
+# rooms per request and rooms processed at the same time.
+TOPIC_SUGGESTIONS_BULK_MAX_ITEMS: int = int(get_env("TOPIC_SUGGESTIONS_BULK_MAX_ITEMS", "500"))
+TOPIC_SUGGESTIONS_BULK_CONCURRENCY: int = int(get_env("TOPIC_SUGGESTIONS_BULK_CONCURRENCY", "16"))
+
+# Admission control of the synchronous LLM routes, per worker: requests
+# running at once per route, requests allowed to wait for a slot, and the
+# latency objective past which requests are shed with 503 + Retry-After.
+ADMISSION_ENABLED: bool = bool_from_str(get_env("ADMISSION_ENABLED", "f"))
+ADMISSION_MAX_QUEUE: int = int(get_env("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_SLO_SECONDS: float = float(get_env("ADMISSION_SLO_SECONDS", "60"))
+ADMISSION_TOPIC_SUGGESTIONS_MAX_IN_FLIGHT: int = int(get_env("ADMISSION_TOPIC_SUGGESTIONS_MAX_IN_FLIGHT", "8"))
+ADMISSION_MESSAGE_SUGGESTIONS_MAX_IN_FLIGHT: int = int(get_env("ADMISSION_MESSAGE_SUGGESTIONS_MAX_IN_FLIGHT", "8"))
+ADMISSION_ROLE_WIZARD_MAX_IN_FLIGHT: int = int(get_env("ADMISSION_ROLE_WIZARD_MAX_IN_FLIGHT", "4"))
+ADMISSION_TEST_COMPLETION_MAX_IN_FLIGHT: int = int(get_env("ADMISSION_TEST_COMPLETION_MAX_IN_FLIGHT", "4"))
+ADMISSION_CHAT_STREAM_MAX_IN_FLIGHT: int = int(get_env("ADMISSION_CHAT_STREAM_MAX_IN_FLIGHT", "8"))
+
+# Maximum number of rooms the consumer processes at the same time. Messages
+# of a single room always run one after another.
+CONSUMER_MAX_ROOMS_IN_FLIGHT: int = int(get_env("CONSUMER_MAX_ROOMS_IN_FLIGHT", "32"))
+
+# Number of consumer processes started by workers/consumer_pool.py. They all
+# join the same consumer group, so partitions spread across them. Raise it
+# to the CPUs actually granted to the container, each process holding its
+# own models and connection pools.
+CONSUMER_PROCESSES: int = int(get_env("CONSUMER_PROCESSES", "1"))
+# Seconds a consumer process has to drain after SIGTERM before it is killed.
+CONSUMER_STOP_TIMEOUT_SECONDS: float = float(get_env("CONSUMER_STOP_TIMEOUT_SECONDS", "60"))
+# On shutdown, seconds to wait for in-flight messages before cancelling them.
+# Keep it below CONSUMER_STOP_TIMEOUT_SECONDS.
+CONSUMER_DRAIN_TIMEOUT_SECONDS: float = float(get_env("CONSUMER_DRAIN_TIMEOUT_SECONDS", "45"))
+# Re-publish the messages cancelled on shutdown to their topic, so the final
+# commit skips past them and the finished ones are not processed again.
+CONSUMER_SPOOL_UNFINISHED: bool = bool_from_str(get_env("CONSUMER_SPOOL_UNFINISHED", "t"))
+# Port of the consumer's Prometheus endpoint; pool worker N uses this port + N.
+# Set to 0 to disable it.
+CONSUMER_METRICS_PORT: int = int(get_env("CONSUMER_METRICS_PORT", "9101"))
+
+# Per-topic lanes: each one has its own concurrency limit and a weight used
+# to share CONSUMER_MAX_ROOMS_IN_FLIGHT fairly. Low-priority partitions are
+# paused while the chat lane is saturated.
+CONSUMER_CHAT_LANE_MAX_IN_FLIGHT: int = int(get_env("CONSUMER_CHAT_LANE_MAX_IN_FLIGHT", "32"))
+CONSUMER_CHAT_LANE_WEIGHT: float = float(get_env("CONSUMER_CHAT_LANE_WEIGHT", "4"))
+CONSUMER_ROOM_SUGGESTION_LANE_MAX_IN_FLIGHT: int = int(get_env("CONSUMER_ROOM_SUGGESTION_LANE_MAX_IN_FLIGHT", "8"))
+CONSUMER_ROOM_SUGGESTION_LANE_WEIGHT: float = float(get_env("CONSUMER_ROOM_SUGGESTION_LANE_WEIGHT", "1"))
+CONSUMER_ANALYTICS_LANE_MAX_IN_FLIGHT: int = int(get_env("CONSUMER_ANALYTICS_LANE_MAX_IN_FLIGHT", "4"))
+CONSUMER_ANALYTICS_LANE_WEIGHT: float = float(get_env("CONSUMER_ANALYTICS_LANE_WEIGHT", "1"))
+CONSUMER_PAUSE_LOW_PRIORITY_LANES: bool = bool_from_str(get_env("CONSUMER_PAUSE_LOW_PRIORITY_LANES", "t"))
+
+# Backpressure: every assigned partition is paused once this many consumed
+# messages are pending, and resumed when the backlog drops to the low mark.
+CONSUMER_MAX_PENDING_MESSAGES: int = int(get_env("CONSUMER_MAX_PENDING_MESSAGES", "200"))
+CONSUMER_RESUME_PENDING_MESSAGES: int = int(get_env("CONSUMER_RESUME_PENDING_MESSAGES", "100"))
+
+# Manual offset commits and redelivery protection. The idempotency backend is
+# one of "memory", "sqlite" or "postgres".
+KAFKA_COMMIT_INTERVAL_SECONDS: float = float(get_env("KAFKA_COMMIT_INTERVAL_SECONDS", "5"))
+CONSUMER_IDEMPOTENCY_BACKEND: str = get_env("CONSUMER_IDEMPOTENCY_BACKEND", "memory")
+CONSUMER_IDEMPOTENCY_CACHE_SIZE: int = int(get_env("CONSUMER_IDEMPOTENCY_CACHE_SIZE", "10000"))
+CONSUMER_IDEMPOTENCY_SQLITE_PATH: str = get_env("CONSUMER_IDEMPOTENCY_SQLITE_PATH", "/tmp/agent_consumer_idempotency.db")
+
+# Chat requests of a room arriving within this window are coalesced: only the
+# newest one runs. Set to 0 to disable.
+CONSUMER_COALESCE_WINDOW_SECONDS: float = float(get_env("CONSUMER_COALESCE_WINDOW_SECONDS", "2"))
+
+# Room-suggestion batches: the last message of a batch waits up to this many
+# seconds for its sibling rooms before the final analysis, and batches with
+# no activity for the TTL are dropped from memory.
+CONSUMER_ROOM_BATCH_WAIT_SECONDS: float = float(get_env("CONSUMER_ROOM_BATCH_WAIT_SECONDS", "300"))
+CONSUMER_ROOM_BATCH_TTL_SECONDS: float = float(get_env("CONSUMER_ROOM_BATCH_TTL_SECONDS", "3600"))
+
+# Delays of the delayed-retry topics ("<topic>.retry.<n>"). Messages failing
+# after the last tier go to "<topic>.dlq".
+CONSUMER_RETRY_DELAYS_SECONDS: list = [
+    float(delay)
+    for delay in get_env("CONSUMER_RETRY_DELAYS_SECONDS", "10,60,300").split(",")
+    if delay.strip()
+]
 
 # Redis
 # REDIS_HOST:str = get_env("REDIS_HOST", "localhost")
@@ -145,6 +314,14 @@ WEBHOOK_BEARER_TOKEN: str = get_env("WEBHOOK_BEARER_TOKEN")
 
 SERPER_API_KEY: str = get_env("SERPER_API_KEY", "")
 
+# Webhook delivery: pacing between messages of the same room, retries with
+# exponential backoff and the size of the shared connection pool.
+WEBHOOK_MESSAGE_INTERVAL_SECONDS: float = float(get_env("WEBHOOK_MESSAGE_INTERVAL_SECONDS", "20"))
+WEBHOOK_MAX_RETRIES: int = int(get_env("WEBHOOK_MAX_RETRIES", "3"))
+WEBHOOK_RETRY_BACKOFF_SECONDS: float = float(get_env("WEBHOOK_RETRY_BACKOFF_SECONDS", "1"))
+WEBHOOK_MAX_CONNECTIONS: int = int(get_env("WEBHOOK_MAX_CONNECTIONS", "20"))
+WEBHOOK_TIMEOUT_SECONDS: float = float(get_env("WEBHOOK_TIMEOUT_SECONDS", "30"))
+
 SISCOM_API_URL: str = get_env("SISCOM_API_URL", "https://api-siscom.appzone.dev/api/chat/agent/info")
 
 PORT: int = int(get_env("PORT", "8002"))
\ No newline at end of file
@@ -11,3 +11,14 @@ class AgentCancelledException(Exception):
         super().__init__(detail)
         self.detail = detail
         self.headers = headers
+
+
+class WorkflowFailedException(Exception):
+    """
+    Raised when a workflow finishes without a usable result and the
+    message should be retried later.
+    """
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
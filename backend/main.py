@@ -1,10 +1,7 @@
 from __future__ import annotations
+import asyncio
 import os
-import json
 from conf import settings
-import asyncio
-from asyncio import Future
-from aiokafka import AIOKafkaConsumer
 from core.logging_config import get_logger
 from core.metrics_config import setup_metrics
 from fastapi import FastAPI
@@ -16,11 +13,15 @@ from middlewares import (
 )
 from utils.healthcheck import (
     HealthCheckFactory,
+    HealthCheckKafkaProducer,
     healthCheckRoute,
 )
 from fastapi.exceptions import RequestValidationError
 from utils.healthcheck.model import HealthCheckModel
-from utils.shared_state import pending_responses
+from services.agent.workflow_registry import workflow_registry
+from services.kafka_producer import kafka_producer
+from services.kafka_replies import kafka_replies
+from utils.serialization import FastJSONResponse
 import warnings
 from controllers import (
     agent
@@ -71,34 +72,6 @@ def import_routes(app: FastAPI) -> FastAPI:
     # app.include_router(context.router, prefix="/v1")
     return app
 
-async def response_listener():
-    consumer = AIOKafkaConsumer(
-        settings.KAFKA_AGENT_RESPONSE_TOPIC,
-        bootstrap_servers=settings.KAFKA_BROKER_URL,
-        group_id="response-group",
-        auto_offset_reset="latest"
-    )
-    await consumer.start()
-    try:
-        async for msg in consumer:
-            try:
-                data = json.loads(msg.value.decode("utf-8"))
-                logger.info(f"KAFKA_BROKER_URL: {settings.KAFKA_BROKER_URL}")
-                uui_id = data.get("uui_id")
-                logger.info(f"run id: {uui_id}")
-                logger.info(f"pending_responses: {pending_responses}")
-                
-                if uui_id and uui_id in pending_responses:
-                    future = pending_responses.pop(uui_id)
-                    if not future.done():
-                        future.set_result(data)
-
-            except Exception as e:
-                logger.error(f"Error procesando respuesta: {e}")
-    finally:
-        await consumer.stop()
-
-
 def get_application(logger) -> FastAPI:
     """
     Returns a FastAPI application.
@@ -113,6 +86,7 @@ def get_application(logger) -> FastAPI:
         openapi_url=settings.OPENAPI_URL,
         docs_url=settings.DOCS_URL,
         redoc_url=settings.REDOC_URL,
+        default_response_class=FastJSONResponse,
     )
     logger.debug("FastAPI application created")
 
@@ -121,6 +95,9 @@ def get_application(logger) -> FastAPI:
     app = import_routes(app)
 
     _healthChecks = HealthCheckFactory()
+    _healthChecks.add(
+        HealthCheckKafkaProducer(kafka_producer, connectionUri=settings.KAFKA_BROKER_URL)
+    )
     app.add_api_route(
         "/api/health/",
         tags=["Health Check"],
@@ -145,8 +122,41 @@ setup_metrics(app)
 
 logger.info("FastAPI application created")
 
+async def start_kafka() -> None:
+    """
+    Connects the shared producer and the reply listener, retrying with a
+    capped backoff until both are up. Runs in the background so the API,
+    and the routes that do not use Kafka, serve while the broker is down.
+    """
+    delay = 1.0
+    while True:
+        try:
+            await kafka_producer.start()
+            await kafka_replies.start()
+            logger.info("🚀 Kafka producer and reply listener started")
+            return
+        except Exception as e:
+            logger.error(f"Kafka unavailable, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(response_listener())
-    logger.info("🚀 Kafka response listener iniciado")
+    await workflow_registry.warm_up()
+    logger.info("Workflows compiled")
+    if settings.KAFKA_ENABLED:
+        app.state.kafka_startup = asyncio.create_task(start_kafka())
+    else:
+        logger.info("Kafka disabled — producer and reply listener not started.")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    kafka_startup = getattr(app.state, "kafka_startup", None)
+    if kafka_startup is not None:
+        kafka_startup.cancel()
+        await asyncio.gather(kafka_startup, return_exceptions=True)
+    await kafka_replies.stop()
+    await kafka_producer.stop()
 logger.info("Telelemetry initialized")
@@ -65,6 +65,8 @@ class StreamingSignalsEnum(Enum):
     END = "END"
     TOOL_END = "TOOL_END"
     LLM_END = "LLM_END"
+    NODE_END = "NODE_END"
+    ERROR = "ERROR"
 
 
 class SSEResponse(BaseModel):
@@ -138,6 +140,7 @@ class InputState(TypedDict):
     main_topics_group: Optional[List[str]]
     room_suggestion: Optional[dict]
     final_analysis: Optional[dict]
+    batch_summary: Optional[dict]
     error: Optional[str]
     user_query: Optional[str]
 
@@ -205,6 +208,29 @@ class TopicSuggestionsRequest(BaseModel):
 
     class Config:
         populate_by_name = True
+
+
+
+class BulkTopicSuggestionsRequest(BaseModel):
+    """
+    Request model to generate topic suggestions for many rooms at once.
+
+    Attributes:
+        requests (List[TopicSuggestionsRequest]): One topic-suggestion request per room.
+    """
+
+    requests: Annotated[
+        List[TopicSuggestionsRequest],
+        Field(
+            min_items=1,
+            max_items=settings.TOPIC_SUGGESTIONS_BULK_MAX_ITEMS,
+            alias="requests",
+            description="Topic-suggestion requests, processed concurrently"
+        )
+    ]
+
+    class Config:
+        populate_by_name = True
         
         
 class MessageSuggestionsRequest(BaseModel):
@@ -3,7 +3,7 @@ from typing import Any, Dict, List
 from core.logging_config import get_logger
 from services.agent.nodes.base import NodeAbstractClass
 from schemas.message import Message
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 
 logger = get_logger(__name__)
 
@@ -18,8 +18,10 @@ class AnalyzeMainTopicNode(NodeAbstractClass):
             logger.warning("No historical messages found to analyze topic.")
             return {"main_topic": "General"}
         history = "\n".join([f"{msg.sender}: {msg.content}" for msg in messages])
-        prompt_template = await compile_prompt(
+        prompt_template = await compile_prompt_within_budget(
             "analyze_main_topic_from_history",
+            self.llm_manager.models,
+            trim={"chat_history": "end"},
             chat_history=history
         )
         try:
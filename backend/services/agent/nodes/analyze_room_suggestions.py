@@ -3,7 +3,7 @@ from typing import Any, Dict, List
 from collections import Counter
 from core.logging_config import get_logger
 from services.agent.nodes.base import NodeAbstractClass
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 from services.document_extractor import PostgresDocumentExtractor
 
 logger = get_logger(__name__)
@@ -17,60 +17,79 @@ class AnalyzeRoomSuggestionsNode(NodeAbstractClass):
         
         db_extractor = None
         try:
-            db_extractor = PostgresDocumentExtractor()
-            # Fetch all records from the rooms_management table
-            all_suggestions = db_extractor.get_recent_documents(
-                database_name="siscom",
-                table_name="rooms_management",
-                limit=1000 # A reasonable limit to prevent pulling too much data
-            )
+            batch_summary = state.get("batch_summary")
+            if batch_summary:
+                # Totals aggregated by the consumer while the batch's rooms
+                # completed: no need to read the suggestions back.
+                rooms = batch_summary.get("rooms", [])
+                all_frequent_words = Counter(batch_summary.get("frequent_words", {}))
+                all_frequent_emojis = Counter(batch_summary.get("frequent_emojis", {}))
+                all_frequent_hashtags = Counter(batch_summary.get("frequent_hashtags", {}))
+                all_mentioned_users = Counter(batch_summary.get("mentioned_users", {}))
+            else:
+                db_extractor = PostgresDocumentExtractor()
+                # Fetch all records from the rooms_management table
+                all_suggestions = db_extractor.get_recent_documents(
+                    database_name="siscom",
+                    table_name="rooms_management",
+                    limit=1000 # A reasonable limit to prevent pulling too much data
+                )
 
-            
-            if not all_suggestions:
-                logger.warning("No room suggestions found in the database to analyze.")
-                return {"final_analysis": None, "error": "No suggestions found to analyze."}
+                if not all_suggestions:
+                    logger.warning("No room suggestions found in the database to analyze.")
+                    return {"final_analysis": None, "error": "No suggestions found to analyze."}
 
-            # Initialize counters for global statistics
-            all_frequent_words = Counter()
-            all_frequent_emojis = Counter()
-            all_frequent_hashtags = Counter()
-            all_mentioned_users = Counter()
+                # Initialize counters for global statistics
+                all_frequent_words = Counter()
+                all_frequent_emojis = Counter()
+                all_frequent_hashtags = Counter()
+                all_mentioned_users = Counter()
 
-            # Format the suggestions for the prompt
-            suggestions_context = []
-            for suggestion in all_suggestions:
-                # Safely parse JSON fields
-                try:
-                    topics_suggested = suggestion.get("topics_suggested", "[]")
-                    main_topics = suggestion.get("main_topics_discussed", "[]")
-                    frequent_words = suggestion.get("frequent_words", "{}")
-                    frequent_emojis = suggestion.get("frequent_emojis", "{}")
-                    frequent_hashtags = suggestion.get("frequent_hashtags", "{}")
-                    mentioned_users = suggestion.get("frequent_mentions", "{}")
-                except (json.JSONDecodeError, TypeError):
-                    topics_suggested = []
-                    main_topics = []
-                    frequent_words = {}
-                    frequent_emojis = {}
-                    frequent_hashtags = {}
-                    mentioned_users = {}
+                rooms = []
+                for suggestion in all_suggestions:
+                    # Safely parse JSON fields
+                    try:
+                        topics_suggested = suggestion.get("topics_suggested", "[]")
+                        main_topics = suggestion.get("main_topics_discussed", "[]")
+                        frequent_words = suggestion.get("frequent_words", "{}")
+                        frequent_emojis = suggestion.get("frequent_emojis", "{}")
+                        frequent_hashtags = suggestion.get("frequent_hashtags", "{}")
+                        mentioned_users = suggestion.get("frequent_mentions", "{}")
+                    except (json.JSONDecodeError, TypeError):
+                        topics_suggested = []
+                        main_topics = []
+                        frequent_words = {}
+                        frequent_emojis = {}
+                        frequent_hashtags = {}
+                        mentioned_users = {}
 
-                # Update global counters
-                all_frequent_words.update(frequent_words)
-                all_frequent_emojis.update(frequent_emojis)
-                all_frequent_hashtags.update(frequent_hashtags)
-                all_mentioned_users.update(mentioned_users)
+                    # Update global counters
+                    all_frequent_words.update(frequent_words)
+                    all_frequent_emojis.update(frequent_emojis)
+                    all_frequent_hashtags.update(frequent_hashtags)
+                    all_mentioned_users.update(mentioned_users)
 
-                suggestions_context.append(
-                    f"Analysis for Room ID: {suggestion.get('id')}\n"
-                    f"Room Statistics:\n"
-                    f"- Main Discussed Topics In the Group: {', '.join(main_topics)}\n"
-                    f"- Frequent Words In the Group: {', '.join(list(frequent_words.keys())[:20])}\n\n" # Top 10 words
-                    f"Room Suggestion Details from room information:\n"
-                    f"- Suggested Name: {suggestion.get('room_name_suggested')}\n"
-                    f"- Suggested Topics: {', '.join(topics_suggested)}\n"
-                    f"- Justification: {suggestion.get('justification')}\n"
-                )
+                    rooms.append({
+                        "room_id": suggestion.get("id"),
+                        "main_topics": main_topics,
+                        "frequent_words": frequent_words,
+                        "room_name_suggested": suggestion.get("room_name_suggested"),
+                        "topics_suggested": topics_suggested,
+                        "justification": suggestion.get("justification"),
+                    })
+
+            # Format the suggestions for the prompt
+            suggestions_context = [
+                f"Analysis for Room ID: {room.get('room_id')}\n"
+                f"Room Statistics:\n"
+                f"- Main Discussed Topics In the Group: {', '.join(room.get('main_topics', []))}\n"
+                f"- Frequent Words In the Group: {', '.join(list(room.get('frequent_words', {}))[:20])}\n\n" # Top 10 words
+                f"Room Suggestion Details from room information:\n"
+                f"- Suggested Name: {room.get('room_name_suggested')}\n"
+                f"- Suggested Topics: {', '.join(room.get('topics_suggested', []))}\n"
+                f"- Justification: {room.get('justification')}\n"
+                for room in rooms
+            ]
 
             full_context = "\n\n\n".join(suggestions_context)
 
@@ -80,8 +99,10 @@ class AnalyzeRoomSuggestionsNode(NodeAbstractClass):
             top_hashtags = {tag: count for tag, count in all_frequent_hashtags.most_common(20)}
             top_users = {user: count for user, count in all_mentioned_users.most_common(20)}
 
-            prompt_template = await compile_prompt(
+            prompt_template = await compile_prompt_within_budget(
                 "analyze_multiple_room_suggestions",
+                self.llm_manager.models,
+                trim={"suggestions_analysis_context": "start"},
                 suggestions_analysis_context=full_context,
                 frequent_words=", ".join(top_words.keys()),
                 frequent_emojis=", ".join(top_emojis.keys()),
@@ -5,7 +5,7 @@ from core.logging_config import get_logger
 from services.agent.nodes.base import NodeAbstractClass
 from schemas.agent import RoomsCreated
 from schemas.message import Message
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 from services.document_extractor import PostgresDocumentExtractor
 
 logger = get_logger(__name__)
@@ -34,8 +34,10 @@ class GenerateRoomSuggestionNode(NodeAbstractClass):
             room_strs = [f"Name: {room.room_name}, Description: {room.room_description}, Topics: {', '.join(room.room_topics)}" for room in rooms_created]
             rooms_created_str = "\n".join(room_strs)
 
-        prompt_template = await compile_prompt(
+        prompt_template = await compile_prompt_within_budget(
             "generate_room_suggestion_from_analysis",
+            self.llm_manager.models,
+            trim={"history_messages": "end"},
             main_topic=main_topic,
             frequent_words=", ".join(frequent_words),
             frequent_emojis=", ".join(frequent_emojis),
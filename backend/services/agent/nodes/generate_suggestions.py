@@ -6,7 +6,7 @@ from services.agent.nodes.base import NodeAbstractClass
 from schemas.message import Message
 from schemas.room_info import AgentInfo
 
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 
 logger = get_logger(__name__)
 
@@ -43,8 +43,10 @@ class GenerateTopicSuggestionsNode(NodeAbstractClass):
             return {"suggestions": []}
 
         # Compile prompt to determine decision
-        prompt_template = await compile_prompt(
+        prompt_template = await compile_prompt_within_budget(
             "group_topic_suggester",
+            self.llm_manager.models,
+            trim={"history_messages": "end"},
             group_topics=", ".join(topics),
             previous_suggested_topics="",
             history_messages=historical_messages
@@ -20,7 +20,12 @@ class GetRoomInfoNode(NodeAbstractClass):
 
         It retrieves the `room_id` from the state, calls the `get_chat_info` tool,
         and stores the returned RoomData object in the 'room_details' key of the state.
+        Room details already present in the initial state (e.g. fetched once
+        for several requests of the same room) are used as they are.
         """
+        if state.get("room_details") is not None:
+            return {"room_details": state["room_details"]}
+
         logger.info("---FETCHING ROOM INFORMATION---")
         room_id = state.get("room_id")
 
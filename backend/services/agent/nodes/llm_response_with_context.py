@@ -11,7 +11,7 @@ from schemas.agent import (
     StreamingSignalsEnum,
 )
 from conf import settings
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 logger = get_logger(__name__)
 
 class LLMResponseWithContextNode(NodeAbstractClass):
@@ -105,8 +105,16 @@ class LLMResponseWithContextNode(NodeAbstractClass):
         messages = state.get("messages", [])
         messages_bot = "\n\n".join([f"{msg.sender} ({msg.role}): {msg.content}" for msg in messages if msg.role == "assistant"])
 
-        prompt_template = await compile_prompt(
+        # Lowest-priority context first: trimmed only as much as needed to fit the model.
+        prompt_template = await compile_prompt_within_budget(
                 "chatgroup_conversational_agent",
+                self.llm_manager.models,
+                trim={
+                    "additional_context": "start",
+                    "latest_news_summary": "end",
+                    "question_answer_summary": "end",
+                    "last_agent_responses": "end",
+                },
                 current_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 chat_name=state.get("room_name", ""),
                 chat_description=state.get("chat_description", ""),
@@ -121,52 +129,10 @@ class LLMResponseWithContextNode(NodeAbstractClass):
         
 
         try:
-            try:
-                response = await self.llm_manager.ainvoke(
-                    prompt_template,
-                    config=config,
-                )
-            except:
-                try:
-                    prompt_template = await compile_prompt(
-                        "chatgroup_conversational_agent",
-                        current_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        chat_name=state.get("room_name", ""),
-                        chat_description=state.get("chat_description", ""),
-                        topics=state.get("topics", ""),
-                        additional_context="",
-                        conversation_summary=state.get("conversation_summary", ""),
-                        latest_news_summary="\n📌".join(latest_news_summary.split('\n📌')[2:]),
-                        question_answer_summary="\n\n".join(question_answer_summary.split('\n\n')[5:]),
-                        last_agent_responses=messages_bot
-                        # original_question=state.get("question", ""),
-                    )
-
-                    response = await self.llm_manager.ainvoke(
-                        prompt_template,
-                        config=config,
-                    )
-                except:
-                    prompt_template = await compile_prompt(
-                        "chatgroup_conversational_agent",
-                        current_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        chat_name=state.get("room_name", ""),
-                        chat_description=state.get("chat_description", ""),
-                        topics=state.get("topics", ""),
-                        additional_context="",
-                        conversation_summary=state.get("conversation_summary", ""),
-                        latest_news_summary="\n📌".join(latest_news_summary.split('\n📌')[2:]),
-                        question_answer_summary="\n\n".join(question_answer_summary.split('\n\n')[5:]),
-                        last_agent_responses="The assistant messages is in 'conversation_summary'"
-                        # original_question=state.get("question", ""),
-                    )
-
-                    
-
-                    response = await self.llm_manager.ainvoke(
-                        prompt_template,
-                        config=config,
-                    )
+            response = await self.llm_manager.ainvoke(
+                prompt_template,
+                config=config,
+            )
 
             try:
                 extractor = PostgresDocumentExtractor()
@@ -186,8 +152,10 @@ class LLMResponseWithContextNode(NodeAbstractClass):
 
             
             # Response Refiner
-            prompt_template = await compile_prompt(
+            prompt_template = await compile_prompt_within_budget(
                 "AgentResponseRefiner",
+                self.llm_manager.models,
+                trim={"relevant_news_topics": "end", "last_agent_responses": "end"},
                 agent_response=response,
                 last_agent_responses=messages_bot,
                 max_topics=random.choice([1, 2]),  
@@ -86,7 +86,7 @@ class OrchestrationNode(NodeAbstractClass):
         for attempt in range(max_retries):
             try:
                 logger.info(f"Orchestration attempt {attempt + 1}/{max_retries}")
-                decision = await self.llm_manager.ainvoke(prompt=prompt_template)
+                decision = await self.llm_manager.ainvoke(prompt=prompt_template, use_cache=attempt == 0)
                 
                 logger.info(f"Orchestrator response: {decision}")
 
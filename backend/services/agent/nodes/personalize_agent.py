@@ -146,7 +146,8 @@ class PersonalizeNode(NodeAbstractClass):
                         last_error = f"tool-agent: {e}"
                         logger.warning(f"Tool-agent attempt {attempt} failed: {e}")
 
-                direct_raw = await self.llm_manager.ainvoke(prompt=prompt_template)
+                # Retries skip the cache: a cached answer would be rejected again.
+                direct_raw = await self.llm_manager.ainvoke(prompt=prompt_template, use_cache=attempt == 1)
                 logger.info(
                     f"\n\nRaw response from direct LLM (attempt {attempt}): {direct_raw}\n\n"
                 )
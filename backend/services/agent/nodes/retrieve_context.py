@@ -4,7 +4,7 @@ from core.logging_config import get_logger
 from services.agent.nodes.base import NodeAbstractClass
 from services.llm_manager import LLMManager
 from services.vectorstore_manager import VectorStoreManager
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 from utils.helpers import clean_text
 
 logger = get_logger(__name__)
@@ -110,8 +110,10 @@ class RetrieveContextNode(NodeAbstractClass):
             context_live_stream += "\n\n</live_stream_data>"
 
             # Extract messages related to the topics
-            prompt_template = await compile_prompt(
+            prompt_template = await compile_prompt_within_budget(
                 "filter_relevant_news",
+                self.llm_manager.models,
+                trim={"list_messages": "start"},
                 topics=", ".join(topics),
                 list_messages=context_news
             )
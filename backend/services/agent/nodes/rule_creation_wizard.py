@@ -40,7 +40,8 @@ class RuleCreationWizardNode(NodeAbstractClass):
         for attempt in range(3):
             try:
                 rule_creation_result = await self.llm_manager.ainvoke(
-                    prompt=prompt_template
+                    prompt=prompt_template,
+                    use_cache=attempt == 0,
                 )
                 try:
                     rule_creation_result_ = rule_creation_result.strip('`').split('\n', 1)[1].rsplit('\n', 1)[0]
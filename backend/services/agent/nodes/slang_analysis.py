@@ -9,7 +9,7 @@ from services.agent.nodes.base import NodeAbstractClass
 from services.agent.tools.scraping_page import scrape_text_from_urls
 from services.agent.tools.search_google import get_country_slang
 from services.document_extractor import PostgresDocumentExtractor
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 
 logger = get_logger(__name__)
 
@@ -85,8 +85,10 @@ class SlangAnalysisNode(NodeAbstractClass):
             )
 
         # Step 4: Analyze the content with a specialized LLM prompt.
-        analysis_prompt = await compile_prompt(
+        analysis_prompt = await compile_prompt_within_budget(
             "analyze_scraped_slang_content",
+            self.llm_manager.models,
+            trim={"scraped_content": "start"},
             country=country,
             scraped_content=scraped_content,
         )
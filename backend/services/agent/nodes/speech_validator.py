@@ -1,7 +1,13 @@
 from typing import Any, Dict, List
 
 from core.logging_config import get_logger
+from schemas.agent import (
+    SSEResponse,
+    StreamingDataTypeEnum,
+    StreamingSignalsEnum,
+)
 from services.agent.nodes.base import NodeAbstractClass
+from utils.agent import remove_think_content
 from utils.get_prompts import compile_prompt
 
 logger = get_logger(__name__)
@@ -17,6 +23,10 @@ class SpeechValidatorNode(NodeAbstractClass):
         """
         Refines the agent's response to match its personality.
 
+        This is the last node generating text, so when the workflow is
+        streamed (a 'stream_handler' is in the state) its tokens are pushed
+        to the client as they are produced.
+
         Args:
             state: Dictionary with keys 'answer', 'room_details', and 'agent_id_executed'.
 
@@ -95,7 +105,26 @@ class SpeechValidatorNode(NodeAbstractClass):
                 previous_answers=previous_messages_agent,
             )
 
-            refined_answer = await self.llm_manager.ainvoke(prompt=prompt_template)
+            stream_handler = state.get("stream_handler")
+            if stream_handler is None:
+                refined_answer = await self.llm_manager.ainvoke(prompt=prompt_template)
+            else:
+                refined_answer = ""
+                async for token in self.llm_manager.astream(prompt=prompt_template):
+                    await stream_handler.queue.put(
+                        SSEResponse(
+                            dataType=StreamingDataTypeEnum.LLM,
+                            data=token,
+                        )
+                    )
+                    refined_answer += token
+                await stream_handler.queue.put(
+                    SSEResponse(
+                        data=StreamingSignalsEnum.LLM_END.value,
+                        dataType=StreamingDataTypeEnum.SIGNAL,
+                    )
+                )
+                refined_answer = remove_think_content(refined_answer)
             refined_answer = refined_answer.replace("pa'", "pa").replace("Pa'", "pa").replace("¿", "").strip()
             logger.info(f"Refined Answer: {refined_answer}")
             return {"answer": refined_answer.strip()}
@@ -4,7 +4,7 @@ from core.logging_config import get_logger
 from langchain_core.prompts import ChatPromptTemplate
 from services.agent.nodes.base import NodeAbstractClass
 from schemas.message import Message
-from utils.get_prompts import compile_prompt
+from utils.get_prompts import compile_prompt_within_budget
 
 logger = get_logger(__name__)
 
@@ -49,8 +49,10 @@ class SummarizeConversationNode(NodeAbstractClass):
         except:
             history = "\n".join(f"- {msg.sender}: {msg.content}" for msg in messages)
 
-        prompt_template = await compile_prompt(
+        prompt_template = await compile_prompt_within_budget(
             "summarize_chat_history",
+            self.llm_manager.models,
+            trim={"chat_history": "end"},
             chat_history=history,
         )
 
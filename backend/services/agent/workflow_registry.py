@@ -0,0 +1,92 @@
+import asyncio
+from typing import Callable, Dict, Tuple
+
+from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
+
+from conf import settings
+from core.logging_config import get_logger
+from services.agent.multi_agents import MultiAgents
+
+logger = get_logger(__name__)
+
+WORKFLOW_BUILDERS: Dict[str, Callable[[MultiAgents], StateGraph]] = {
+    "chat": MultiAgents.create_workflow,
+    "suggestions": MultiAgents.create_suggestions_workflow,
+    "message_suggestions": MultiAgents.create_message_suggestions_workflow,
+    "room_suggestions": MultiAgents.create_room_suggestions_workflow,
+    "final_room_analysis": MultiAgents.create_final_room_analysis_workflow,
+    "rule_creation_wizard": MultiAgents.rule_creation_wizard_workflow,
+}
+
+
+class WorkflowRegistry:
+    """
+    Process-wide cache of compiled LangGraph workflows.
+
+    The `MultiAgents` instance (LLM manager, node instances and guardrails)
+    and every compiled graph are built once per model and shared by all
+    requests handled by the process. Nodes keep no per-request state, so a
+    compiled graph can safely serve concurrent invocations.
+    """
+
+    def __init__(self) -> None:
+        self._agents: Dict[str, MultiAgents] = {}
+        self._workflows: Dict[Tuple[str, str], CompiledStateGraph] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_agent(self, model_name: str = settings.LLM_MODEL_NAME) -> MultiAgents:
+        """
+        Returns the shared MultiAgents instance for a model, creating it once.
+        """
+        if model_name not in self._agents:
+            async with self._lock:
+                if model_name not in self._agents:
+                    self._agents[model_name] = await MultiAgents.create(model_name)
+        return self._agents[model_name]
+
+    async def get(self, name: str, model_name: str = settings.LLM_MODEL_NAME) -> CompiledStateGraph:
+        """
+        Returns the compiled workflow registered under `name`.
+
+        Args:
+            name: One of the keys of `WORKFLOW_BUILDERS`.
+            model_name: LLM used by the workflow nodes.
+
+        Raises:
+            KeyError: If no workflow is registered under `name`.
+        """
+        key = (model_name, name)
+        workflow = self._workflows.get(key)
+        if workflow is not None:
+            return workflow
+
+        builder = WORKFLOW_BUILDERS[name]
+        agent = await self.get_agent(model_name)
+        workflow = self._workflows.setdefault(key, builder(agent).compile())
+        return workflow
+
+    def override(self, name: str, workflow, model_name: str = settings.LLM_MODEL_NAME) -> None:
+        """
+        Serves `workflow` instead of the compiled graph registered as `name`.
+
+        Used by offline tools (e.g. the consumer replay harness) to swap the
+        real graphs for stand-ins exposing the same `ainvoke` interface.
+        """
+        self._workflows[(model_name, name)] = workflow
+
+    async def warm_up(self, model_name: str = settings.LLM_MODEL_NAME) -> None:
+        """
+        Builds every registered workflow so the first requests do not pay for it.
+        """
+        for name in WORKFLOW_BUILDERS:
+            await self.get(name, model_name)
+        logger.info(f"Compiled {len(WORKFLOW_BUILDERS)} workflows for model {model_name}")
+
+    def clear(self) -> None:
+        """Drops every cached agent and workflow."""
+        self._agents.clear()
+        self._workflows.clear()
+
+
+workflow_registry = WorkflowRegistry()
@@ -0,0 +1,102 @@
+from typing import Optional, Sequence, Tuple
+
+from aiokafka import AIOKafkaProducer
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def message_key(topic: str, data: dict) -> Optional[bytes]:
+    """
+    Partitioning key of a request published to one of the consumer topics.
+
+    Chat requests are keyed by room, so the requests of a room share a
+    partition and are consumed in the order they were produced; the
+    consumer's per-room ordering and burst coalescing rely on it. Room
+    suggestions are keyed by batch, so the process aggregating a batch
+    receives all of its rooms. Other messages are spread freely.
+    """
+    if topic == settings.KAFKA_AGENT_TOPIC:
+        key = data.get("room_id")
+    elif topic == settings.KAFKA_ROOM_SUGGESTION_TOPIC:
+        key = data.get("uuid")
+    else:
+        key = None
+    return key.encode("utf-8") if key else None
+
+
+def create_kafka_producer() -> AIOKafkaProducer:
+    """
+    Creates a producer with the configured batching and compression.
+
+    `linger_ms` lets concurrent sends share a batch, and batches are
+    compressed as a whole, so small JSON payloads cost far fewer requests
+    and bytes on the wire.
+    """
+    return AIOKafkaProducer(
+        bootstrap_servers=settings.KAFKA_BROKER_URL,
+        linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+        max_batch_size=settings.KAFKA_PRODUCER_MAX_BATCH_SIZE,
+        compression_type=settings.KAFKA_PRODUCER_COMPRESSION or None,
+    )
+
+
+class KafkaProducerManager:
+    """
+    Process-wide Kafka producer shared by every API route.
+
+    Started once with the application and stopped on shutdown, so requests
+    reuse its broker connections and metadata instead of paying a full
+    handshake per call. The application only starts it when `KAFKA_ENABLED`
+    is set; until then `started` is False and `send` raises.
+    """
+
+    def __init__(self) -> None:
+        self._producer: Optional[AIOKafkaProducer] = None
+
+    @property
+    def started(self) -> bool:
+        return self._producer is not None
+
+    async def start(self) -> None:
+        """Connects the shared producer."""
+        if self._producer is not None:
+            return
+        producer = create_kafka_producer()
+        await producer.start()
+        self._producer = producer
+        logger.info(f"Kafka producer connected to {settings.KAFKA_BROKER_URL}")
+
+    async def stop(self) -> None:
+        """Flushes pending batches and disconnects the shared producer."""
+        if self._producer is None:
+            return
+        producer, self._producer = self._producer, None
+        await producer.stop()
+        logger.info("Kafka producer stopped")
+
+    async def send(
+        self,
+        topic: str,
+        value: bytes,
+        key: Optional[bytes] = None,
+        headers: Optional[Sequence[Tuple[str, bytes]]] = None,
+    ):
+        """
+        Sends a message and waits for the broker acknowledgement.
+
+        Raises:
+            RuntimeError: If the producer has not been started.
+        """
+        if self._producer is None:
+            raise RuntimeError("Kafka producer is not started")
+        return await self._producer.send_and_wait(topic, value, key=key, headers=headers)
+
+    def is_healthy(self) -> bool:
+        """True when the producer is started and knows at least one broker."""
+        return self._producer is not None and bool(self._producer.client.cluster.brokers())
+
+
+kafka_producer = KafkaProducerManager()
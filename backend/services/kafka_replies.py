@@ -0,0 +1,175 @@
+import asyncio
+import os
+import socket
+import uuid
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from conf import settings
+from core.logging_config import get_logger
+from utils import serialization
+from utils.shared_state import pending_responses
+
+logger = get_logger(__name__)
+
+Headers = Sequence[Tuple[str, bytes]]
+ReplyAddress = Tuple[str, Optional[int], str]
+
+REPLY_TO_HEADER = "x-reply-to"
+REPLY_PARTITION_HEADER = "x-reply-partition"
+CORRELATION_ID_HEADER = "x-correlation-id"
+
+
+def reply_headers(reply_to: str, partition: int, correlation_id: str) -> List[Tuple[str, bytes]]:
+    """Headers asking the consumer to reply on `reply_to`/`partition` instead of the webhook."""
+    return [
+        (REPLY_TO_HEADER, reply_to.encode("utf-8")),
+        (REPLY_PARTITION_HEADER, str(partition).encode("utf-8")),
+        (CORRELATION_ID_HEADER, correlation_id.encode("utf-8")),
+    ]
+
+
+def get_reply_address(headers: Optional[Headers]) -> Optional[ReplyAddress]:
+    """Return the (reply topic, partition, correlation id) of a request, or None if no reply is awaited."""
+    values = {key: value.decode("utf-8") for key, value in headers or () if value is not None}
+    reply_to, correlation_id = values.get(REPLY_TO_HEADER), values.get(CORRELATION_ID_HEADER)
+    if not (reply_to and correlation_id):
+        return None
+    partition = values.get(REPLY_PARTITION_HEADER)
+    return reply_to, int(partition) if partition and partition.isdigit() else None, correlation_id
+
+
+async def send_reply(producer, address: ReplyAddress, body: Dict) -> None:
+    """
+    Publishes a workflow result to the process awaiting it.
+
+    Args:
+        producer: Started producer exposing aiokafka's `send_and_wait`.
+        address: (reply topic, partition, correlation id) of the request.
+        body: JSON-serializable reply.
+    """
+    reply_to, partition, correlation_id = address
+    await producer.send_and_wait(
+        reply_to,
+        serialization.dumps(body),
+        partition=partition,
+        headers=[(CORRELATION_ID_HEADER, correlation_id.encode("utf-8"))],
+    )
+
+
+def process_partition(num_partitions: int) -> int:
+    """Partition of the reply topic read by this API process."""
+    instance = f"{socket.gethostname()}-{os.getpid()}"
+    return zlib.crc32(instance.encode("utf-8")) % num_partitions
+
+
+class KafkaReplyListener:
+    """
+    Receives the workflow results awaited by this API process.
+
+    All processes share the pre-provisioned `KAFKA_AGENT_RESPONSE_TOPIC`.
+    Each reads one partition of it, picked from its host and pid, without a
+    consumer group. Requests name that partition and a correlation id in
+    their headers, so a reply always reaches the process holding the
+    matching future in `pending_responses`. Processes sharing a partition
+    read each other's replies and ignore the correlation ids they do not
+    know. Nothing is created or left behind per process.
+    """
+
+    def __init__(self) -> None:
+        self.topic = settings.KAFKA_AGENT_RESPONSE_TOPIC
+        self.partition: Optional[int] = None
+        self._consumer: Optional[AIOKafkaConsumer] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self._consumer is not None
+
+    async def start(self) -> None:
+        """
+        Starts listening on this process's partition of the reply topic.
+
+        Raises:
+            RuntimeError: If the reply topic does not exist.
+        """
+        if self._consumer is not None:
+            return
+
+        consumer = AIOKafkaConsumer(
+            bootstrap_servers=settings.KAFKA_BROKER_URL,
+            enable_auto_commit=False,
+            auto_offset_reset="latest",
+        )
+        await consumer.start()
+        try:
+            if self.topic not in await consumer.topics():
+                raise RuntimeError(f"Reply topic {self.topic} does not exist")
+            partitions = consumer.partitions_for_topic(self.topic)
+            partition = process_partition(len(partitions))
+            consumer.assign([TopicPartition(self.topic, partition)])
+        except BaseException:
+            await consumer.stop()
+            raise
+
+        self.partition = partition
+        self._consumer = consumer
+        self._task = asyncio.create_task(self._listen())
+        logger.info(f"Listening for workflow replies on {self.topic}[{partition}]")
+
+    async def stop(self) -> None:
+        """Stops listening and fails the pending requests."""
+        if self._consumer is None:
+            return
+        consumer, self._consumer = self._consumer, None
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await consumer.stop()
+
+        for future in pending_responses.values():
+            if not future.done():
+                future.cancel()
+        pending_responses.clear()
+        logger.info("Kafka reply listener stopped")
+
+    def expect(self) -> Tuple[str, "asyncio.Future[Dict]"]:
+        """
+        Registers a new awaited reply.
+
+        Must be called before the request is sent, so a fast reply cannot
+        arrive before its future exists.
+
+        Returns:
+            The correlation id to send with the request, and the future
+            resolved with the reply body.
+
+        Raises:
+            RuntimeError: If the listener has not been started.
+        """
+        if self._consumer is None:
+            raise RuntimeError("Kafka reply listener is not started")
+        correlation_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        pending_responses[correlation_id] = future
+        return correlation_id, future
+
+    def discard(self, correlation_id: str) -> None:
+        """Forgets an awaited reply, e.g. once its caller timed out."""
+        pending_responses.pop(correlation_id, None)
+
+    async def _listen(self) -> None:
+        async for msg in self._consumer:
+            try:
+                correlation_id = (dict(msg.headers or ()).get(CORRELATION_ID_HEADER) or b"").decode("utf-8")
+                future = pending_responses.pop(correlation_id, None)
+                if future is None:
+                    logger.debug(f"Dropping reply {correlation_id or '<none>'}: nobody is waiting for it.")
+                elif not future.done():
+                    future.set_result(serialization.loads(msg.value))
+            except Exception as e:
+                logger.error(f"Error processing workflow reply: {e}")
+
+
+kafka_replies = KafkaReplyListener()
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def llm_cache_key(model_name: str, messages: Sequence[Any], params: Dict[str, Any]) -> str:
+    """
+    Builds the cache key of an LLM call.
+
+    The key covers the model, every formatted message (role and content)
+    and the decoding parameters, so only calls sending exactly the same
+    request to the provider share an entry.
+    """
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "messages": [(getattr(m, "type", ""), getattr(m, "content", m)) for m in messages],
+            "params": params,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return f"llm:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class LLMResponseCache(ABC):
+    """
+    Exact-match cache of LLM responses.
+
+    Entries expire after `ttl` seconds. Lookups never raise: a failing
+    backend behaves like a miss, so the cache can only save calls.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response of `key`, or None on a miss."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        """Store the response of `key`."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release any resource held by the cache."""
+        return None
+
+
+class InMemoryLLMCache(LLMResponseCache):
+    """
+    LRU of responses with a TTL, local to the process.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1000) -> None:
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class SQLiteLLMCache(LLMResponseCache):
+    """
+    Responses persisted in a local SQLite file, fronted by an in-process LRU.
+
+    Shared by the processes of a host (API workers and consumer pool) and
+    kept across restarts. The least recently used rows beyond `max_size`
+    are pruned on write.
+    """
+
+    def __init__(self, path: str, ttl: float, max_size: int = 1000) -> None:
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._front = InMemoryLLMCache(ttl, min(max_size, 1000))
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _select(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return row[0] if row else None
+
+    def _insert(self, key: str, value: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + self.ttl, now),
+        )
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+        self._conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._front.get(key)
+        if value is not None:
+            return value
+        try:
+            async with self._lock:
+                value = await asyncio.to_thread(self._select, key)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        if value is not None:
+            await self._front.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await self._front.set(key, value)
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._insert, key, value)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class RedisLLMCache(LLMResponseCache):
+    """
+    Responses stored in Redis, shared by every process and host.
+
+    Entries expire with the Redis TTL; LRU eviction is left to the server
+    (configure `maxmemory` with the `allkeys-lru` policy).
+    """
+
+    def __init__(self, url: str, ttl: float) -> None:
+        super().__init__(ttl)
+        from redis import asyncio as aioredis
+
+        self._client = aioredis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self._client.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self._client.set(key, value, ex=max(int(self.ttl), 1))
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the process-wide LLM response cache selected by
+    `LLM_CACHE_BACKEND`, or None when `LLM_CACHE_ENABLED` is off.
+    """
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        backend = settings.LLM_CACHE_BACKEND
+        ttl = settings.LLM_CACHE_TTL_SECONDS
+        max_size = settings.LLM_CACHE_MAX_ENTRIES
+
+        if backend == "sqlite":
+            _llm_cache = SQLiteLLMCache(settings.LLM_CACHE_SQLITE_PATH, ttl, max_size)
+        elif backend == "redis":
+            _llm_cache = RedisLLMCache(settings.LLM_CACHE_REDIS_URL, ttl)
+        else:
+            if backend != "memory":
+                logger.warning(f"Unknown LLM cache backend '{backend}'. Using in-memory cache.")
+            _llm_cache = InMemoryLLMCache(ttl, max_size)
+    return _llm_cache
@@ -3,6 +3,11 @@ from langchain_core.prompts import ChatPromptTemplate
 
 from conf import settings
 from core.logging_config import get_logger
+from core.metrics_config import LLM_CACHE_REQUESTS, LLM_SEMANTIC_CACHE_REQUESTS
+from services.llm_cache import LLMResponseCache, get_llm_cache, llm_cache_key
+from services.llm_rate_limiter import estimate_tokens, get_llm_governor, response_total_tokens
+from services.llm_router import route, timed
+from services.llm_semantic_cache import get_semantic_llm_cache, prompt_section, semantic_cache_scope
 from utils.agent import remove_think_content
 
 logger = get_logger(__name__)
@@ -12,45 +17,171 @@ class LLMManager:
     Manager for interacting with a language model via ChatLiteLLM.
 
     Formats prompts, invokes the model asynchronously, and cleans responses.
+    Responses can be served from an exact-match cache (see `LLM_CACHE_*`)
+    and, for the prompts it is enabled on, from a semantic cache matching
+    near-duplicate prompts (see `LLM_SEMANTIC_CACHE_*`). Provider calls are
+    admitted by the rate limiter of the model's provider (see
+    `LLM_RATE_LIMIT_*`). With fallback models, calls are routed in order:
+    a failing model falls back to the next one at once, and a model slower
+    than its p95 latency gets a hedged duplicate on the next one.
     """
 
-    def __init__(self, model_name: str = settings.LLM_MODEL_NAME) -> None:
+    def __init__(
+        self,
+        model_name: str = settings.LLM_MODEL_NAME,
+        cache: LLMResponseCache | None = None,
+        fallback_models: list[str] | None = None,
+    ) -> None:
         """
         Initialize LLMManager with the specified model name.
 
         Args:
             model_name: Identifier of the LLM to use.
+            cache: Response cache; defaults to the process-wide cache, if enabled.
+            fallback_models: Models to fall back to, in order; defaults to
+                `LLM_FALLBACK_MODELS`.
         """
         self.model_name = model_name
-        self.llm = ChatLiteLLM(model=model_name)
+        if fallback_models is None:
+            fallback_models = settings.LLM_FALLBACK_MODELS
+        self.models = [model_name, *(name for name in dict.fromkeys(fallback_models) if name != model_name)]
+        self.llms = {name: ChatLiteLLM(model=name) for name in self.models}
+        self.llm = self.llms[model_name]
+        self.governors = {name: get_llm_governor(name) for name in self.models}
+        self.cache = cache if cache is not None else get_llm_cache()
+
+    async def estimate_tokens(self, model_name: str, messages: list, prompt_tokens: int | None = None) -> int:
+        """Tokens a call is expected to consume, for the rate limiter."""
+        max_tokens = getattr(self.llms[model_name], "max_tokens", None)
+        return await estimate_tokens(
+            model_name, messages, max_tokens or settings.LLM_RATE_LIMIT_COMPLETION_TOKENS, prompt_tokens
+        )
+
+    @staticmethod
+    def _format_for(model_name: str, response_format: dict | None) -> dict | None:
+        """
+        The `json` response format is only passed to Ollama models; the
+        other providers, and any other format, get None.
+        """
+        if (
+            model_name.startswith("ollama")
+            and "/" in model_name
+            and response_format == "json"
+        ):
+            logger.info(f"Using JSON object response format for model: {model_name}")
+            return response_format
+        return None
+
+    async def _invoke_model(
+        self,
+        model_name: str,
+        messages: list,
+        response_format: dict | None,
+        prompt_tokens: int | None = None,
+    ):
+        """
+        Sends the messages to one model within its provider's rate limits.
+
+        The recorded latency covers the provider call only, not the wait for
+        the rate limiter.
+        """
+        llm = self.llms[model_name]
+        response_format = self._format_for(model_name, response_format)
+        governor = self.governors[model_name]
+        if governor is None:
+            return await timed(model_name, llm.ainvoke(messages, format=response_format))
+
+        async with governor.slot(await self.estimate_tokens(model_name, messages, prompt_tokens)) as usage:
+            response = await timed(model_name, llm.ainvoke(messages, format=response_format))
+            usage["total_tokens"] = response_total_tokens(response)
+        return response
+
+    async def _call(self, messages: list, response_format: dict | None, prompt_tokens: int | None = None):
+        """Sends the messages to the primary model, routing to the fallbacks if any."""
+        if len(self.models) == 1:
+            return await self._invoke_model(self.model_name, messages, response_format, prompt_tokens)
+        return await route(
+            self.models,
+            lambda model_name: self._invoke_model(model_name, messages, response_format, prompt_tokens),
+            hedge=settings.LLM_HEDGE_ENABLED,
+        )
+
+    def decoding_params(self, response_format: dict | None) -> dict:
+        """Parameters besides the messages that change the model's answer."""
+        params = {
+            name: getattr(self.llm, name, None)
+            for name in ("temperature", "top_p", "top_k", "n", "max_tokens", "model_kwargs")
+        }
+        return {"response_format": response_format, **params}
 
     async def ainvoke(
         self,
         prompt: ChatPromptTemplate,
         response_format: dict | None = None,
+        use_cache: bool = True,
         **kwargs,
     ) -> str:
         """
         Asynchronously invoke the LLM with a formatted prompt.
-        """
-   
-        if (
-            self.model_name.startswith("ollama")
-            and "/" in self.model_name
-            and response_format == "json"
-        ):
-            logger.info(
-                f"Using JSON object response format for model: "
-                f"{self.model_name}"
-            )
-        else:
-            response_format = None
 
+        When the response cache is enabled, a call with the same model,
+        formatted messages and decoding parameters as a previous one is
+        answered from the cache. Prompts compiled from a name listed in
+        `LLM_SEMANTIC_CACHE_PROMPTS` are then looked up by similarity of
+        their user-facing section. Pass `use_cache=False` to skip the
+        lookups and call the provider (e.g. to retry after an unusable
+        answer); the fresh response replaces the cached one.
+        """
         messages = prompt.format_messages(**kwargs)
-        response = await self.llm.ainvoke(messages, format=response_format)
+        prompt_name = (prompt.metadata or {}).get("prompt_name")
+        prompt_tokens = (prompt.metadata or {}).get("prompt_tokens")
+        semantic_cache = get_semantic_llm_cache(prompt_name)
+
+        if self.cache is None and semantic_cache is None:
+            response = await self._call(messages, response_format, prompt_tokens)
+            return remove_think_content(response.content)
 
-   
-        return remove_think_content(response.content)
+        params = self.decoding_params(response_format)
+        key = llm_cache_key(self.model_name, messages, params)
+        if self.cache is not None:
+            if use_cache:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    LLM_CACHE_REQUESTS.labels(self.model_name, "hit").inc()
+                    return cached
+                LLM_CACHE_REQUESTS.labels(self.model_name, "miss").inc()
+            else:
+                LLM_CACHE_REQUESTS.labels(self.model_name, "bypass").inc()
+
+        if semantic_cache is not None:
+            section = prompt_section(messages)
+            scope = semantic_cache_scope(self.model_name, prompt_name, messages, params)
+            try:
+                embedding = await semantic_cache.embed(section)
+            except Exception as e:
+                logger.warning(f"Semantic LLM cache disabled for this call, embedding failed: {e}")
+                semantic_cache = None
+
+        if semantic_cache is not None:
+            if use_cache:
+                cached = await semantic_cache.get(scope, embedding)
+                if cached is not None:
+                    content, similarity = cached
+                    logger.debug(f"Semantic cache hit for prompt '{prompt_name}' (similarity {similarity:.3f})")
+                    LLM_SEMANTIC_CACHE_REQUESTS.labels(prompt_name, "hit").inc()
+                    return content
+                LLM_SEMANTIC_CACHE_REQUESTS.labels(prompt_name, "miss").inc()
+            else:
+                LLM_SEMANTIC_CACHE_REQUESTS.labels(prompt_name, "bypass").inc()
+
+        response = await self._call(messages, response_format, prompt_tokens)
+        content = remove_think_content(response.content)
+        if content:
+            if self.cache is not None:
+                await self.cache.set(key, content)
+            if semantic_cache is not None:
+                await semantic_cache.set(scope, section, embedding, content)
+        return content
 
     async def astream(
         self,
@@ -60,20 +191,30 @@ class LLMManager:
     ) -> str:
         """
         Asynchronously stream the LLM's response.
+
+        Streams are not hedged; a model failing before its first chunk falls
+        back to the next one.
         """
-        if (
-            self.model_name.startswith("ollama")
-            and "/" in self.model_name
-            and response_format == "json"
-        ):
-            logger.info(
-                f"Using JSON object response format for model: "
-                f"{self.model_name}"
-            )
-        else:
-            response_format = None
-
-   
         messages = prompt.format_messages(**kwargs)
-        async for chunk in self.llm.astream(messages, format=response_format):
-            yield chunk.content
+        prompt_tokens = (prompt.metadata or {}).get("prompt_tokens")
+        for index, model_name in enumerate(self.models):
+            llm = self.llms[model_name]
+            model_format = self._format_for(model_name, response_format)
+            governor = self.governors[model_name]
+            started = False
+            try:
+                if governor is None:
+                    async for chunk in llm.astream(messages, format=model_format):
+                        started = True
+                        yield chunk.content
+                else:
+                    async with governor.slot(await self.estimate_tokens(model_name, messages, prompt_tokens)):
+                        async for chunk in llm.astream(messages, format=model_format):
+                            started = True
+                            yield chunk.content
+                return
+            except Exception as e:
+                # Only a stream that has not produced anything can be retried on another model.
+                if started or index == len(self.models) - 1:
+                    raise
+                logger.warning(f"Model '{model_name}' failed to stream, falling back to '{self.models[index + 1]}': {e!r}")
@@ -0,0 +1,331 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from conf import settings
+from core.logging_config import get_logger
+from core.metrics_config import LLM_CALLS_IN_FLIGHT, LLM_RATE_LIMIT_WAIT_SECONDS, LLM_RATE_LIMITED
+from services.token_budget import count_message_tokens_async
+
+logger = get_logger(__name__)
+
+
+def provider_of(model_name: str) -> str:
+    """Provider prefix of a LiteLLM model name (`openai/gpt-4o` -> `openai`)."""
+    return model_name.split("/", 1)[0] if "/" in model_name else model_name
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parses `LLM_RATE_LIMITS`: comma-separated `prefix=rpm:tpm` entries,
+    where 0 leaves that budget unlimited.
+    """
+    limits = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        prefix, _, budgets = entry.partition("=")
+        rpm, _, tpm = budgets.partition(":")
+        limits[prefix.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+async def estimate_tokens(
+    model_name: str,
+    messages: Sequence[Any],
+    completion_tokens: int,
+    prompt_tokens: Optional[int] = None,
+) -> int:
+    """
+    Estimates the tokens a call will consume: its prompt plus the expected
+    completion.
+
+    The prompt is counted with the model's tokenizer, unless its count is
+    already known (`prompt_tokens`, set on prompts compiled by
+    `compile_prompt_within_budget`).
+    """
+    if prompt_tokens is None:
+        prompt_tokens = await count_message_tokens_async(model_name, messages)
+    return prompt_tokens + completion_tokens
+
+
+def response_total_tokens(response: Any) -> int:
+    """Tokens actually consumed by a call, as reported by the provider (0 if unknown)."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if isinstance(token_usage, dict):
+        return int(token_usage.get("total_tokens") or 0)
+    return int(getattr(token_usage, "total_tokens", 0) or 0)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Reads the delay requested by a provider's 429 from the `Retry-After`
+    (seconds or HTTP date) or `retry-after-ms` response headers.
+    """
+    headers = getattr(exc, "litellm_response_headers", None) or getattr(
+        getattr(exc, "response", None), "headers", None
+    )
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucketLimiter(ABC):
+    """
+    Requests-per-minute and tokens-per-minute budgets of a provider.
+
+    Both buckets hold one minute of budget and refill continuously. Callers
+    of a process are served in arrival order: the head of the queue holds
+    the lock while it waits for the buckets, so a large call cannot be
+    starved by smaller ones. A 429 blocks the buckets for the delay asked by
+    the provider.
+    """
+
+    def __init__(self, provider: str, rpm: int, tpm: int) -> None:
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Waits until one request and `tokens` tokens fit in the budgets, then takes them."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                wait = await self._try_acquire(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        LLM_RATE_LIMIT_WAIT_SECONDS.labels(self.provider).observe(time.monotonic() - start)
+
+    @abstractmethod
+    async def _try_acquire(self, tokens: int) -> float:
+        """Take the budget and return 0, or return the seconds to wait before retrying."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def adjust(self, tokens: int) -> None:
+        """Debit (or refund, if negative) tokens once the actual usage of a call is known."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def block(self, seconds: float) -> None:
+        """Stop granting budget for `seconds`."""
+        raise NotImplementedError
+
+
+class InMemoryTokenBucketLimiter(TokenBucketLimiter):
+    """Budgets local to the process."""
+
+    def __init__(self, provider: str, rpm: int, tpm: int) -> None:
+        super().__init__(provider, rpm, tpm)
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        elapsed, self._updated_at = now - self._updated_at, now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+        return now
+
+    async def _try_acquire(self, tokens: int) -> float:
+        now = self._refill()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+
+        wait = 0.0
+        if self.rpm and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+        if wait > 0:
+            return wait
+
+        self._requests -= 1
+        self._tokens -= tokens
+        return 0.0
+
+    async def adjust(self, tokens: int) -> None:
+        if self.tpm:
+            self._refill()
+            self._tokens = min(self.tpm, self._tokens - tokens)
+
+    async def block(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class RedisTokenBucketLimiter(TokenBucketLimiter):
+    """
+    Budgets shared by every process through Redis.
+
+    The buckets of a provider live in one hash updated atomically by a Lua
+    script using the Redis clock. If Redis is unreachable calls are let
+    through rather than stalled.
+    """
+
+    ACQUIRE_SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local rpm, tpm, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local b = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated_at', 'blocked_until')
+    local requests, tokens = tonumber(b[1]) or rpm, tonumber(b[2]) or tpm
+    local elapsed = math.max(0, now - (tonumber(b[3]) or now))
+    local blocked_until = tonumber(b[4]) or 0
+    if rpm > 0 then requests = math.min(rpm, requests + elapsed * rpm / 60) end
+    if tpm > 0 then tokens = math.min(tpm, tokens + elapsed * tpm / 60) end
+    local wait = 0
+    if blocked_until > now then
+        wait = blocked_until - now
+    else
+        if rpm > 0 and requests < 1 then wait = math.max(wait, (1 - requests) * 60 / rpm) end
+        if tpm > 0 and tokens < cost then wait = math.max(wait, (cost - tokens) * 60 / tpm) end
+        if wait == 0 then
+            requests = requests - 1
+            tokens = tokens - cost
+        end
+    end
+    redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+    return tostring(wait)
+    """
+
+    BLOCK_SCRIPT = """
+    local t = redis.call('TIME')
+    local until_ = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+    local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+    if until_ > current then redis.call('HSET', KEYS[1], 'blocked_until', until_) end
+    redis.call('EXPIRE', KEYS[1], math.max(120, math.ceil(tonumber(ARGV[1]))))
+    return 1
+    """
+
+    def __init__(self, provider: str, rpm: int, tpm: int, url: str) -> None:
+        super().__init__(provider, rpm, tpm)
+        from redis import asyncio as aioredis
+
+        self.key = f"llm:ratelimit:{provider}"
+        self._client = aioredis.from_url(url, decode_responses=True)
+        self._acquire = self._client.register_script(self.ACQUIRE_SCRIPT)
+        self._block = self._client.register_script(self.BLOCK_SCRIPT)
+
+    async def _try_acquire(self, tokens: int) -> float:
+        try:
+            return float(await self._acquire(keys=[self.key], args=[self.rpm, self.tpm, tokens]))
+        except Exception as e:
+            logger.warning(f"LLM rate limiter unavailable, letting the call through: {e}")
+            return 0.0
+
+    async def adjust(self, tokens: int) -> None:
+        if not self.tpm:
+            return
+        try:
+            await self._client.hincrbyfloat(self.key, "tokens", -tokens)
+        except Exception as e:
+            logger.warning(f"LLM rate limiter adjustment failed: {e}")
+
+    async def block(self, seconds: float) -> None:
+        try:
+            await self._block(keys=[self.key], args=[seconds])
+        except Exception as e:
+            logger.warning(f"LLM rate limiter block failed: {e}")
+
+
+class LLMCallGovernor:
+    """
+    Admits the LLM calls of a provider: at most `max_concurrency` in flight
+    in this process, within the provider's RPM and TPM budgets.
+    """
+
+    def __init__(self, provider: str, limiter: Optional[TokenBucketLimiter], max_concurrency: int) -> None:
+        self.provider = provider
+        self.limiter = limiter
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[Dict[str, int]]:
+        """
+        Holds a call slot for `tokens` estimated tokens.
+
+        Set `usage["total_tokens"]` inside the block to reconcile the budget
+        with the actual usage. A provider 429 raised inside the block blocks
+        the budget for its `Retry-After` delay before propagating.
+        """
+        usage: Dict[str, int] = {}
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        LLM_CALLS_IN_FLIGHT.labels(self.provider).inc()
+        try:
+            if self.limiter is not None:
+                await self.limiter.acquire(tokens)
+            yield usage
+        except Exception as e:
+            if is_rate_limit_error(e):
+                delay = retry_after_seconds(e) or settings.LLM_RATE_LIMIT_RETRY_AFTER_SECONDS
+                LLM_RATE_LIMITED.labels(self.provider).inc()
+                logger.warning(f"Provider '{self.provider}' rate limited the call; pausing for {delay:.1f}s")
+                if self.limiter is not None:
+                    await self.limiter.block(delay)
+            raise
+        finally:
+            LLM_CALLS_IN_FLIGHT.labels(self.provider).dec()
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+        if self.limiter is not None and usage.get("total_tokens"):
+            await self.limiter.adjust(usage["total_tokens"] - min(tokens, self.limiter.tpm or tokens))
+
+
+_governors: Dict[str, LLMCallGovernor] = {}
+
+
+def get_llm_governor(model_name: str) -> Optional[LLMCallGovernor]:
+    """
+    Returns the process-wide governor of the provider of `model_name`, or
+    None when `LLM_RATE_LIMIT_ENABLED` is off.
+
+    Budgets come from the longest `LLM_RATE_LIMITS` prefix matching the model
+    name; providers without an entry are only bounded in concurrency.
+    """
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return None
+
+    limits = parse_rate_limits(settings.LLM_RATE_LIMITS)
+    matches = [prefix for prefix in limits if model_name.startswith(prefix)]
+    provider = max(matches, key=len) if matches else provider_of(model_name)
+    if provider not in _governors:
+        rpm, tpm = limits.get(provider, (0, 0))
+        limiter = None
+        if rpm or tpm:
+            if settings.LLM_RATE_LIMIT_BACKEND == "redis":
+                limiter = RedisTokenBucketLimiter(provider, rpm, tpm, settings.LLM_RATE_LIMIT_REDIS_URL)
+            else:
+                limiter = InMemoryTokenBucketLimiter(provider, rpm, tpm)
+        _governors[provider] = LLMCallGovernor(provider, limiter, settings.LLM_RATE_LIMIT_MAX_CONCURRENCY)
+    return _governors[provider]
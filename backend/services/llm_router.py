@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from conf import settings
+from core.logging_config import get_logger
+from core.metrics_config import LLM_FALLBACKS, LLM_HEDGED_REQUESTS, LLM_REQUEST_SECONDS
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+    Latencies of the last successful calls of a model.
+
+    The hedge delay of a model is the 95th percentile of its window once it
+    holds enough samples, and `LLM_HEDGE_DEFAULT_DELAY_SECONDS` before that.
+    """
+
+    def __init__(self, window: int, min_samples: int) -> None:
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The `q` quantile (0-1) of the window, or None without enough samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def hedge_delay(self) -> float:
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_latency_tracker(model_name: str) -> LatencyTracker:
+    """Process-wide latency tracker of a model, shared by every LLMManager."""
+    if model_name not in _trackers:
+        _trackers[model_name] = LatencyTracker(
+            settings.LLM_HEDGE_LATENCY_WINDOW, settings.LLM_HEDGE_MIN_SAMPLES
+        )
+    return _trackers[model_name]
+
+
+async def timed(model_name: str, call: Awaitable[T]) -> T:
+    """
+    Awaits a provider call, recording its latency if it succeeds.
+
+    Only the provider call should be wrapped: time spent waiting for the
+    rate limiter would inflate the p95 the hedge delays are derived from.
+    """
+    start = time.monotonic()
+    result = await call
+    elapsed = time.monotonic() - start
+    get_latency_tracker(model_name).record(elapsed)
+    LLM_REQUEST_SECONDS.labels(model_name).observe(elapsed)
+    return result
+
+
+async def route(models: Sequence[str], invoke: Callable[[str], Awaitable[T]], hedge: bool = True) -> T:
+    """
+    Calls the models in order of preference and returns the first answer.
+
+    The first model is called alone. When a call fails, the next model is
+    called at once; when `hedge` is set and the latest call is still running
+    after its model's p95 latency, the next model is called alongside it.
+    The first call to succeed wins and the others are cancelled.
+
+    Args:
+        models: Model names, preferred first.
+        invoke: Coroutine function calling one model by name, recording
+            its latency with `timed`.
+        hedge: Whether to send hedged duplicates to slow models.
+
+    Raises:
+        Exception: The error of the last model if every call failed.
+    """
+    remaining: List[str] = list(models)
+    pending: Dict[asyncio.Task, str] = {}
+    last_launched = ""
+    last_error: Optional[BaseException] = None
+
+    def launch() -> None:
+        nonlocal last_launched
+        last_launched = remaining.pop(0)
+        pending[asyncio.create_task(invoke(last_launched))] = last_launched
+
+    launch()
+    try:
+        while pending:
+            timeout = get_latency_tracker(last_launched).hedge_delay() if hedge and remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Model '{last_launched}' exceeded {timeout:.1f}s, hedging with '{remaining[0]}'")
+                LLM_HEDGED_REQUESTS.labels(remaining[0]).inc()
+                launch()
+                continue
+
+            for task in done:
+                model_name = pending.pop(task)
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+                LLM_FALLBACKS.labels(model_name).inc()
+                logger.warning(f"Model '{model_name}' failed: {last_error!r}")
+
+            if remaining:
+                logger.info(f"Falling back to model '{remaining[0]}'")
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise last_error
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def prompt_section(messages: Sequence[Any]) -> str:
+    """
+    Returns the user-facing section of a formatted prompt: the content of
+    its last human message, or of its last message if it has none.
+    """
+    for message in reversed(messages):
+        if getattr(message, "type", "") == "human":
+            return str(message.content)
+    return str(getattr(messages[-1], "content", "")) if messages else ""
+
+
+def semantic_cache_scope(
+    model_name: str, prompt_name: str, messages: Sequence[Any], params: Dict[str, Any]
+) -> str:
+    """
+    Builds the scope within which prompts are compared by similarity.
+
+    Everything but the user-facing section must match exactly: model,
+    prompt name, decoding parameters and every other message (system
+    instructions, few-shot examples).
+    """
+    section = prompt_section(messages)
+    context, skipped = [], False
+    for m in reversed(messages):
+        if not skipped and getattr(m, "type", "") == "human" and str(m.content) == section:
+            skipped = True
+            continue
+        context.append((getattr(m, "type", ""), getattr(m, "content", m)))
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt_name, "context": context[::-1], "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticLLMCache(ABC):
+    """
+    Cache of LLM responses looked up by prompt similarity.
+
+    The user-facing section of a prompt is embedded with `EMBEDDING_NAME`
+    and compared by cosine similarity to the cached prompts of the same
+    scope; the response of the nearest one is returned if its similarity
+    reaches `threshold`. Lookups never raise: a failing backend behaves
+    like a miss.
+    """
+
+    def __init__(self, threshold: float, ttl: float) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self._embeddings = None
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+
+            self._embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_NAME)
+        return self._embeddings
+
+    async def embed(self, text: str) -> List[float]:
+        """Embeds a prompt section off the event loop."""
+        return await asyncio.to_thread(self.embeddings.embed_query, text)
+
+    @abstractmethod
+    async def get(self, scope: str, embedding: List[float]) -> Optional[Tuple[str, float]]:
+        """Return the (response, similarity) of the nearest cached prompt, or None on a miss."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, scope: str, text: str, embedding: List[float], value: str) -> None:
+        """Store the response of a prompt section."""
+        raise NotImplementedError
+
+
+class InMemorySemanticLLMCache(SemanticLLMCache):
+    """
+    Embeddings kept in process memory, searched exhaustively within a scope.
+
+    The least recently stored or hit entries beyond `max_size` are evicted.
+    """
+
+    def __init__(self, threshold: float, ttl: float, max_size: int = 1000) -> None:
+        super().__init__(threshold, ttl)
+        self.max_size = max_size
+        self._entries: OrderedDict[int, Tuple[str, float, List[float], str]] = OrderedDict()
+        self._scopes: Dict[str, List[int]] = {}
+        self._next_id = 0
+
+    def _evict(self, entry_id: int) -> None:
+        scope = self._entries.pop(entry_id)[0]
+        ids = self._scopes.get(scope, [])
+        if entry_id in ids:
+            ids.remove(entry_id)
+        if not ids:
+            self._scopes.pop(scope, None)
+
+    async def get(self, scope: str, embedding: List[float]) -> Optional[Tuple[str, float]]:
+        query = _normalize(embedding)
+        now = time.time()
+        best_id, best_similarity = None, -1.0
+        for entry_id in list(self._scopes.get(scope, ())):
+            _, expires_at, vector, _ = self._entries[entry_id]
+            if expires_at < now:
+                self._evict(entry_id)
+                continue
+            similarity = sum(a * b for a, b in zip(query, vector))
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None or best_similarity < self.threshold:
+            return None
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id][3], best_similarity
+
+    async def set(self, scope: str, text: str, embedding: List[float], value: str) -> None:
+        entry_id, self._next_id = self._next_id, self._next_id + 1
+        self._entries[entry_id] = (scope, time.time() + self.ttl, _normalize(embedding), value)
+        self._scopes.setdefault(scope, []).append(entry_id)
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)))
+
+
+class PGVectorSemanticLLMCache(SemanticLLMCache):
+    """
+    Embeddings stored in a pgvector collection, shared by every process.
+
+    Scope, response and expiry are kept in the JSONB metadata and applied as
+    filters of the nearest-neighbour query; expired rows are ignored and can
+    be purged from the collection offline.
+    """
+
+    def __init__(self, threshold: float, ttl: float, collection_name: str) -> None:
+        super().__init__(threshold, ttl)
+        from db.pg_vector import PGVector
+        from services.vectorstore_manager import CONNECTION_STRING
+
+        self.vector_store = PGVector(
+            embeddings=self.embeddings,
+            collection_name=collection_name,
+            connection=CONNECTION_STRING,
+            use_jsonb=True,
+        )
+
+    async def get(self, scope: str, embedding: List[float]) -> Optional[Tuple[str, float]]:
+        try:
+            results = await asyncio.to_thread(
+                self.vector_store.similarity_search_with_score_by_vector,
+                embedding,
+                k=1,
+                filter={"scope": scope, "expires_at": {"$gte": time.time()}},
+            )
+        except Exception as e:
+            logger.warning(f"Semantic LLM cache lookup failed: {e}")
+            return None
+        if not results:
+            return None
+        document, distance = results[0]
+        similarity = 1.0 - distance
+        if similarity < self.threshold:
+            return None
+        return document.metadata["response"], similarity
+
+    async def set(self, scope: str, text: str, embedding: List[float], value: str) -> None:
+        metadata = {"scope": scope, "response": value, "expires_at": time.time() + self.ttl}
+        try:
+            await asyncio.to_thread(
+                self.vector_store.add_embeddings, [text], [embedding], metadatas=[metadata]
+            )
+        except Exception as e:
+            logger.warning(f"Semantic LLM cache write failed: {e}")
+
+
+_semantic_cache: Optional[SemanticLLMCache] = None
+
+
+def get_semantic_llm_cache(prompt_name: Optional[str]) -> Optional[SemanticLLMCache]:
+    """
+    Returns the process-wide semantic cache selected by
+    `LLM_SEMANTIC_CACHE_BACKEND` if `prompt_name` is listed in
+    `LLM_SEMANTIC_CACHE_PROMPTS`, or None.
+    """
+    global _semantic_cache
+    if not settings.LLM_SEMANTIC_CACHE_ENABLED or prompt_name not in settings.LLM_SEMANTIC_CACHE_PROMPTS:
+        return None
+    if _semantic_cache is None:
+        backend = settings.LLM_SEMANTIC_CACHE_BACKEND
+        threshold = settings.LLM_SEMANTIC_CACHE_THRESHOLD
+        ttl = settings.LLM_SEMANTIC_CACHE_TTL_SECONDS
+
+        if backend == "pgvector":
+            _semantic_cache = PGVectorSemanticLLMCache(
+                threshold, ttl, settings.LLM_SEMANTIC_CACHE_COLLECTION
+            )
+        else:
+            if backend != "memory":
+                logger.warning(f"Unknown semantic LLM cache backend '{backend}'. Using in-memory cache.")
+            _semantic_cache = InMemorySemanticLLMCache(
+                threshold, ttl, settings.LLM_SEMANTIC_CACHE_MAX_ENTRIES
+            )
+    return _semantic_cache
@@ -0,0 +1,152 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+import tiktoken
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FALLBACK_ENCODING = "o200k_base"
+
+# Tokens added per message by chat templates (role markers, separators) and
+# to prime the assistant reply.
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Prompts of at least this many characters are tokenized in a worker thread:
+# encoding a long context blocks the event loop for milliseconds, while the
+# thread hop costs more than encoding a short prompt.
+OFFLOAD_MIN_CHARACTERS = 16384
+
+
+def parse_model_mapping(spec: str) -> Dict[str, str]:
+    """Parses comma-separated `prefix=value` entries of a per-model setting."""
+    mapping = {}
+    for entry in spec.split(","):
+        prefix, sep, value = entry.partition("=")
+        if sep and prefix.strip() and value.strip():
+            mapping[prefix.strip()] = value.strip()
+    return mapping
+
+
+def match_model(model_name: str, mapping: Mapping[str, Any]) -> Any:
+    """Value of the longest prefix of `model_name` in `mapping`, or None."""
+    matches = [prefix for prefix in mapping if model_name.startswith(prefix)]
+    return mapping[max(matches, key=len)] if matches else None
+
+
+class Tokenizer:
+    """Encodes and decodes text with the tokenizer of a model."""
+
+    def __init__(self, name: str, encode: Callable[[str], List[int]], decode: Callable[[List[int]], str]) -> None:
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text)) if text else 0
+
+
+def _tiktoken_tokenizer(encoding: "tiktoken.Encoding") -> Tokenizer:
+    return Tokenizer(
+        encoding.name,
+        lambda text: encoding.encode(text, disallowed_special=()),
+        encoding.decode,
+    )
+
+
+def _huggingface_tokenizer(repo: str) -> Tokenizer:
+    from tokenizers import Tokenizer as HFTokenizer
+
+    tokenizer = HFTokenizer.from_pretrained(repo)
+    return Tokenizer(
+        f"hf:{repo}",
+        lambda text: tokenizer.encode(text, add_special_tokens=False).ids,
+        tokenizer.decode,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name: str) -> Tokenizer:
+    """
+    Returns the tokenizer of a model.
+
+    `LLM_TOKENIZERS` maps model prefixes to a tiktoken encoding name or to
+    `hf:<repo>` for a Hugging Face tokenizer. Other models use tiktoken's
+    encoding for the model name, and `o200k_base` when tiktoken does not
+    know it.
+    """
+    configured = match_model(model_name, parse_model_mapping(settings.LLM_TOKENIZERS))
+    if configured:
+        try:
+            if configured.startswith("hf:"):
+                return _huggingface_tokenizer(configured[3:])
+            return _tiktoken_tokenizer(tiktoken.get_encoding(configured))
+        except Exception as e:
+            logger.warning(f"Tokenizer '{configured}' of model '{model_name}' unavailable, using tiktoken: {e}")
+
+    try:
+        encoding = tiktoken.encoding_for_model(model_name.rsplit("/", 1)[-1])
+    except KeyError:
+        encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+    return _tiktoken_tokenizer(encoding)
+
+
+def context_window(model_name: str) -> int:
+    """
+    Input tokens accepted by a model: its `LLM_CONTEXT_WINDOWS` entry,
+    else `LLM_DEFAULT_CONTEXT_WINDOW`.
+    """
+    configured = match_model(model_name, parse_model_mapping(settings.LLM_CONTEXT_WINDOWS))
+    return int(configured) if configured else settings.LLM_DEFAULT_CONTEXT_WINDOW
+
+
+def prompt_budget(model_names: Sequence[str]) -> Tuple[str, int]:
+    """
+    The model with the smallest context window among `model_names` (a
+    prompt must fit every model it may be routed to) and the prompt tokens
+    it allows once `LLM_COMPLETION_RESERVE_TOKENS` are kept for the answer.
+    """
+    model_name = min(model_names, key=context_window)
+    return model_name, context_window(model_name) - settings.LLM_COMPLETION_RESERVE_TOKENS
+
+
+def count_message_tokens(model_name: str, messages: Sequence[Any]) -> int:
+    """Tokens of formatted chat messages, including the chat template overhead."""
+    tokenizer = get_tokenizer(model_name)
+    return sum(
+        tokenizer.count(str(getattr(m, "content", m))) + TOKENS_PER_MESSAGE for m in messages
+    ) + TOKENS_PER_REPLY
+
+
+async def count_message_tokens_async(model_name: str, messages: Sequence[Any]) -> int:
+    """`count_message_tokens`, run in a worker thread for long prompts so the event loop is not blocked."""
+    if sum(len(str(getattr(m, "content", m))) for m in messages) < OFFLOAD_MIN_CHARACTERS:
+        return count_message_tokens(model_name, messages)
+    return await asyncio.to_thread(count_message_tokens, model_name, messages)
+
+
+def truncate_tokens(model_name: str, text: str, max_tokens: int, keep: str = "end") -> str:
+    """
+    Cuts `text` to at most `max_tokens` tokens.
+
+    Args:
+        keep: `end` keeps the last tokens (recent history), `start` the
+            first ones (documents, scraped pages). The partial line left at
+            the cut is dropped.
+    """
+    tokenizer = get_tokenizer(model_name)
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    if keep == "start":
+        kept = tokenizer.decode(tokens[:max_tokens])
+        return kept.rsplit("\n", 1)[0] if "\n" in kept else kept
+    kept = tokenizer.decode(tokens[-max_tokens:])
+    return kept.split("\n", 1)[1] if "\n" in kept else kept
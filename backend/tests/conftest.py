@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Modules are imported from the backend directory, as the app runs them.
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
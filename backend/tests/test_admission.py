@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from conf import settings
+from utils.admission import AdmissionController, admission_control
+
+
+def test_requests_beyond_the_queue_are_shed_with_429():
+    async def main():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1, slo_seconds=10)
+        release = asyncio.Event()
+
+        async def request():
+            async with controller.admit():
+                await release.wait()
+
+        running = asyncio.create_task(request())
+        queued = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        assert (controller.in_flight, controller.queued) == (1, 1)
+
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire()
+        assert shed.value.status_code == 429
+        assert int(shed.value.headers["Retry-After"]) >= 1
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert (controller.in_flight, controller.queued) == (0, 0)
+
+    asyncio.run(main())
+
+
+def test_requests_that_would_miss_the_slo_are_shed_with_503():
+    async def main():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=10, slo_seconds=1)
+        controller.service_time = 0.8
+        await controller.acquire()
+
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire()
+        assert shed.value.status_code == 503
+        assert controller.queued == 0
+
+    asyncio.run(main())
+
+
+def test_a_queued_request_that_times_out_is_shed_with_503():
+    async def main():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=10, slo_seconds=0.05)
+        await controller.acquire()
+
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire()
+        assert shed.value.status_code == 503
+
+    asyncio.run(main())
+
+
+def test_accepted_work_waits_instead_of_being_shed():
+    async def main():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=0, slo_seconds=0.01)
+        await controller.acquire()
+
+        waiting = asyncio.create_task(controller.acquire(shed=False))
+        await asyncio.sleep(0.02)
+        assert not waiting.done()
+
+        controller.release(0.01)
+        await asyncio.wait_for(waiting, 0.5)
+        assert controller.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_the_decorator_is_a_no_op_when_admission_is_disabled(monkeypatch):
+    async def route():
+        return "ok"
+
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    assert admission_control("test", 1)(route) is route
+
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    wrapped = admission_control("test", 1)(route)
+    assert wrapped.admission.max_queue == settings.ADMISSION_MAX_QUEUE
+    assert asyncio.run(wrapped()) == "ok"
+
+
+def test_a_streamed_route_keeps_its_slot_until_the_stream_ends(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+
+    async def events():
+        yield "data: start\n\n"
+        yield "data: end\n\n"
+
+    @admission_control("stream", 1)
+    async def route():
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def main():
+        response = await route()
+        assert route.admission.in_flight == 1
+        assert [chunk async for chunk in response.body_iterator] == ["data: start\n\n", "data: end\n\n"]
+        assert route.admission.in_flight == 0
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import pytest
+from aiokafka import TopicPartition
+
+from workers.backpressure import Backpressure, PartitionPauser
+
+CHAT = TopicPartition("agent", 0)
+BATCH = TopicPartition("room-suggestions", 0)
+
+
+class FakeConsumer:
+    def __init__(self, *partitions):
+        self.partitions = set(partitions)
+        self.paused = set()
+
+    def assignment(self):
+        return set(self.partitions)
+
+    def pause(self, *partitions):
+        self.paused.update(partitions)
+
+    def resume(self, *partitions):
+        self.paused.difference_update(partitions)
+
+
+def test_pauses_above_high_water_and_resumes_below_low_water():
+    consumer = FakeConsumer(CHAT, BATCH)
+    backpressure = Backpressure(high_water=10, low_water=5, pauser=PartitionPauser())
+
+    backpressure.update(consumer, 9)
+    assert consumer.paused == set()
+
+    backpressure.update(consumer, 10)
+    assert backpressure.engaged
+    assert consumer.paused == {CHAT, BATCH}
+
+    backpressure.update(consumer, 6)
+    assert consumer.paused == {CHAT, BATCH}
+
+    backpressure.update(consumer, 5)
+    assert not backpressure.engaged
+    assert consumer.paused == set()
+
+
+def test_resume_keeps_partitions_held_by_another_reason():
+    consumer = FakeConsumer(CHAT, BATCH)
+    pauser = PartitionPauser()
+    backpressure = Backpressure(high_water=2, low_water=0, pauser=pauser)
+
+    pauser.pause(consumer, "lane", [BATCH])
+    backpressure.update(consumer, 2)
+    backpressure.update(consumer, 0)
+
+    assert consumer.paused == {BATCH}
+    assert pauser.held_by("lane") == {BATCH}
+
+
+def test_low_water_must_be_below_high_water():
+    with pytest.raises(ValueError):
+        Backpressure(high_water=5, low_water=5, pauser=PartitionPauser())
@@ -0,0 +1,33 @@
+import asyncio
+
+from workers.coalescer import BurstCoalescer
+
+
+def test_only_the_newest_request_of_a_burst_survives():
+    async def main():
+        coalescer = BurstCoalescer(window=0.02)
+        first = coalescer.register("room")
+        second = coalescer.register("room")
+        other = coalescer.register("other-room")
+
+        superseded = await asyncio.gather(
+            coalescer.wait("room", first),
+            coalescer.wait("room", second),
+            coalescer.wait("other-room", other),
+        )
+        assert superseded == [True, False, False]
+
+    asyncio.run(main())
+
+
+def test_release_only_forgets_the_newest_generation():
+    coalescer = BurstCoalescer(window=0)
+    first = coalescer.register("room")
+    second = coalescer.register("room")
+
+    coalescer.release("room", first)
+    assert coalescer.is_superseded("room", first)
+
+    coalescer.release("room", second)
+    third = coalescer.register("room")
+    assert not coalescer.is_superseded("room", third)
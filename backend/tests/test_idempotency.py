@@ -0,0 +1,133 @@
+import asyncio
+from collections import namedtuple
+
+import pytest
+
+from conf import settings
+from workers import agent_consumer
+from workers.agent_consumer import ConsumerContext, process_message
+from workers.idempotency import (
+    InMemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+    get_idempotency_key,
+)
+from workers.retry import RetryPolicy
+
+Message = namedtuple("Message", "topic partition offset key value headers timestamp")
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+
+    async def send_and_wait(self, topic, value, key=None, headers=None):
+        self.sent.append(topic)
+
+
+def message(value=b'{"uuid": "request-1", "room_id": "room-1"}'):
+    return Message(settings.KAFKA_AGENT_TOPIC, 0, 0, b"room-1", value, [], 0)
+
+
+def context(store):
+    return ConsumerContext(
+        producer=FakeProducer(),
+        lanes=None,
+        dispatcher=None,
+        store=store,
+        coalescer=None,
+        retry_policy=RetryPolicy([1.0]),
+        batches=None,
+    )
+
+
+def processed(store, msg):
+    key = get_idempotency_key(msg.topic, {"uuid": "request-1"}, msg.value)
+    return asyncio.run(store.is_processed(key))
+
+
+def test_keys_differ_for_messages_sharing_a_uuid():
+    data = {"uuid": "batch-1"}
+    assert get_idempotency_key("rooms", data, b"room-1") != get_idempotency_key("rooms", data, b"room-2")
+
+
+def test_memory_store_remembers_the_most_recent_keys():
+    async def main():
+        store = InMemoryIdempotencyStore(max_size=2)
+        for key in ("a", "b", "c"):
+            await store.mark_processed(key)
+        return [await store.is_processed(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(main()) == [False, True, True]
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "processed.db")
+
+    async def main():
+        store = SQLiteIdempotencyStore(path)
+        await store.mark_processed("a")
+        await store.close()
+
+        restarted = SQLiteIdempotencyStore(path)
+        try:
+            return await restarted.is_processed("a"), await restarted.is_processed("b")
+        finally:
+            await restarted.close()
+
+    assert asyncio.run(main()) == (True, False)
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda tmp_path: InMemoryIdempotencyStore(),
+    lambda tmp_path: SQLiteIdempotencyStore(str(tmp_path / "processed.db")),
+])
+def test_a_redelivered_message_is_skipped(monkeypatch, tmp_path, store_factory):
+    runs = []
+
+    async def schedule_message(msg, data, ctx):
+        runs.append(data["uuid"])
+        return []
+
+    monkeypatch.setattr(agent_consumer, "schedule_message", schedule_message)
+    store = store_factory(tmp_path)
+    ctx = context(store)
+
+    async def main():
+        await process_message(message(), ctx)
+        await process_message(message(), ctx)
+
+    asyncio.run(main())
+    assert runs == ["request-1"]
+
+
+def test_a_failed_message_is_not_marked_processed(monkeypatch):
+    async def schedule_message(msg, data, ctx):
+        raise RuntimeError("workflow failed")
+
+    monkeypatch.setattr(agent_consumer, "schedule_message", schedule_message)
+    store = InMemoryIdempotencyStore()
+    ctx = context(store)
+
+    asyncio.run(process_message(message(), ctx))
+    assert ctx.producer.sent == [f"{settings.KAFKA_AGENT_TOPIC}.retry.1"]
+    assert not processed(store, message())
+
+
+def test_a_message_is_marked_processed_once_its_deliveries_went_out(monkeypatch):
+    async def main():
+        delivery = asyncio.get_running_loop().create_future()
+
+        async def schedule_message(msg, data, ctx):
+            return [delivery]
+
+        monkeypatch.setattr(agent_consumer, "schedule_message", schedule_message)
+        store = InMemoryIdempotencyStore()
+        settling = await process_message(message(), context(store))
+        key = get_idempotency_key(settings.KAFKA_AGENT_TOPIC, {"uuid": "request-1"}, message().value)
+
+        assert not await store.is_processed(key)
+        delivery.set_result(None)
+        assert await settling is True
+        assert await store.is_processed(key)
+
+    asyncio.run(main())
@@ -0,0 +1,17 @@
+from conf import settings
+from services.kafka_producer import message_key
+
+
+def test_chat_requests_are_keyed_by_room():
+    message = {"room_id": "room-1", "uuid": "request-1"}
+    assert message_key(settings.KAFKA_AGENT_TOPIC, message) == b"room-1"
+    assert message_key(settings.KAFKA_AGENT_TOPIC, {"uuid": "request-1"}) is None
+
+
+def test_room_suggestions_are_keyed_by_batch():
+    message = {"room_id": "room-1", "uuid": "batch-1"}
+    assert message_key(settings.KAFKA_ROOM_SUGGESTION_TOPIC, message) == b"batch-1"
+
+
+def test_other_topics_are_not_keyed():
+    assert message_key(settings.KAFKA_ANALYTICS_TOPIC, {"room_id": "room-1"}) is None
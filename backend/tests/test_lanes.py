@@ -0,0 +1,67 @@
+import asyncio
+
+from workers.lanes import WeightedFairGate
+
+
+def test_slots_never_exceed_the_capacity():
+    async def main():
+        gate = WeightedFairGate(capacity=2)
+        gate.add_lane("chat", 1)
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            async with gate.slot("chat"):
+                peak = max(peak, gate.in_use)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(job() for _ in range(6)))
+        assert peak == 2
+        assert gate.in_use == 0
+
+    asyncio.run(main())
+
+
+def test_contended_slots_follow_the_lane_weights():
+    async def main():
+        gate = WeightedFairGate(capacity=1)
+        gate.add_lane("chat", 3)
+        gate.add_lane("batch", 1)
+        granted = []
+
+        async def job(lane):
+            async with gate.slot(lane):
+                granted.append(lane)
+                await asyncio.sleep(0)
+
+        # Hold the only slot so every job queues up before any is granted.
+        await gate.acquire("chat")
+        jobs = [asyncio.create_task(job(lane)) for lane in ["batch"] * 8 + ["chat"] * 8]
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*jobs)
+
+        first = granted[:8]
+        assert first.count("chat") == 6
+        assert first.count("batch") == 2
+
+    asyncio.run(main())
+
+
+def test_a_cancelled_waiter_does_not_leak_its_slot():
+    async def main():
+        gate = WeightedFairGate(capacity=1)
+        gate.add_lane("chat", 1)
+        await gate.acquire("chat")
+
+        waiter = asyncio.create_task(gate.acquire("chat"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        gate.release()
+        assert gate.in_use == 0
+        await asyncio.wait_for(gate.acquire("chat"), 1)
+        assert gate.in_use == 1
+
+    asyncio.run(main())
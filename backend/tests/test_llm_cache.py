@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.llm_cache import InMemoryLLMCache, SQLiteLLMCache, llm_cache_key
+
+
+def human(content):
+    return SimpleNamespace(type="human", content=content)
+
+
+def test_key_covers_model_messages_and_params():
+    key = llm_cache_key("gpt-4o", [human("hi")], {"temperature": 0})
+
+    assert key == llm_cache_key("gpt-4o", [human("hi")], {"temperature": 0})
+    assert key != llm_cache_key("gpt-4o-mini", [human("hi")], {"temperature": 0})
+    assert key != llm_cache_key("gpt-4o", [human("hello")], {"temperature": 0})
+    assert key != llm_cache_key("gpt-4o", [human("hi")], {"temperature": 1})
+
+
+def test_in_memory_cache_evicts_the_least_recently_used_entry():
+    async def main():
+        cache = InMemoryLLMCache(ttl=60, max_size=2)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        assert await cache.get("a") == "1"
+
+        await cache.set("c", "3")
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "1"
+        assert await cache.get("c") == "3"
+
+    asyncio.run(main())
+
+
+def test_in_memory_entries_expire_after_the_ttl():
+    async def main():
+        cache = InMemoryLLMCache(ttl=0.01)
+        await cache.set("a", "1")
+        await asyncio.sleep(0.05)
+        assert await cache.get("a") is None
+
+    asyncio.run(main())
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    async def main():
+        path = str(tmp_path / "llm_cache.sqlite3")
+        writer = SQLiteLLMCache(path, ttl=60)
+        reader = SQLiteLLMCache(path, ttl=60)
+        try:
+            await writer.set("a", "1")
+            assert await reader.get("a") == "1"
+            assert await reader.get("missing") is None
+        finally:
+            await writer.close()
+            await reader.close()
+
+    asyncio.run(main())
+
+
+def test_sqlite_cache_prunes_rows_beyond_max_size(tmp_path):
+    async def main():
+        path = str(tmp_path / "llm_cache.sqlite3")
+        cache = SQLiteLLMCache(path, ttl=60, max_size=2)
+        for key in ("a", "b", "c"):
+            await cache.set(key, key.upper())
+            await asyncio.sleep(0.01)
+        await cache.close()
+
+        # A fresh instance has an empty in-process front and reads the file.
+        reopened = SQLiteLLMCache(path, ttl=60)
+        try:
+            assert await reopened.get("a") is None
+            assert await reopened.get("c") == "C"
+        finally:
+            await reopened.close()
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.llm_rate_limiter import (
+    InMemoryTokenBucketLimiter,
+    LLMCallGovernor,
+    parse_rate_limits,
+    retry_after_seconds,
+)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+def elapsed(start):
+    return time.monotonic() - start
+
+
+def test_parse_rate_limits_reads_rpm_and_tpm_per_prefix():
+    assert parse_rate_limits("openai=500:200000, groq=30:6000,ollama=,") == {
+        "openai": (500, 200000),
+        "groq": (30, 6000),
+        "ollama": (0, 0),
+    }
+
+
+def test_retry_after_is_read_from_the_response_headers():
+    assert retry_after_seconds(RateLimitError(7)) == 7.0
+    assert retry_after_seconds(ValueError()) is None
+
+
+def test_calls_within_the_budget_do_not_wait():
+    async def main():
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=600, tpm=60000)
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire(1000)
+        assert elapsed(start) < 0.05
+
+    asyncio.run(main())
+
+
+def test_an_exhausted_token_bucket_waits_for_the_refill():
+    async def main():
+        # 60000 tokens per minute refill 1000 tokens per second.
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=0, tpm=60000)
+        await limiter.acquire(60000)
+        start = time.monotonic()
+        await limiter.acquire(100)
+        assert 0.08 <= elapsed(start) < 0.5
+
+    asyncio.run(main())
+
+
+def test_a_call_larger_than_the_budget_is_clamped_instead_of_waiting_forever():
+    async def main():
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=0, tpm=600)
+        await asyncio.wait_for(limiter.acquire(10000), 1)
+
+    asyncio.run(main())
+
+
+def test_callers_are_served_in_arrival_order():
+    async def main():
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=0, tpm=6000)
+        await limiter.acquire(6000)
+        served = []
+
+        async def call(name, tokens):
+            await limiter.acquire(tokens)
+            served.append(name)
+
+        large = asyncio.create_task(call("large", 20))
+        await asyncio.sleep(0)
+        small = asyncio.create_task(call("small", 1))
+        await asyncio.gather(large, small)
+        assert served == ["large", "small"]
+
+    asyncio.run(main())
+
+
+def test_refunded_tokens_are_available_again():
+    async def main():
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=0, tpm=6000)
+        await limiter.acquire(6000)
+        await limiter.adjust(-3000)
+        start = time.monotonic()
+        await limiter.acquire(3000)
+        assert elapsed(start) < 0.05
+
+    asyncio.run(main())
+
+
+def test_governor_caps_the_calls_in_flight():
+    async def main():
+        governor = LLMCallGovernor("openai", None, max_concurrency=2)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            async with governor.slot(100):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert peak == 2
+
+    asyncio.run(main())
+
+
+def test_a_429_blocks_the_budget_for_the_retry_after_delay():
+    async def main():
+        limiter = InMemoryTokenBucketLimiter("openai", rpm=600, tpm=60000)
+        governor = LLMCallGovernor("openai", limiter, max_concurrency=0)
+
+        with pytest.raises(RateLimitError):
+            async with governor.slot(100):
+                raise RateLimitError(0.1)
+
+        start = time.monotonic()
+        await limiter.acquire(100)
+        assert 0.08 <= elapsed(start) < 0.5
+
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from conf import settings
+from services import llm_router
+from services.llm_router import LatencyTracker, route
+
+
+@pytest.fixture(autouse=True)
+def fresh_trackers(monkeypatch):
+    monkeypatch.setattr(llm_router, "_trackers", {})
+    monkeypatch.setattr(settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.01)
+
+
+class FakeModels:
+    """Model calls answering after a delay, or failing."""
+
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.called = []
+        self.cancelled = []
+
+    async def invoke(self, model_name):
+        self.called.append(model_name)
+        try:
+            await asyncio.sleep(self.delays[model_name])
+        except asyncio.CancelledError:
+            self.cancelled.append(model_name)
+            raise
+        if model_name in self.failing:
+            raise RuntimeError(f"{model_name} is down")
+        return model_name
+
+
+def test_falls_back_to_the_next_model_after_an_error():
+    async def main():
+        models = FakeModels({"primary": 0, "fallback": 0}, failing=["primary"])
+        assert await route(["primary", "fallback"], models.invoke, hedge=False) == "fallback"
+        assert models.called == ["primary", "fallback"]
+
+    asyncio.run(main())
+
+
+def test_raises_the_last_error_when_every_model_fails():
+    async def main():
+        models = FakeModels({"primary": 0, "fallback": 0}, failing=["primary", "fallback"])
+        with pytest.raises(RuntimeError, match="fallback is down"):
+            await route(["primary", "fallback"], models.invoke)
+
+    asyncio.run(main())
+
+
+def test_a_fast_primary_is_not_hedged():
+    async def main():
+        models = FakeModels({"primary": 0, "fallback": 0})
+        assert await route(["primary", "fallback"], models.invoke) == "primary"
+        assert models.called == ["primary"]
+
+    asyncio.run(main())
+
+
+def test_a_slow_primary_is_hedged_and_the_loser_cancelled():
+    async def main():
+        models = FakeModels({"primary": 10, "fallback": 0})
+        result = await asyncio.wait_for(route(["primary", "fallback"], models.invoke), 1)
+        await asyncio.sleep(0)
+
+        assert result == "fallback"
+        assert models.called == ["primary", "fallback"]
+        assert models.cancelled == ["primary"]
+
+    asyncio.run(main())
+
+
+def test_hedge_delay_follows_the_p95_once_enough_samples_exist():
+    tracker = LatencyTracker(window=100, min_samples=20)
+    for _ in range(19):
+        tracker.record(2.0)
+    assert tracker.hedge_delay() == settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+
+    tracker.record(2.0)
+    assert tracker.hedge_delay() == 2.0
+
+
+def test_timed_records_only_successful_calls():
+    async def main():
+        models = FakeModels({"primary": 0, "fallback": 0}, failing=["fallback"])
+        await llm_router.timed("primary", models.invoke("primary"))
+        with pytest.raises(RuntimeError):
+            await llm_router.timed("fallback", models.invoke("fallback"))
+
+    asyncio.run(main())
+    assert len(llm_router.get_latency_tracker("primary")._samples) == 1
+    assert len(llm_router.get_latency_tracker("fallback")._samples) == 0
@@ -0,0 +1,57 @@
+from aiokafka import TopicPartition
+
+from workers.offsets import OffsetTracker
+
+TP = TopicPartition("agent", 0)
+
+
+def test_position_is_none_before_anything_is_consumed():
+    assert OffsetTracker().position(TP) is None
+
+
+def test_only_the_contiguous_completed_prefix_is_committable():
+    tracker = OffsetTracker()
+    for offset in (10, 11, 12):
+        tracker.track(TP, offset)
+
+    tracker.complete(TP, 11)
+    tracker.complete(TP, 12)
+    assert tracker.position(TP) == 10
+    assert tracker.in_flight == 1
+
+    tracker.complete(TP, 10)
+    assert tracker.position(TP) == 13
+    assert tracker.committable() == {TP: 13}
+
+
+def test_committed_offsets_are_not_returned_again():
+    tracker = OffsetTracker()
+    tracker.track(TP, 0)
+    tracker.complete(TP, 0)
+    tracker.mark_committed(tracker.committable())
+    assert tracker.committable() == {}
+
+    tracker.track(TP, 1)
+    assert tracker.committable() == {}
+    tracker.complete(TP, 1)
+    assert tracker.committable() == {TP: 2}
+
+
+def test_partitions_are_tracked_independently():
+    other = TopicPartition("agent", 1)
+    tracker = OffsetTracker()
+    tracker.track(TP, 5)
+    tracker.track(other, 7)
+    tracker.complete(other, 7)
+
+    assert tracker.committable() == {TP: 5, other: 8}
+
+
+def test_forget_drops_revoked_partitions():
+    tracker = OffsetTracker()
+    tracker.track(TP, 3)
+    tracker.forget([TP])
+
+    assert tracker.position(TP) is None
+    assert tracker.in_flight == 0
+    assert tracker.committable() == {}
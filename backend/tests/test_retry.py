@@ -0,0 +1,128 @@
+import asyncio
+from collections import namedtuple
+
+from aiokafka import TopicPartition
+
+from conf import settings
+from workers import agent_consumer
+from workers.agent_consumer import ConsumerContext, run_consumer_loop
+from workers.backpressure import PartitionPauser
+from workers.idempotency import InMemoryIdempotencyStore
+from workers.offsets import OffsetTracker
+from workers.retry import ATTEMPT_HEADER, FAILURE_REASON_HEADER, ORIGINAL_TOPIC_HEADER, RetryPolicy
+
+Message = namedtuple("Message", "topic partition offset key value headers timestamp")
+
+
+class FakeProducer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def send_and_wait(self, topic, value, key=None, headers=None):
+        if self.fail:
+            raise ConnectionError("broker unavailable")
+        self.sent.append((topic, value, key, dict(headers)))
+
+
+def route(policy, producer, headers=(), retryable=True):
+    return asyncio.run(policy.route_failure(
+        producer, "agent", b"payload", list(headers), reason="boom", key=b"room-1", retryable=retryable,
+    ))
+
+
+def test_failures_go_to_the_next_retry_tier():
+    policy, producer = RetryPolicy([1.0, 10.0]), FakeProducer()
+
+    assert route(policy, producer) == "agent.retry.1"
+    _, _, _, headers = producer.sent[-1]
+    assert route(policy, producer, headers.items()) == "agent.retry.2"
+
+    topic, value, key, headers = producer.sent[-1]
+    assert (value, key) == (b"payload", b"room-1")
+    assert headers[ATTEMPT_HEADER] == b"2"
+    assert headers[ORIGINAL_TOPIC_HEADER] == b"agent"
+
+
+def test_failures_go_to_the_dead_letter_topic_after_the_last_delay():
+    policy, producer = RetryPolicy([1.0]), FakeProducer()
+    retried = [(ATTEMPT_HEADER, b"1"), (ORIGINAL_TOPIC_HEADER, b"agent")]
+
+    assert policy.is_final_attempt(retried)
+    assert route(policy, producer, retried) == "agent.dlq"
+    assert producer.sent[-1][3][FAILURE_REASON_HEADER] == b"boom"
+
+
+def test_non_retryable_failures_skip_the_retry_tiers():
+    assert route(RetryPolicy([1.0]), FakeProducer(), retryable=False) == "agent.dlq"
+
+
+class FakeConsumer:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.committed = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.messages:
+            raise StopAsyncIteration
+        return self.messages.pop(0)
+
+    def assignment(self):
+        return {TopicPartition(settings.KAFKA_AGENT_TOPIC, 0)}
+
+    def pause(self, *partitions):
+        pass
+
+    def resume(self, *partitions):
+        pass
+
+    async def commit(self, offsets):
+        self.committed.append(offsets)
+
+
+class FakeLanes:
+    def __init__(self):
+        self.pauser = PartitionPauser()
+        self.lanes = {}
+
+    async def cancel(self):
+        pass
+
+
+class FakeDispatcher:
+    pending = 0
+
+    async def cancel(self):
+        pass
+
+
+def test_a_failure_that_cannot_be_routed_leaves_its_offset_uncommitted(monkeypatch):
+    async def schedule_message(msg, data, ctx):
+        if data["uuid"] == "failing":
+            raise RuntimeError("workflow failed")
+        return []
+
+    monkeypatch.setattr(agent_consumer, "schedule_message", schedule_message)
+    monkeypatch.setattr(settings, "CONSUMER_SPOOL_UNFINISHED", False)
+    ctx = ConsumerContext(
+        producer=FakeProducer(fail=True),
+        lanes=FakeLanes(),
+        dispatcher=FakeDispatcher(),
+        store=InMemoryIdempotencyStore(),
+        coalescer=None,
+        retry_policy=RetryPolicy([1.0]),
+        batches=None,
+    )
+    messages = [
+        Message(settings.KAFKA_AGENT_TOPIC, 0, offset, b"room-1", f'{{"uuid": "{uuid}"}}'.encode(), [], 0)
+        for offset, uuid in enumerate(["done", "failing", "after"])
+    ]
+    consumer, tracker = FakeConsumer(messages), OffsetTracker()
+
+    asyncio.run(run_consumer_loop(consumer, ctx, tracker))
+
+    # The failed message is consumed again from offset 1 after a restart.
+    assert consumer.committed == [{TopicPartition(settings.KAFKA_AGENT_TOPIC, 0): 1}]
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from workers import agent_consumer
+from workers.agent_consumer import finalize_room_suggestion_batch
+from workers.room_batches import RoomBatchAggregator
+
+HISTORY = [{"user_id": "1", "role": "user", "sender": "Ana", "content": "hola"}]
+
+
+def test_the_last_room_waits_for_its_siblings():
+    async def main():
+        batches = RoomBatchAggregator(ttl=60)
+        for room in ("room-1", "room-2", "room-last"):
+            batches.expect("batch", room)
+
+        waiting = asyncio.create_task(batches.wait_for_rooms("batch", 1, exclude="room-last"))
+        batches.settle("batch", "room-1")
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        batches.settle("batch", "room-2")
+        assert await asyncio.wait_for(waiting, 0.5) == 0
+
+    asyncio.run(main())
+
+
+def test_waiting_gives_up_after_the_timeout():
+    async def main():
+        batches = RoomBatchAggregator(ttl=60)
+        batches.expect("batch", "room-1")
+        batches.expect("batch", "room-last")
+
+        start = time.monotonic()
+        assert await batches.wait_for_rooms("batch", 0.05, exclude="room-last") == 1
+        assert time.monotonic() - start < 0.5
+
+    asyncio.run(main())
+
+
+def test_a_redelivered_room_replaces_its_contribution():
+    batches = RoomBatchAggregator(ttl=60)
+    batches.add("batch", "room-1", {"frequent_words": {"futbol": 2}})
+    batches.add("batch", "room-1", {"frequent_words": {"futbol": 3}})
+    batches.add("batch", "room-2", {"frequent_words": ["futbol", "cine"]})
+
+    summary = batches.summary("batch")
+    assert summary["frequent_words"] == {"futbol": 4, "cine": 1}
+    assert [room["room_id"] for room in summary["rooms"]] == ["room-1", "room-2"]
+
+
+def test_inactive_batches_expire_after_the_ttl():
+    batches = RoomBatchAggregator(ttl=0.01)
+    batches.add("stale", "room-1", {"main_topic": ["futbol"]})
+    time.sleep(0.02)
+    batches.add("fresh", "room-1", {"main_topic": ["cine"]})
+
+    assert batches.summary("stale") is None
+    assert batches.summary("fresh") is not None
+
+
+class FakeWorkflow:
+    def __init__(self):
+        self.inputs = []
+
+    async def ainvoke(self, inputs, config):
+        self.inputs.append(inputs)
+        return {"room_suggestion": {"room_name": "Futbol"}}
+
+
+class FakeRegistry:
+    def __init__(self, workflow):
+        self.workflow = workflow
+
+    async def get(self, name):
+        return self.workflow
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, url, payload, uuid):
+        self.sent.append((payload, uuid))
+
+
+def test_the_last_message_finalizes_the_batch_from_its_totals(monkeypatch):
+    workflow, dispatcher = FakeWorkflow(), FakeDispatcher()
+    monkeypatch.setattr(agent_consumer, "workflow_registry", FakeRegistry(workflow))
+    batches = RoomBatchAggregator(ttl=60)
+    batches.add("batch", "room-1", {"frequent_hashtags": {"#gol": 1}})
+    data = {"uuid": "batch", "room_id": "room-last", "is_last": True, "rooms_created": [], "historical_messages": HISTORY}
+
+    asyncio.run(finalize_room_suggestion_batch(data, dispatcher, batches))
+
+    assert workflow.inputs[0]["batch_summary"]["frequent_hashtags"] == {"#gol": 1}
+    assert dispatcher.sent == [({"suggestion": {"room_name": "Futbol"}}, "batch")]
+    assert batches.summary("batch") is None
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from workers.scheduler import KeyedScheduler
+
+
+def test_jobs_of_a_key_complete_in_submission_order():
+    async def main():
+        scheduler = KeyedScheduler(max_keys_in_flight=4)
+        finished = []
+
+        def job(name, delay):
+            async def run():
+                await asyncio.sleep(delay)
+                finished.append(name)
+                return name
+            return run
+
+        futures = [
+            scheduler.submit("room", job("slow", 0.05)),
+            scheduler.submit("room", job("fast", 0)),
+            scheduler.submit("room", job("last", 0.01)),
+        ]
+        assert await asyncio.gather(*futures) == ["slow", "fast", "last"]
+        assert finished == ["slow", "fast", "last"]
+
+    asyncio.run(main())
+
+
+def test_different_keys_run_in_parallel_up_to_the_limit():
+    async def main():
+        scheduler = KeyedScheduler(max_keys_in_flight=2)
+        running = peak = 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.submit(f"room-{i}", job) for i in range(5)))
+        assert peak == 2
+
+    asyncio.run(main())
+
+
+def test_a_failing_job_does_not_stop_its_key():
+    async def main():
+        scheduler = KeyedScheduler(max_keys_in_flight=1)
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def succeed():
+            return "ok"
+
+        failed = scheduler.submit("room", fail)
+        succeeded = scheduler.submit("room", succeed)
+        with pytest.raises(ValueError):
+            await failed
+        assert await succeeded == "ok"
+        await scheduler.join()
+        assert scheduler.active_keys == 0
+
+    asyncio.run(main())
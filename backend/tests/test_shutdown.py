@@ -0,0 +1,56 @@
+import asyncio
+from collections import namedtuple
+
+from aiokafka import TopicPartition
+
+from workers.offsets import OffsetTracker
+from workers.shutdown import drain_tasks, spool_messages
+
+Message = namedtuple("Message", "topic partition offset key value headers")
+TP = TopicPartition("agent", 0)
+
+
+class FakeProducer:
+    def __init__(self, fail_offsets=()):
+        self.fail_offsets = set(fail_offsets)
+        self.sent = []
+
+    async def send_and_wait(self, topic, value, key=None, headers=None):
+        if value in self.fail_offsets:
+            raise ConnectionError("broker unavailable")
+        self.sent.append((topic, value))
+
+
+def message(offset):
+    return Message(TP.topic, TP.partition, offset, b"room", offset, [])
+
+
+def test_drain_returns_the_messages_that_missed_the_deadline():
+    async def main():
+        fast = asyncio.create_task(asyncio.sleep(0))
+        slow = asyncio.create_task(asyncio.sleep(10))
+        unfinished = await drain_tasks({fast: message(0), slow: message(1)}, timeout=0.05)
+
+        assert unfinished == [message(1)]
+        assert slow.cancelled()
+
+    asyncio.run(main())
+
+
+def test_spooled_messages_let_the_commit_move_past_them():
+    async def main():
+        tracker = OffsetTracker()
+        for offset in range(4):
+            tracker.track(TP, offset)
+        tracker.complete(TP, 0)
+        tracker.complete(TP, 3)
+
+        producer = FakeProducer(fail_offsets=[2])
+        spooled = await spool_messages(producer, [message(1), message(2)], tracker)
+
+        assert spooled == 1
+        assert producer.sent == [("agent", 1)]
+        # Offset 2 could not be spooled, so it is redelivered from there.
+        assert tracker.committable() == {TP: 2}
+
+    asyncio.run(main())
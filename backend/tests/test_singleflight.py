@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from utils.singleflight import SingleFlight, canonical_key, singleflight
+
+
+class Body(BaseModel):
+    room_id: str
+    limit: int = 10
+
+
+def test_keys_ignore_argument_order_but_not_values():
+    first = canonical_key("route", {"body": Body(room_id="a"), "page": 1})
+    assert first == canonical_key("route", {"page": 1, "body": Body(limit=10, room_id="a")})
+    assert first != canonical_key("route", {"body": Body(room_id="b"), "page": 1})
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def main():
+        group = SingleFlight("test")
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(group.do("key", call) for _ in range(5)))
+        assert results == [1] * 5
+        assert group.in_flight == 0
+
+        # The key is forgotten once the call completes: nothing is cached.
+        assert await group.do("key", call) == 2
+
+    asyncio.run(main())
+
+
+def test_an_error_reaches_every_waiter():
+    async def main():
+        group = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError] * 3
+
+    asyncio.run(main())
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    async def main():
+        group = SingleFlight("test")
+
+        async def call():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(group.do("key", call))
+        second = asyncio.create_task(group.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+
+
+def test_decorated_routes_coalesce_on_their_arguments():
+    calls = []
+
+    @singleflight("decorated")
+    async def route(body: Body):
+        calls.append(body.room_id)
+        await asyncio.sleep(0.01)
+        return body.room_id
+
+    async def main():
+        return await asyncio.gather(
+            route(body=Body(room_id="a")),
+            route(body=Body(room_id="a")),
+            route(body=Body(room_id="b")),
+        )
+
+    assert asyncio.run(main()) == ["a", "a", "b"]
+    assert sorted(calls) == ["a", "b"]
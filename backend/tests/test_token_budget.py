@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from conf import settings
+from services import token_budget
+from services.llm_rate_limiter import estimate_tokens
+from services.token_budget import Tokenizer, context_window, prompt_budget, truncate_tokens
+from utils import get_prompts
+
+# One token per character, so budgets can be checked by hand.
+CHARACTERS = Tokenizer(
+    "characters",
+    lambda text: [ord(c) for c in text],
+    lambda tokens: "".join(chr(t) for t in tokens),
+)
+
+
+@pytest.fixture(autouse=True)
+def character_tokenizer(monkeypatch):
+    monkeypatch.setattr(token_budget, "get_tokenizer", lambda model_name: CHARACTERS)
+    monkeypatch.setattr(get_prompts, "get_tokenizer", lambda model_name: CHARACTERS)
+    monkeypatch.setattr(settings, "LLM_CONTEXT_WINDOWS", "small=200,large=1000")
+    monkeypatch.setattr(settings, "LLM_DEFAULT_CONTEXT_WINDOW", 500)
+    monkeypatch.setattr(settings, "LLM_COMPLETION_RESERVE_TOKENS", 100)
+
+
+class FakePrompt:
+    def __init__(self, content):
+        self.content = content
+        self.metadata = {}
+
+    def format_messages(self):
+        return [SimpleNamespace(type="human", content=self.content)]
+
+
+def lines(prefix, count):
+    return "\n".join(f"{prefix}{i:02d}" for i in range(count))
+
+
+def test_context_window_uses_the_longest_matching_prefix():
+    assert context_window("small-chat") == 200
+    assert context_window("large") == 1000
+    assert context_window("unknown") == 500
+
+
+def test_prompt_budget_fits_the_smallest_window():
+    assert prompt_budget(["large", "small"]) == ("small", 100)
+
+
+def test_truncate_keeps_whole_lines_at_the_requested_end():
+    text = "line-1\nline-2\nline-3"
+
+    assert truncate_tokens("small", text, 100) == text
+    assert truncate_tokens("small", text, 10, keep="end") == "line-3"
+    assert truncate_tokens("small", text, 10, keep="start") == "line-1"
+    assert truncate_tokens("small", text, 0) == ""
+
+
+def test_prompt_is_trimmed_to_the_budget_lowest_priority_first(monkeypatch):
+    compiled = []
+
+    async def compile_prompt(prompt_name, **kwargs):
+        compiled.append(kwargs)
+        return FakePrompt(f"{kwargs['news']}|{kwargs['history']}")
+
+    monkeypatch.setattr(get_prompts, "compile_prompt", compile_prompt)
+    news, history = lines("news", 8), lines("msg", 8)
+
+    async def main():
+        return await get_prompts.compile_prompt_within_budget(
+            "chat", ["small"], trim={"news": "start", "history": "end"},
+            news=news, history=history,
+        )
+
+    prompt = asyncio.run(main())
+    messages = prompt.format_messages()
+
+    assert prompt.metadata["prompt_tokens"] == token_budget.count_message_tokens("small", messages) <= 100
+    assert compiled[-1]["history"] == history
+    assert news.startswith(compiled[-1]["news"]) and compiled[-1]["news"] != news
+
+
+def test_prompt_that_cannot_be_trimmed_is_returned_as_is(monkeypatch):
+    compiled = []
+
+    async def compile_prompt(prompt_name, **kwargs):
+        compiled.append(kwargs)
+        return FakePrompt("x" * 300)
+
+    monkeypatch.setattr(get_prompts, "compile_prompt", compile_prompt)
+
+    prompt = asyncio.run(get_prompts.compile_prompt_within_budget("chat", ["small"], trim={"news": "end"}))
+
+    assert prompt.content == "x" * 300
+    assert prompt.metadata["prompt_tokens"] == 300 + token_budget.TOKENS_PER_MESSAGE + token_budget.TOKENS_PER_REPLY
+    assert len(compiled) == 1
+
+
+def test_long_prompts_are_counted_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def encode(text):
+        threads.append(threading.current_thread())
+        return list(text)
+
+    monkeypatch.setattr(token_budget, "get_tokenizer", lambda model_name: Tokenizer("characters", encode, None))
+    short = [SimpleNamespace(content="x" * 10)]
+    long = [SimpleNamespace(content="x" * token_budget.OFFLOAD_MIN_CHARACTERS)]
+
+    async def main():
+        await token_budget.count_message_tokens_async("small", short)
+        await token_budget.count_message_tokens_async("small", long)
+
+    asyncio.run(main())
+    assert threads[0] is threading.main_thread()
+    assert threads[1] is not threading.main_thread()
+
+
+def test_a_known_prompt_count_is_not_tokenized_again(monkeypatch):
+    def fail(model_name):
+        raise AssertionError("prompt tokenized again")
+
+    monkeypatch.setattr(token_budget, "get_tokenizer", fail)
+    assert asyncio.run(estimate_tokens("small", [SimpleNamespace(content="hello")], 100, prompt_tokens=12)) == 112
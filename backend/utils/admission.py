@@ -0,0 +1,180 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from conf import settings
+from core.logging_config import get_logger
+from core.metrics_config import (
+    ADMISSION_DECISIONS,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUED,
+    ADMISSION_SERVICE_SECONDS,
+)
+
+logger = get_logger(__name__)
+
+# Weight of the latest request in the service time moving average.
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class AdmissionController:
+    """
+    Concurrency budget with a bounded wait queue for one route.
+
+    At most `max_in_flight` requests run at once and at most `max_queue`
+    wait for a slot. A request is shed right away, with a `Retry-After`
+    derived from the observed service time, when the queue is full (429)
+    or when its expected wait plus service time would exceed the latency
+    SLO (503). Shedding early keeps each worker from piling up coroutines
+    that would time out upstream anyway.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, slo_seconds: float) -> None:
+        """
+        Initialize the controller.
+
+        Args:
+            name: Route label used in logs and metrics.
+            max_in_flight: Requests allowed to run at the same time.
+            max_queue: Requests allowed to wait for a slot.
+            slo_seconds: Latency objective of the route, queueing included.
+        """
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.slo_seconds = slo_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.service_time: Optional[float] = None
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+        ADMISSION_IN_FLIGHT.labels(name).set_function(lambda: self.in_flight)
+        ADMISSION_QUEUED.labels(name).set_function(lambda: self.queued)
+
+    def expected_wait(self) -> float:
+        """Seconds a new request is expected to wait for a slot."""
+        if self.in_flight < self.max_in_flight:
+            return 0.0
+        return (self.queued + 1) / self.max_in_flight * (self.service_time or 0.0)
+
+    def _reject(self, status_code: int, decision: str, detail: str) -> HTTPException:
+        ADMISSION_DECISIONS.labels(self.name, decision).inc()
+        retry_after = max(1, math.ceil(self.expected_wait() or self.service_time or 1))
+        logger.warning(f"Shedding {self.name} request ({decision}): {detail}")
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    async def acquire(self, shed: bool = True) -> None:
+        """
+        Waits for a slot.
+
+        Args:
+            shed: False to wait for a slot however long it takes, for work
+                that was already accepted (the items of a bulk request).
+
+        Raises:
+            HTTPException: 429 if the queue is full, 503 if the request
+                would miss the SLO.
+        """
+        if shed and self.in_flight >= self.max_in_flight:
+            if self.queued >= self.max_queue:
+                raise self._reject(429, "queue_full", f"Too many pending {self.name} requests")
+
+            budget = self.slo_seconds - (self.service_time or 0.0)
+            if self.expected_wait() > budget:
+                raise self._reject(503, "slo", f"{self.name} cannot be served within {self.slo_seconds}s")
+
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), max(budget, 0.0))
+            except asyncio.TimeoutError:
+                raise self._reject(503, "timeout", f"{self.name} cannot be served within {self.slo_seconds}s")
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+
+        self.in_flight += 1
+        ADMISSION_DECISIONS.labels(self.name, "admitted").inc()
+
+    def release(self, service_time: float) -> None:
+        """Frees a slot and records the service time of the finished request."""
+        self.in_flight -= 1
+        self._slots.release()
+        ADMISSION_SERVICE_SECONDS.labels(self.name).observe(service_time)
+        if self.service_time is None:
+            self.service_time = service_time
+        else:
+            self.service_time += SERVICE_TIME_SMOOTHING * (service_time - self.service_time)
+
+    @asynccontextmanager
+    async def admit(self, shed: bool = True) -> AsyncIterator[None]:
+        """Holds a slot for the duration of the block."""
+        await self.acquire(shed)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    async def stream(self, body: AsyncIterator[Any], started: float) -> AsyncIterator[Any]:
+        """Yields a response body from an acquired slot, releasing it when the stream ends."""
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.release(time.monotonic() - started)
+
+
+def admission_control(name: str, max_in_flight: int):
+    """
+    Decorator running an async route under its own AdmissionController.
+
+    The wait queue size and the latency SLO come from ADMISSION_MAX_QUEUE
+    and ADMISSION_SLO_SECONDS. Does nothing if ADMISSION_ENABLED is false.
+    A route returning a StreamingResponse keeps its slot until the stream
+    ends, since its work runs while the body is sent. Apply it below the
+    router decorator.
+
+    Args:
+        name: Route label used in logs and metrics.
+        max_in_flight: Concurrency budget of the route in each worker.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        if not settings.ADMISSION_ENABLED:
+            return func
+        controller = AdmissionController(
+            name,
+            max_in_flight=max_in_flight,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            slo_seconds=settings.ADMISSION_SLO_SECONDS,
+        )
+
+        @wraps(func)
+        async def wrapper(**kwargs: Any) -> Any:
+            await controller.acquire()
+            started = time.monotonic()
+            try:
+                response = await func(**kwargs)
+            except BaseException:
+                controller.release(time.monotonic() - started)
+                raise
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = controller.stream(response.body_iterator, started)
+            else:
+                controller.release(time.monotonic() - started)
+            return response
+
+        wrapper.admission = controller
+        return wrapper
+
+    return decorator
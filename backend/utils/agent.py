@@ -42,10 +42,8 @@ def num_tokens_from_messages(
         model: Model identifier to select encoding rules.
 
     Returns:
-        Total token count for the provided messages.
-
-    Raises:
-        NotImplementedError: If token counting is not supported for the model.
+        Total token count for the provided messages. Models unknown to
+        tiktoken are approximated with the 'o200k_base' encoding.
     """
     try:
         encoding = tiktoken.encoding_for_model(model)
@@ -90,9 +88,11 @@ def num_tokens_from_messages(
         )
         return num_tokens_from_messages(messages, model="gpt-4-0613")
     else:
-        raise NotImplementedError(
-            f"num_tokens_from_messages not implemented for model {model}"
-        )
+        # Other providers: approximate with the fallback encoding and the
+        # usual chat-template overhead (see services.token_budget for
+        # per-model tokenizers).
+        tokens_per_message = 3
+        tokens_per_name = 1
 
     # Count tokens for each message
     total_tokens = 0
@@ -1,9 +1,14 @@
 import asyncio
+from typing import Mapping, Sequence
 
 from langfuse import Langfuse
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 from conf import settings
+from core.logging_config import get_logger
+from services.token_budget import count_message_tokens_async, get_tokenizer, prompt_budget, truncate_tokens
+
+logger = get_logger(__name__)
 
 
 langfuse = Langfuse(
@@ -39,4 +44,75 @@ async def compile_prompt(prompt_name: str, **kwargs) -> ChatPromptTemplate:
         elif role == "assistant":
             messages.append(AIMessage(content=content))
     prompt_template = ChatPromptTemplate.from_messages(messages)
+    prompt_template.metadata = {"prompt_name": prompt_name}
+    return prompt_template
+
+
+def _trim_variable(model_name: str, value: str, excess: int, keep: str) -> tuple[str, int]:
+    """Cuts `excess` tokens from a template variable; returns it and the tokens removed."""
+    tokenizer = get_tokenizer(model_name)
+    size = tokenizer.count(value)
+    trimmed = truncate_tokens(model_name, value, size - excess, keep)
+    return trimmed, size - tokenizer.count(trimmed)
+
+
+async def compile_prompt_within_budget(
+    prompt_name: str,
+    model_names: Sequence[str],
+    trim: Mapping[str, str],
+    **kwargs,
+) -> ChatPromptTemplate:
+    """
+    Compiles a Langfuse prompt that fits the context window of its models.
+
+    When the compiled prompt exceeds the budget of `prompt_budget`, the
+    variables listed in `trim` are shortened, lowest priority first, by as
+    many tokens as needed before compiling it again, instead of letting the
+    provider reject the call. The prompt's token count is kept in its
+    metadata (`prompt_tokens`), so the rate limiter does not count it again.
+
+    Args:
+        prompt_name (str): Name of the prompt in Langfuse.
+        model_names (Sequence[str]): Models the prompt may be sent to.
+        trim (Mapping[str, str]): Variables that may be shortened, lowest
+            priority first, mapped to the part to keep (`end` or `start`).
+        **kwargs: Template variables.
+
+    Returns:
+        ChatPromptTemplate: The compiled prompt, trimmed if needed.
+    """
+    model_name, budget = prompt_budget(model_names)
+    prompt_template = await compile_prompt(prompt_name, **kwargs)
+    prompt_tokens = await count_message_tokens_async(model_name, prompt_template.format_messages())
+
+    # Tokenization of a joined text differs slightly from the sum of its
+    # parts, so the trimmed prompt is measured again.
+    for _ in range(3):
+        overflow = prompt_tokens - budget
+        if overflow <= 0:
+            break
+
+        logger.info(f"Prompt '{prompt_name}' exceeds the budget of '{model_name}' by {overflow} tokens, trimming.")
+        trimmed = False
+        for variable, keep in trim.items():
+            value = kwargs.get(variable)
+            if not isinstance(value, str) or not value:
+                continue
+            # Only contexts too long for the model are trimmed: encoding
+            # them would block the event loop.
+            kwargs[variable], removed = await asyncio.to_thread(_trim_variable, model_name, value, overflow, keep)
+            trimmed = trimmed or removed > 0
+            overflow -= removed
+            if overflow <= 0:
+                break
+        if not trimmed:
+            break
+        prompt_template = await compile_prompt(prompt_name, **kwargs)
+        prompt_tokens = await count_message_tokens_async(model_name, prompt_template.format_messages())
+
+    if prompt_tokens > budget:
+        logger.warning(
+            f"Prompt '{prompt_name}' still exceeds the budget of '{model_name}' by {prompt_tokens - budget} tokens after trimming."
+        )
+    prompt_template.metadata["prompt_tokens"] = prompt_tokens
     return prompt_template
@@ -1,2 +1,3 @@
 from .service import HealthCheckFactory  # noqa: F401
 from .route import healthCheckRoute  # noqa: F401
+from .kafka import HealthCheckKafkaProducer  # noqa: F401
@@ -0,0 +1,31 @@
+from typing import List, Optional
+
+from .domain import HealthCheckInterface
+from .enum import HealthCheckStatusEnum
+from .service import HealthCheckBase
+
+
+class HealthCheckKafkaProducer(HealthCheckBase, HealthCheckInterface):
+    """Reports the state of the application's shared Kafka producer."""
+
+    _connectionUri: str
+    _alias: str
+    _tags: List[str]
+
+    def __init__(
+        self,
+        producer,
+        connectionUri: str,
+        alias: str = "kafka-producer",
+        tags: Optional[List[str]] = None,
+    ) -> None:
+        self._service = "kafka"
+        self._producer = producer
+        self.setConnectionUri(connectionUri)
+        self._alias = alias
+        self._tags = tags or ["kafka"]
+
+    def __checkHealth__(self) -> HealthCheckStatusEnum:
+        if self._producer.is_healthy():
+            return HealthCheckStatusEnum.HEALTHY
+        return HealthCheckStatusEnum.UNHEALTHY
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from core.logging_config import get_logger
+from core.metrics_config import SINGLEFLIGHT_IN_FLIGHT, SINGLEFLIGHT_REQUESTS
+
+logger = get_logger(__name__)
+
+
+def canonical_key(name: str, arguments: Dict[str, Any]) -> str:
+    """
+    Returns a stable hash of a call's name and arguments.
+
+    Pydantic models are hashed by their validated content, so two bodies
+    differing only in key order or whitespace give the same key.
+    """
+    def encode(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json")
+        return value
+
+    payload = json.dumps(
+        {"name": name, "arguments": {key: encode(value) for key, value in arguments.items()}},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one execution.
+
+    The first call for a key runs as a task; calls with the same key made
+    while it is in flight await that task instead of starting their own,
+    and all of them get its result or exception. The key is forgotten as
+    soon as the call completes, so results are never cached.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Initialize the group.
+
+        Args:
+            name: Label of the coalesced calls in the metrics.
+        """
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `call` for `key`, or joins the identical call already in flight."""
+        task = self._calls.get(key)
+        if task is None:
+            SINGLEFLIGHT_REQUESTS.labels(self.name, "miss").inc()
+            task = self._calls[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _, key=key: self._calls.pop(key, None))
+        else:
+            SINGLEFLIGHT_REQUESTS.labels(self.name, "hit").inc()
+            logger.info(f"Joining in-flight {self.name} call {key[:12]}")
+        # A caller going away must not cancel the call for the others.
+        return await asyncio.shield(task)
+
+
+def singleflight(name: Optional[str] = None):
+    """
+    Decorator coalescing identical concurrent calls of an async route.
+
+    Calls are keyed by a canonical hash of the route's validated arguments,
+    so retries of a still-running request share its execution and result.
+    Apply it below the router decorator:
+
+        @router.post("/path")
+        @singleflight()
+        async def handler(request: Model = Body(...)): ...
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        group = SingleFlight(name or func.__name__)
+        SINGLEFLIGHT_IN_FLIGHT.labels(group.name).set_function(lambda: group.in_flight)
+
+        @wraps(func)
+        async def wrapper(**kwargs: Any) -> Any:
+            key = canonical_key(func.__qualname__, kwargs)
+            return await group.do(key, lambda: func(**kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+from core.logging_config import get_logger
+from schemas.agent import SSEResponse, StreamingDataTypeEnum, StreamingSignalsEnum
+
+logger = get_logger(__name__)
+
+
+class StreamHandler:
+    """
+    Channel between a running workflow and the SSE response streaming it.
+
+    Passed to the workflow as the `stream_handler` state key: nodes put
+    `SSEResponse` events (LLM tokens, signals) on `queue`, and `done` is
+    set once the workflow has finished.
+    """
+
+    def __init__(self) -> None:
+        self.queue: "asyncio.Queue[Optional[SSEResponse]]" = asyncio.Queue()
+        self.done = asyncio.Event()
+
+
+def signal(name: StreamingSignalsEnum, **metadata: Any) -> SSEResponse:
+    """Builds a signal event."""
+    return SSEResponse(data=name.value, dataType=StreamingDataTypeEnum.SIGNAL, metadata=metadata)
+
+
+def format_sse(event: SSEResponse) -> str:
+    """Serializes an event as a Server-Sent Events message."""
+    return f"data: {event.model_dump_json()}\n\n"
+
+
+async def stream_workflow(workflow, state: Dict[str, Any], config: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Runs a workflow and yields its progress as Server-Sent Events.
+
+    Emits START, a NODE_END signal (with the node name) as each node
+    completes, the LLM tokens nodes put on the stream handler while they
+    are generated, and END with the final outputs. A failure is reported
+    with an ERROR signal. The workflow is cancelled if the client goes away.
+
+    Args:
+        workflow: Compiled LangGraph workflow.
+        state: Initial state; a `stream_handler` key is added to it.
+        config: Runnable config of the invocation.
+    """
+    handler = StreamHandler()
+    outputs: Dict[str, Any] = {}
+
+    async def run() -> None:
+        try:
+            await handler.queue.put(signal(StreamingSignalsEnum.START, uui_id=config.get("uui_id", "")))
+            async for update in workflow.astream({**state, "stream_handler": handler}, config=config, stream_mode="updates"):
+                for node, values in update.items():
+                    if isinstance(values, dict):
+                        outputs.update(values)
+                    await handler.queue.put(signal(StreamingSignalsEnum.NODE_END, node=node))
+
+            await handler.queue.put(signal(
+                StreamingSignalsEnum.END,
+                uui_id=config.get("uui_id", ""),
+                list_message=outputs.get("list_message") or [],
+                user_id=outputs.get("agent_id_executed", ""),
+                send_message=bool(outputs.get("agent_id_executed")),
+            ))
+        except Exception as e:
+            logger.exception(f"Error streaming workflow {config.get('uui_id', '')}: {e}")
+            await handler.queue.put(signal(StreamingSignalsEnum.ERROR, error=str(e)))
+        finally:
+            handler.done.set()
+            await handler.queue.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (event := await handler.queue.get()) is not None:
+            yield format_sse(event)
+    finally:
+        # The client disconnected before the end: stop the workflow.
+        if not task.done():
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
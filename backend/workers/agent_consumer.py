@@ -4,24 +4,50 @@
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import asyncio
+import signal
 import time
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from dataclasses import dataclass
+from functools import partial
+from typing import Awaitable, Callable, Optional
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
 import json
 from langfuse.callback import CallbackHandler
+from prometheus_client import start_http_server
+from pydantic import ValidationError
 
 from schemas.agent import InvokeWorkflowRequest, TopicSuggestionsRequest
 from schemas.suggested_rooms import RoomSuggestionsRequest
-from services.agent.multi_agents import MultiAgents
+from services.agent.workflow_registry import workflow_registry
+from services.kafka_producer import create_kafka_producer
+from services.kafka_replies import get_reply_address, send_reply
+from utils import serialization
+from workers.coalescer import BurstCoalescer
+from workers.backpressure import Backpressure, PartitionPauser
+from workers.idempotency import IdempotencyStore, get_idempotency_key, get_idempotency_store
+from workers.offsets import CommitOnRebalance, OffsetTracker, commit_offsets, commit_periodically, report_lag
+from workers.retry import RetryPolicy, create_retry_consumers, dead_letter_topic, relay_retries
+from workers.room_batches import RoomBatchAggregator
+from workers.shutdown import drain_tasks, spool_messages
+from workers.lanes import LaneRouter, watch_lanes
+from workers.metrics import (
+    BACKPRESSURE_ENGAGED,
+    COALESCED_WORKFLOWS,
+    END_TO_END_SECONDS,
+    LANE_IN_FLIGHT,
+    LANE_QUEUED,
+    MESSAGES_PROCESSED,
+    PENDING_MESSAGES,
+    QUEUE_SECONDS,
+    WEBHOOK_PENDING,
+    WORKFLOW_SECONDS,
+)
+from workers.webhook_delivery import WebhookDispatcher, create_webhook_session
+from exceptions.agent import WorkflowFailedException
 from conf import settings
 from core.logging_config import get_logger
-import aiohttp
 
 logger = get_logger(__name__)
 
-# Limit the number of concurrent tasks
-SEMAPHORE_LIMIT = 10
-MAX_WORKFLOW_RETRIES = 3
-RETRY_DELAY_SECONDS = 2
 WORKFLOW_FAILURE_MESSAGES = (
     "Lo siento, no pude generar una respuesta en este momento.",
     "Agent stopped due to iteration limit or time limit",
@@ -30,13 +56,28 @@ WORKFLOW_FAILURE_MESSAGES = (
 )
 
 
-async def process_chat_message(data: dict, session: aiohttp.ClientSession):
-    """Processes a message from the agent chat topic."""
+async def process_chat_message(
+    data: dict,
+    dispatcher: WebhookDispatcher,
+    final_attempt: bool = True,
+    reply: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> list:
+    """
+    Processes a message from the agent chat topic.
+
+    The split replies are queued on the webhook dispatcher, which paces them
+    per room. When the caller awaits the result (`reply` is set), they are
+    sent back to it in a single reply instead. Returns the pending delivery
+    futures.
+
+    If the workflow answers with a failure message, a WorkflowFailedException
+    is raised so the message goes through the retry topics; on the final
+    attempt the last response is sent anyway.
+    """
     request = InvokeWorkflowRequest(**data)
     uuid = data.get("uuid", "")
 
-    
-    agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
+
     # Save tracing
     callback_handlers = []
     if settings.LANGFUSE_IS_ENABLE:
@@ -51,41 +92,33 @@ async def process_chat_message(data: dict, session: aiohttp.ClientSession):
             )
         )
 
-    workflow = agent.create_workflow().compile()
-
-    response = {}
-    for attempt in range(MAX_WORKFLOW_RETRIES):
-        logger.info(f"Executing chat workflow for {uuid} (Attempt {attempt + 1}/{MAX_WORKFLOW_RETRIES})...", extra={"data": data})
-        
-        response = await workflow.ainvoke({
-            "room_id": request.room_id,
-            "messages": request.messages,
-            "uui_id": uuid,
-        }, config={
-            "uui_id": uuid,
-            "callbacks": callback_handlers,
-            "recursion_limit": 200,
-        })
+    workflow = await workflow_registry.get("chat")
+
+    logger.info(f"Executing chat workflow for {uuid}...", extra={"data": data})
+
+    response = await workflow.ainvoke({
+        "room_id": request.room_id,
+        "messages": request.messages,
+        "uui_id": uuid,
+    }, config={
+        "uui_id": uuid,
+        "callbacks": callback_handlers,
+        "recursion_limit": 200,
+    })
+
+    list_message = response.get("list_message")
+    if list_message and isinstance(list_message, list) and list_message[0]:
+        first_message = list_message[0]
+        if any(error_msg in first_message for error_msg in WORKFLOW_FAILURE_MESSAGES):
+            if not final_attempt:
+                raise WorkflowFailedException(f"Workflow for {uuid} failed with message: '{first_message}'")
+            logger.error(f"Workflow for {uuid} failed on its final attempt. Sending last response.")
+        else:
+            logger.info(f"Workflow for {uuid} succeeded.")
 
-        list_message = response.get("list_message")
-        should_retry = False
-        if list_message and isinstance(list_message, list) and list_message[0]:
-            first_message = list_message[0]
-            if any(error_msg in first_message for error_msg in WORKFLOW_FAILURE_MESSAGES):
-                should_retry = True
-
-        if not should_retry:
-            logger.info(f"Workflow for {uuid} succeeded on attempt {attempt + 1}.")
-            break
-
-        logger.warning(f"Workflow for {uuid} failed on attempt {attempt + 1} with message: '{list_message[0]}'. Retrying...")
-        if attempt < MAX_WORKFLOW_RETRIES - 1:
-            await asyncio.sleep(RETRY_DELAY_SECONDS)
-    else:
-        logger.error(f"Workflow for {uuid} failed after {MAX_WORKFLOW_RETRIES} attempts. Sending last response.")
-        
-    
     list_message = response.get("list_message", [])
+    deliveries = []
+    replies = []
     
     for i, msg in enumerate(list_message):
         logger.info(f"Message {i + 1}: {msg}")
@@ -115,23 +148,28 @@ async def process_chat_message(data: dict, session: aiohttp.ClientSession):
                     "send_message": True if response.get("agent_id_executed") else False,
                 }
 
-                # Send response to backend via webhook
-                webhook_url = settings.WEBHOOK_URL
-                headers = {
-                    "Authorization": f"Bearer {settings.WEBHOOK_BEARER_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-
                 logger.info(f"Final answer: {payload['message']}.\nUser ID: {payload['user_id']}\nSend Message: {payload['send_message']}\nUUID: {uuid}")
 
-                async with session.post(webhook_url, json=payload, headers=headers) as resp:
-                    if resp.status == 200:
-                        logger.info(f"Webhook sent successfully for {uuid}")
-                    else:
-                        error_text = await resp.text()
-                        logger.error(f"Webhook failed for {uuid}: {resp.status} - {error_text}")
-                            
-                time.sleep(20)  # Small delay to avoid overwhelming the webhook endpoint
+                if reply is not None:
+                    replies.append(msg)
+                    continue
+
+                # Queue the response for the backend webhook; messages of the
+                # same room are paced by the dispatcher without blocking.
+                deliveries.append(
+                    dispatcher.enqueue(request.room_id or uuid, settings.WEBHOOK_URL, payload, uuid)
+                )
+
+    if reply is not None:
+        deliveries.append(asyncio.ensure_future(reply({
+            "uuid": uuid,
+            "status": "success",
+            "message": replies,
+            "user_id": response.get("agent_id_executed", ""),
+            "send_message": True if response.get("agent_id_executed") else False,
+        })))
+
+    return deliveries
 
 async def process_analytics_message(data: dict):
     """Processes a message from the analytics topic."""
@@ -152,8 +190,35 @@ async def process_analytics_message(data: dict):
     logger.info(f"Analytics event for {uuid} processed (stub).")
     await asyncio.sleep(1) # Simulate work
 
-async def process_room_suggestion_message(data: dict, session: aiohttp.ClientSession):
-    """Processes a message from the room suggestion topic."""
+def room_suggestion_callbacks(request: RoomSuggestionsRequest) -> list:
+    """Returns the tracing callbacks of a room-suggestion request."""
+    callback_handlers = []
+    if settings.LANGFUSE_IS_ENABLE:
+        callback_handlers.append(
+            CallbackHandler(
+                public_key=settings.LANGFUSE_PUBLIC_KEY,
+                secret_key=settings.LANGFUSE_SECRET_KEY,
+                host=settings.LANGFUSE_HOST,
+                trace_name="siscom-room-suggestion-consumer",
+                debug=settings.LANGFUSE_DEBUG,
+                metadata=request.metadata if request.metadata else {},
+            )
+        )
+    return callback_handlers
+
+
+async def process_room_suggestion_message(
+    data: dict,
+    dispatcher: WebhookDispatcher,
+    batches: Optional[RoomBatchAggregator] = None,
+):
+    """
+    Processes one room of a room-suggestion batch.
+
+    The room's suggestion is folded into the batch aggregator as soon as its
+    workflow completes; the final analysis of the batch runs separately, once
+    the last message of the batch and its siblings are done.
+    """
     
     # time.sleep(15)  # Small delay to ensure DB consistency if needed
     request = RoomSuggestionsRequest(**data)
@@ -161,23 +226,8 @@ async def process_room_suggestion_message(data: dict, session: aiohttp.ClientSes
     logger.info(f"Processing room suggestion event for {uuid} from room {request.room_id}")
 
     try:
-        agent = await MultiAgents.create(settings.LLM_MODEL_NAME)
-        
-        callback_handlers = []
-        if settings.LANGFUSE_IS_ENABLE:
-            callback_handlers.append(
-                CallbackHandler(
-                    public_key=settings.LANGFUSE_PUBLIC_KEY,
-                    secret_key=settings.LANGFUSE_SECRET_KEY,
-                    host=settings.LANGFUSE_HOST,
-                    trace_name="siscom-room-suggestion-consumer",
-                    debug=settings.LANGFUSE_DEBUG,
-                    metadata=request.metadata if request.metadata else {},
-                )
-            )
-
-        # First, run the workflow to analyze and store the current room's data
-        single_room_workflow = agent.create_room_suggestions_workflow().compile()
+        # Run the workflow to analyze and store the current room's data
+        single_room_workflow = await workflow_registry.get("room_suggestions")
         single_room_result = await single_room_workflow.ainvoke({
             "room_id": request.room_id,
             "messages": request.historical_messages,
@@ -185,7 +235,7 @@ async def process_room_suggestion_message(data: dict, session: aiohttp.ClientSes
             "previous_rooms": request.previous_rooms
         }, config={
             "uui_id": uuid,
-            "callbacks": callback_handlers,
+            "callbacks": room_suggestion_callbacks(request),
             "recursion_limit": 200,
         })
 
@@ -197,39 +247,67 @@ async def process_room_suggestion_message(data: dict, session: aiohttp.ClientSes
                 payload = {
                     "suggestion": {},
                 }
-                await send_webhook(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid, session)
-        
-        # If this is the last message in the batch, run the final analysis workflow
-        if request.is_last:
-            logger.info(f"Last message received for batch {uuid}. Running final analysis workflow.")
-            
-            final_analysis_workflow = agent.create_final_room_analysis_workflow().compile()
+                await dispatcher.send(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid)
+        elif batches is not None and single_room_result.get("room_suggestion"):
+            batches.add(uuid, request.room_id, single_room_result["room_suggestion"])
 
-            # This workflow doesn't need specific inputs as it reads from DB
-            final_result = await final_analysis_workflow.ainvoke({"uui_id": uuid})
-            
+        if not request.is_last:
+            logger.info(f"Processed intermediate room suggestion for room_id: {request.room_id}. Waiting for last message.")
 
-            if error := final_result.get("error"):
-                logger.error(f"Final analysis workflow for batch {uuid} failed: {error}")
-                payload = {
-                    "uuid": uuid,
-                    "status": "error",
-                    "suggestion": {},
-                    "error": error
-                }
-            else:
-                payload = {
-                    # "uuid": uuid,
-                    # "status": "success",
-                    # The final analysis is the main suggestion now
-                    "suggestion":  final_result.get("room_suggestion", {}),
-                    # "error": None
-                }
+    except Exception as e:
+        logger.exception(f"Error processing room suggestion for {uuid}: {e}")
+        payload = {
+            "uuid": uuid,
+            "status": "error",
+            "suggestion": {},
+            "error": f"An unexpected error occurred: {str(e)}"
+        }
+        await dispatcher.send(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid)
+
+
+async def finalize_room_suggestion_batch(
+    data: dict,
+    dispatcher: WebhookDispatcher,
+    batches: Optional[RoomBatchAggregator] = None,
+):
+    """
+    Runs the final analysis of a room-suggestion batch and sends the result.
+
+    The analysis receives the batch totals kept by the aggregator. When no
+    room of the batch completed in this process (e.g. a batch split across
+    a restart), it falls back to reading the stored suggestions back.
+    """
+    request = RoomSuggestionsRequest(**data)
+    uuid = data.get("uuid", "")
+    batch_summary = batches.summary(uuid) if batches is not None else None
+    logger.info(f"Last message received for batch {uuid}. Running final analysis workflow.")
+
+    try:
+        final_analysis_workflow = await workflow_registry.get("final_room_analysis")
+        final_result = await final_analysis_workflow.ainvoke(
+            {"uui_id": uuid, "batch_summary": batch_summary},
+            config={"uui_id": uuid, "callbacks": room_suggestion_callbacks(request)},
+        )
 
-            logger.info(f"Final room suggestion for batch {uuid}: {payload.get('suggestion')}")
-            await send_webhook(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid, session)
+        if error := final_result.get("error"):
+            logger.error(f"Final analysis workflow for batch {uuid} failed: {error}")
+            payload = {
+                "uuid": uuid,
+                "status": "error",
+                "suggestion": {},
+                "error": error
+            }
         else:
-            logger.info(f"Processed intermediate room suggestion for room_id: {request.room_id}. Waiting for last message.")
+            payload = {
+                # "uuid": uuid,
+                # "status": "success",
+                # The final analysis is the main suggestion now
+                "suggestion":  final_result.get("room_suggestion", {}),
+                # "error": None
+            }
+
+        logger.info(f"Final room suggestion for batch {uuid}: {payload.get('suggestion')}")
+        await dispatcher.send(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid)
 
     except Exception as e:
         logger.exception(f"Error processing room suggestion for {uuid}: {e}")
@@ -239,36 +317,369 @@ async def process_room_suggestion_message(data: dict, session: aiohttp.ClientSes
             "suggestion": {},
             "error": f"An unexpected error occurred: {str(e)}"
         }
-        await send_webhook(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid, session)
-
-async def send_webhook(url: str, payload: dict, uuid: str, session: aiohttp.ClientSession):
-    """Helper function to send webhook."""
-    headers = {
-        "Authorization": f"Bearer {settings.WEBHOOK_BEARER_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    async with session.post(url, json=payload, headers=headers) as resp:
-        if resp.status == 200:
-            logger.info(f"Webhook sent successfully for {uuid}")
+        await dispatcher.send(settings.WEBHOOK_URL_ROOM_SUGGESTION, payload, uuid)
+    finally:
+        if batches is not None:
+            batches.discard(uuid)
+
+def get_scheduling_key(topic: str, data: dict) -> str:
+    """
+    Returns the key used to order messages within their lane.
+
+    Messages of the same room (per topic) are processed one after another;
+    messages without a room fall back to their own uuid so they never wait.
+    Rooms are only ordered across processes because their requests are
+    produced keyed by room (see `message_key`).
+    """
+    room_id = data.get("room_id") or data.get("uuid", "")
+    return f"{topic}:{room_id}"
+
+
+async def dispatch_message(
+    topic: str,
+    data: dict,
+    dispatcher: WebhookDispatcher,
+    final_attempt: bool = True,
+    batches: Optional[RoomBatchAggregator] = None,
+    reply: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> list:
+    """
+    Routes a decoded message to the handler of its topic.
+
+    Returns the webhook deliveries the handler left pending, if any.
+    """
+    if topic == settings.KAFKA_AGENT_TOPIC: return await process_chat_message(data, dispatcher, final_attempt, reply)
+    elif topic == settings.KAFKA_ANALYTICS_TOPIC: await process_analytics_message(data)
+    elif topic == settings.KAFKA_ROOM_SUGGESTION_TOPIC: await process_room_suggestion_message(data, dispatcher, batches)
+    else: logger.warning(f"Received message from unhandled topic: {topic}")
+    return []
+
+
+def build_lanes(pauser: PartitionPauser) -> LaneRouter:
+    """
+    Creates one lane per consumed topic.
+
+    Lanes share CONSUMER_MAX_ROOMS_IN_FLIGHT slots by weighted fair queuing
+    and each one has its own concurrency limit, so a large room-suggestion
+    batch cannot starve latency-sensitive chat replies.
+    """
+    router = LaneRouter(
+        settings.CONSUMER_MAX_ROOMS_IN_FLIGHT,
+        pause_low_priority=settings.CONSUMER_PAUSE_LOW_PRIORITY_LANES,
+        pauser=pauser,
+    )
+    router.add_lane(
+        "chat",
+        [settings.KAFKA_AGENT_TOPIC],
+        max_in_flight=settings.CONSUMER_CHAT_LANE_MAX_IN_FLIGHT,
+        weight=settings.CONSUMER_CHAT_LANE_WEIGHT,
+    )
+    router.add_lane(
+        "room_suggestion",
+        [settings.KAFKA_ROOM_SUGGESTION_TOPIC],
+        max_in_flight=settings.CONSUMER_ROOM_SUGGESTION_LANE_MAX_IN_FLIGHT,
+        weight=settings.CONSUMER_ROOM_SUGGESTION_LANE_WEIGHT,
+        low_priority=True,
+    )
+    router.add_lane(
+        "analytics",
+        [settings.KAFKA_ANALYTICS_TOPIC],
+        max_in_flight=settings.CONSUMER_ANALYTICS_LANE_MAX_IN_FLIGHT,
+        weight=settings.CONSUMER_ANALYTICS_LANE_WEIGHT,
+        low_priority=True,
+    )
+    return router
+
+
+@dataclass
+class ConsumerContext:
+    """Shared components used to process every consumed message."""
+
+    producer: AIOKafkaProducer
+    lanes: LaneRouter
+    dispatcher: WebhookDispatcher
+    store: IdempotencyStore
+    coalescer: BurstCoalescer
+    retry_policy: RetryPolicy
+    batches: RoomBatchAggregator
+
+
+async def schedule_message(msg, data: dict, ctx: ConsumerContext) -> Optional[list]:
+    """
+    Runs a message on its room's queue, coalescing bursts of chat requests.
+
+    Chat requests of a room are debounced: after the coalescing window, and
+    again when the room's turn comes, a request is dropped if a newer one
+    for the same room exists, since the newer request carries the whole
+    history.
+
+    Returns:
+        The pending webhook deliveries, or None if the message was superseded.
+    """
+    key = get_scheduling_key(msg.topic, data)
+    coalesce = msg.topic == settings.KAFKA_AGENT_TOPIC and ctx.coalescer.window > 0
+    generation = ctx.coalescer.register(key) if coalesce else None
+    final_attempt = ctx.retry_policy.is_final_attempt(msg.headers)
+    address = get_reply_address(msg.headers)
+    reply = partial(send_reply, ctx.producer, address) if address else None
+
+    async def job() -> Optional[list]:
+        started = time.monotonic()
+        QUEUE_SECONDS.labels(msg.topic).observe(started - submitted)
+        if coalesce and ctx.coalescer.is_superseded(key, generation):
+            return None
+        try:
+            return await dispatch_message(msg.topic, data, ctx.dispatcher, final_attempt, ctx.batches, reply)
+        finally:
+            WORKFLOW_SECONDS.labels(msg.topic).observe(time.monotonic() - started)
+
+    try:
+        if coalesce and await ctx.coalescer.wait(key, generation):
+            return None
+        submitted = time.monotonic()
+        lane = ctx.lanes.lane_for(msg.topic)
+        result = await lane.scheduler.submit(key, job)
+
+        if msg.topic == settings.KAFKA_ROOM_SUGGESTION_TOPIC and data.get("is_last"):
+            # Wait for the other rooms of the batch outside of any lane slot,
+            # so waiting batches can never starve the rooms they wait for.
+            uuid = data.get("uuid", "")
+            await ctx.batches.wait_for_rooms(
+                uuid, settings.CONSUMER_ROOM_BATCH_WAIT_SECONDS, exclude=data.get("room_id")
+            )
+            await lane.scheduler.submit(
+                f"{msg.topic}:batch:{uuid}",
+                lambda: finalize_room_suggestion_batch(data, ctx.dispatcher, ctx.batches),
+            )
+        return result
+    finally:
+        if coalesce:
+            ctx.coalescer.release(key, generation)
+
+
+async def reply_status(msg, data: dict, ctx: ConsumerContext, status: str, error: Optional[str] = None) -> None:
+    """
+    Tells a caller awaiting a message's result that no answer will come.
+
+    Does nothing for messages whose result goes to the webhook.
+    """
+    address = get_reply_address(msg.headers)
+    if address is None:
+        return
+    body = {"uuid": data.get("uuid", "") if isinstance(data, dict) else "", "status": status, "message": []}
+    if error:
+        body["error"] = error
+    try:
+        await send_reply(ctx.producer, address, body)
+    except Exception as e:
+        logger.error(f"Could not send {status} reply to {address[0]}: {e}")
+
+
+def report_delivery(topic: str, delivery: asyncio.Future) -> None:
+    """
+    Logs a webhook delivery or reply that failed after its workflow ended.
+
+    Webhooks rejected after every retry are already logged and counted by
+    the dispatcher.
+    """
+    if delivery.cancelled():
+        logger.warning(f"Delivery of a {topic} result was cancelled before it went out.")
+    elif delivery.exception() is not None:
+        logger.error(f"Delivery of a {topic} result failed: {delivery.exception()!r}")
+
+
+async def settle_deliveries(deliveries: list, store: IdempotencyStore, idempotency_key: str) -> bool:
+    """
+    Waits for the deliveries of a message and marks it processed.
+
+    A webhook rejected after every retry counts as settled, since delivering
+    it again would fail the same way.
+
+    Returns:
+        False if a delivery was cancelled (shutdown) before it went out, in
+        which case the message is left unprocessed so it is replayed.
+    """
+    results = await asyncio.gather(*deliveries, return_exceptions=True)
+    if any(isinstance(result, asyncio.CancelledError) for result in results):
+        return False
+    await store.mark_processed(idempotency_key)
+    return True
+
+
+async def process_message(msg, ctx: ConsumerContext) -> Optional[asyncio.Task]:
+    """
+    Processes one consumed message end to end.
+
+    Failures are not retried in place: the message is published to the next
+    delayed-retry topic (or the dead-letter topic), so retries never hold a
+    room slot while they wait.
+
+    Returns:
+        The task settling the message's paced deliveries, if any: the
+        message is only complete (and marked processed) once that task
+        returns True.
+    """
+    batch_room = None
+    data = {}
+    try:
+        data = serialization.loads(msg.value)
+
+        if msg.topic == settings.KAFKA_ROOM_SUGGESTION_TOPIC and isinstance(data, dict):
+            # Registered before any await, so a batch's last message always
+            # sees the siblings fetched before it as pending.
+            batch_room = (data.get("uuid", ""), data.get("room_id", ""))
+            ctx.batches.expect(*batch_room)
+
+        idempotency_key = get_idempotency_key(msg.topic, data, msg.value)
+        if await ctx.store.is_processed(idempotency_key):
+            logger.info(f"Skipping already processed message {data.get('uuid', '')} from topic {msg.topic}")
+            MESSAGES_PROCESSED.labels(msg.topic, "duplicate").inc()
+            await reply_status(msg, data, ctx, "duplicate")
+            return
+
+        deliveries = await schedule_message(msg, data, ctx)
+        if deliveries is None:
+            COALESCED_WORKFLOWS.labels(msg.topic).inc()
+            MESSAGES_PROCESSED.labels(msg.topic, "coalesced").inc()
+            logger.info(f"Message {data.get('uuid', '')} for room {data.get('room_id', '')} superseded by a newer request.")
+            await reply_status(msg, data, ctx, "superseded")
         else:
-            error_text = await resp.text()
-            logger.error(f"Webhook failed for {uuid}: {resp.status} - {error_text}")
+            MESSAGES_PROCESSED.labels(msg.topic, "success").inc()
+            END_TO_END_SECONDS.labels(msg.topic).observe(max(time.time() - msg.timestamp / 1000, 0))
+            if deliveries:
+                # The room and the message task are released as soon as the
+                # workflow ends; the paced deliveries settle on their own
+                # task, which completes the message once they went out.
+                for delivery in deliveries:
+                    delivery.add_done_callback(partial(report_delivery, msg.topic))
+                return asyncio.ensure_future(settle_deliveries(deliveries, ctx.store, idempotency_key))
+            await ctx.store.mark_processed(idempotency_key)
+            return None
+        await ctx.store.mark_processed(idempotency_key)
+        END_TO_END_SECONDS.labels(msg.topic).observe(max(time.time() - msg.timestamp / 1000, 0))
 
-async def process_message(msg, producer, semaphore, session):
-    async with semaphore:
+    except Exception as e:
+        logger.exception(f"Error while processing message from topic {msg.topic}: {e}")
         try:
-            data = json.loads(msg.value.decode("utf-8"))
-            
-            if msg.topic == settings.KAFKA_AGENT_TOPIC: await process_chat_message(data, session)
-            elif msg.topic == settings.KAFKA_ANALYTICS_TOPIC: await process_analytics_message(data)
-            elif msg.topic == settings.KAFKA_ROOM_SUGGESTION_TOPIC: await process_room_suggestion_message(data, session)
-            else: logger.warning(f"Received message from unhandled topic: {msg.topic}")
+            target = await ctx.retry_policy.route_failure(
+                ctx.producer,
+                msg.topic,
+                msg.value,
+                msg.headers,
+                reason=f"{type(e).__name__}: {e}",
+                key=msg.key,
+                retryable=not isinstance(e, (json.JSONDecodeError, ValidationError)),
+            )
+            outcome = "dead_letter" if target == dead_letter_topic(msg.topic) else "retry"
+            MESSAGES_PROCESSED.labels(msg.topic, outcome).inc()
+            if outcome == "dead_letter":
+                await reply_status(msg, data, ctx, "error", f"{type(e).__name__}: {e}")
+        except Exception as route_error:
+            # The message is in neither a retry nor the dead-letter topic:
+            # re-raise so its offset is never completed and the message is
+            # consumed again after a restart or rebalance.
+            logger.exception(f"Could not route failed message from topic {msg.topic}: {route_error}")
+            MESSAGES_PROCESSED.labels(msg.topic, "route_error").inc()
+            raise
+    finally:
+        if batch_room is not None:
+            ctx.batches.settle(*batch_room)
+
+
+async def run_consumer_loop(consumer, ctx: ConsumerContext, tracker: OffsetTracker) -> None:
+    """
+    Fetches messages and processes each one in a background task.
+
+    Applies backpressure while too many messages are pending. When the loop
+    ends (the consumer is exhausted or the task is cancelled), fetching is
+    paused, in-flight messages and their paced webhooks are drained up to
+    the configured deadline, messages that did not finish or whose webhooks
+    did not all go out are spooled, and only finished offsets are committed.
+
+    Args:
+        consumer: Started consumer (or a stand-in with the same interface),
+            with auto-commit disabled.
+        ctx: Shared processing components.
+        tracker: Offset tracker of the consumer's assigned partitions.
+    """
+    pauser = ctx.lanes.pauser
+    tasks = {}
+    # Messages whose workflow ended, waiting for their paced deliveries.
+    # They no longer count as pending for backpressure, but their offset is
+    # only completed once every delivery went out.
+    delivering = {}
+
+    # Stop fetching while too many messages are pending, so buffered
+    # payloads (full chat histories) stay bounded during traffic spikes.
+    backpressure = Backpressure(
+        settings.CONSUMER_MAX_PENDING_MESSAGES,
+        settings.CONSUMER_RESUME_PENDING_MESSAGES,
+        pauser,
+    )
 
-        except Exception as e:
-            logger.exception(f"Error while processing message from topic {msg.topic}: {e}")
+    PENDING_MESSAGES.set_function(lambda: len(tasks))
+    BACKPRESSURE_ENGAGED.set_function(lambda: int(backpressure.engaged))
+    WEBHOOK_PENDING.set_function(lambda: ctx.dispatcher.pending)
+    for name, lane in ctx.lanes.lanes.items():
+        LANE_IN_FLIGHT.labels(name).set_function(lambda lane=lane: lane.scheduler.running)
+        LANE_QUEUED.labels(name).set_function(lambda lane=lane: lane.scheduler.queued)
+
+    def on_task_done(task: asyncio.Task) -> None:
+        msg = tasks.pop(task)
+        backpressure.update(consumer, len(tasks))
+        # A cancelled message did not finish: its offset stays pending until
+        # it is spooled, so it is never committed without being processed.
+        # Neither is a failed message that could not be routed to a retry or
+        # dead-letter topic.
+        if task.cancelled() or task.exception() is not None:
+            return
+        settling = task.result()
+        if settling is None:
+            tracker.complete(TopicPartition(msg.topic, msg.partition), msg.offset)
+        else:
+            delivering[settling] = msg
+            settling.add_done_callback(on_delivered)
 
+    def on_delivered(task: asyncio.Task) -> None:
+        msg = delivering.pop(task)
+        # Deliveries cancelled on shutdown leave the offset pending until
+        # the message is spooled.
+        if not task.cancelled() and task.exception() is None and task.result():
+            tracker.complete(TopicPartition(msg.topic, msg.partition), msg.offset)
 
-async def consume():
+    try:
+        async for msg in consumer:
+            tracker.track(TopicPartition(msg.topic, msg.partition), msg.offset)
+
+            # Start a background task to process the message
+            task = asyncio.create_task(process_message(msg, ctx))
+            tasks[task] = msg
+
+            # Clean up finished tasks to avoid memory leak
+            task.add_done_callback(on_task_done)
+            backpressure.update(consumer, len(tasks))
+
+    finally:
+        # Stop fetching for good: the shutdown pause outlives any resume
+        # requested by backpressure or the lanes while draining.
+        pauser.pause(consumer, "shutdown", consumer.assignment())
+
+        drain_started = time.monotonic()
+        unfinished = await drain_tasks(tasks, settings.CONSUMER_DRAIN_TIMEOUT_SECONDS)
+        await ctx.lanes.cancel()
+
+        # Messages whose webhooks are still paced get what is left of the
+        # deadline; the ones not delivered by then are spooled with the
+        # unfinished messages and replayed, rather than committed and lost.
+        remaining = settings.CONSUMER_DRAIN_TIMEOUT_SECONDS - (time.monotonic() - drain_started)
+        undelivered = await drain_tasks(delivering, max(remaining, 0.0))
+        await ctx.dispatcher.cancel()
+        if settings.CONSUMER_SPOOL_UNFINISHED:
+            await spool_messages(ctx.producer, unfinished + undelivered, tracker)
+        await commit_offsets(consumer, tracker)
+
+
+async def consume(worker_index: int = 0):
     topics_to_consume = [
         settings.KAFKA_AGENT_TOPIC,
         settings.KAFKA_ANALYTICS_TOPIC,
@@ -276,40 +687,119 @@ async def consume():
     ]
     logger.info(f"Starting consumer for topics: {topics_to_consume}")
 
+    # Each process of the consumer pool serves its metrics on its own port.
+    if settings.CONSUMER_METRICS_PORT:
+        metrics_port = settings.CONSUMER_METRICS_PORT + worker_index
+        start_http_server(metrics_port)
+        logger.info(f"Serving consumer metrics on port {metrics_port}")
+
+    # Offsets are committed manually, and only once every message before
+    # them in the partition has been fully processed (at-least-once).
     consumer = AIOKafkaConsumer(
-        *topics_to_consume,
         bootstrap_servers=settings.KAFKA_BROKER_URL,
         group_id="agent-group",
-        enable_auto_commit=True,
+        enable_auto_commit=False,
         auto_offset_reset="latest",
     )
-    producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BROKER_URL)
+    producer = create_kafka_producer()
+    tracker = OffsetTracker()
+    store = get_idempotency_store()
+
+    # Build the LLM manager, nodes and compiled graphs once for the process.
+    await workflow_registry.warm_up()
 
+    consumer.subscribe(topics_to_consume, listener=CommitOnRebalance(consumer, tracker))
     await consumer.start()
     await producer.start()
 
-    semaphore = asyncio.Semaphore(SEMAPHORE_LIMIT)
-    tasks = set()
-
-    async with aiohttp.ClientSession() as session:
+    # Failed messages are published to the retry and dead-letter topics;
+    # they are not auto-created, so refuse to start without them rather
+    # than lose the messages that fail.
+    retry_policy = RetryPolicy(settings.CONSUMER_RETRY_DELAYS_SECONDS)
+    missing = {
+        name for topic in topics_to_consume for name in retry_policy.topics(topic)
+    } - await consumer.topics()
+    if missing:
+        await consumer.stop()
+        await producer.stop()
+        raise RuntimeError(f"Missing retry/dead-letter topics: {sorted(missing)}")
+
+    # Each room is processed serially within its topic's lane; different
+    # rooms and lanes run in parallel.
+    lanes = build_lanes(PartitionPauser())
+    lane_watcher = asyncio.create_task(watch_lanes(lanes, consumer))
+
+    # Failed messages wait on the delayed-retry topics, relayed back to
+    # their original topic once due.
+    retry_consumers = create_retry_consumers(topics_to_consume, retry_policy)
+    for retry_consumer in retry_consumers:
+        await retry_consumer.start()
+    relays = [
+        asyncio.create_task(relay_retries(retry_consumer, producer))
+        for retry_consumer in retry_consumers
+    ]
+    committer = asyncio.create_task(
+        commit_periodically(consumer, tracker, settings.KAFKA_COMMIT_INTERVAL_SECONDS)
+    )
+    lag_reporter = asyncio.create_task(report_lag(consumer, tracker))
+
+    async with create_webhook_session() as session:
+        ctx = ConsumerContext(
+            producer=producer,
+            lanes=lanes,
+            dispatcher=WebhookDispatcher(session),
+            store=store,
+            coalescer=BurstCoalescer(settings.CONSUMER_COALESCE_WINDOW_SECONDS),
+            retry_policy=retry_policy,
+            batches=RoomBatchAggregator(settings.CONSUMER_ROOM_BATCH_TTL_SECONDS),
+        )
         try:
-            async for msg in consumer:
-                # Start a background task to process the message
-                task = asyncio.create_task(process_message(msg, producer, semaphore, session))
-                tasks.add(task)
-
-                # Clean up finished tasks to avoid memory leak
-                task.add_done_callback(tasks.discard)
-
+            await run_consumer_loop(consumer, ctx, tracker)
         finally:
+            committer.cancel()
+            lane_watcher.cancel()
+            lag_reporter.cancel()
+
             logger.info("Stopping consumer and producer...")
+            for relay in relays:
+                relay.cancel()
+            await asyncio.gather(*relays, return_exceptions=True)
+            for retry_consumer in retry_consumers:
+                await retry_consumer.stop()
             await consumer.stop()
             await producer.stop()
-            await asyncio.gather(*tasks)  # Wait for remaining tasks to complete
+            await store.close()
             logger.info("All tasks finished. Exiting.")
 
-if __name__ == "__main__":
+
+async def run_until_stopped(worker_index: int = 0):
+    """
+    Runs the consumer until SIGTERM or SIGINT.
+
+    The signal cancels the consume loop once, so the remaining tasks are
+    awaited and the offsets committed before the process exits.
+    """
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    stopping = False
+
+    def stop():
+        nonlocal stopping
+        if not stopping:
+            stopping = True
+            logger.info("Stop signal received, shutting down consumer...")
+            main_task.cancel()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop)
+
     try:
-        asyncio.run(consume())
-    except KeyboardInterrupt:
-        logger.info("Consumer stopped by user.")
+        await consume(worker_index)
+    except asyncio.CancelledError:
+        if not stopping:
+            raise
+        logger.info("Consumer stopped.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_until_stopped())
@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, Set
+
+from aiokafka import TopicPartition
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PartitionPauser:
+    """
+    Pauses consumer partitions on behalf of several independent reasons.
+
+    A partition stays paused while at least one reason holds it, so e.g.
+    backpressure releasing its pause does not resume a low-priority
+    partition that its lane still wants paused.
+    """
+
+    def __init__(self) -> None:
+        self._holders: Dict[TopicPartition, Set[str]] = {}
+
+    def is_paused(self, tp: TopicPartition) -> bool:
+        """Return True if `tp` is held paused by any reason."""
+        return bool(self._holders.get(tp))
+
+    def held_by(self, reason: str) -> Set[TopicPartition]:
+        """Partitions currently paused on behalf of `reason`."""
+        return {tp for tp, reasons in self._holders.items() if reason in reasons}
+
+    def pause(self, consumer, reason: str, partitions: Iterable[TopicPartition]) -> int:
+        """
+        Pause `partitions` on behalf of `reason`.
+
+        Returns:
+            Number of partitions that were not paused before.
+        """
+        assigned = consumer.assignment()
+        to_pause = []
+        for tp in partitions:
+            if tp not in assigned:
+                continue
+            reasons = self._holders.setdefault(tp, set())
+            if not reasons:
+                to_pause.append(tp)
+            reasons.add(reason)
+
+        if to_pause:
+            consumer.pause(*to_pause)
+        return len(to_pause)
+
+    def resume(self, consumer, reason: str) -> int:
+        """
+        Release every pause held by `reason`.
+
+        Partitions are only resumed once no other reason holds them, and
+        partitions revoked in the meantime are simply forgotten.
+
+        Returns:
+            Number of partitions resumed.
+        """
+        assigned = consumer.assignment()
+        to_resume = []
+        for tp in self.held_by(reason):
+            reasons = self._holders[tp]
+            reasons.discard(reason)
+            if reasons:
+                continue
+            del self._holders[tp]
+            if tp in assigned:
+                to_resume.append(tp)
+
+        if to_resume:
+            consumer.resume(*to_resume)
+        return len(to_resume)
+
+
+class Backpressure:
+    """
+    Stops fetching while too many consumed messages are still pending.
+
+    Above the high-water mark every assigned partition is paused, so the
+    consumer stops buffering payloads it cannot process yet; once the
+    backlog drains below the low-water mark the partitions are resumed.
+    The gap between both marks avoids flapping on every message.
+    """
+
+    REASON = "backpressure"
+
+    def __init__(self, high_water: int, low_water: int, pauser: PartitionPauser) -> None:
+        """
+        Initialize the backpressure controller.
+
+        Args:
+            high_water: Pending messages at which partitions are paused.
+            low_water: Pending messages at which partitions are resumed.
+            pauser: Pause registry shared with the other pause reasons.
+        """
+        if not 0 <= low_water < high_water:
+            raise ValueError("low_water must be non-negative and lower than high_water")
+
+        self.high_water = high_water
+        self.low_water = low_water
+        self.pauser = pauser
+        self.engaged = False
+
+    def update(self, consumer, pending: int) -> None:
+        """Pause or resume the assigned partitions for `pending` messages."""
+        if pending >= self.high_water:
+            # Re-applied on every call so partitions assigned by a rebalance
+            # while engaged get paused as well.
+            paused = self.pauser.pause(consumer, self.REASON, consumer.assignment())
+            if not self.engaged:
+                self.engaged = True
+                logger.warning(f"{pending} messages pending; paused fetching from {paused} partitions.")
+        elif self.engaged and pending <= self.low_water:
+            self.engaged = False
+            resumed = self.pauser.resume(consumer, self.REASON)
+            logger.info(f"{pending} messages pending; resumed fetching from {resumed} partitions.")
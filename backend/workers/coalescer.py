@@ -0,0 +1,50 @@
+import asyncio
+from typing import Dict
+
+
+class BurstCoalescer:
+    """
+    Debounces bursts of requests sharing a key (e.g. a room).
+
+    Every request registers itself and gets a generation number. Once the
+    coalescing window has elapsed, only the newest generation of a key is
+    still current; older ones are superseded and can be acknowledged
+    without running, because the newest request carries the full history.
+    """
+
+    def __init__(self, window: float) -> None:
+        """
+        Initialize the coalescer.
+
+        Args:
+            window: Seconds to wait for a newer request before running one.
+        """
+        self.window = window
+        self._latest: Dict[str, int] = {}
+        self._counter = 0
+
+    def register(self, key: str) -> int:
+        """Register a new request for `key` and return its generation."""
+        self._counter += 1
+        self._latest[key] = self._counter
+        return self._counter
+
+    def is_superseded(self, key: str, generation: int) -> bool:
+        """Return True if a newer request than `generation` exists for `key`."""
+        return self._latest.get(key, generation) != generation
+
+    async def wait(self, key: str, generation: int) -> bool:
+        """
+        Wait for the coalescing window.
+
+        Returns:
+            True if the request was superseded while waiting.
+        """
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        return self.is_superseded(key, generation)
+
+    def release(self, key: str, generation: int) -> None:
+        """Forget `key` once its newest request is done."""
+        if self._latest.get(key) == generation:
+            del self._latest[key]
@@ -0,0 +1,151 @@
+"""
+Runs several agent consumer processes on one host.
+
+Every worker process joins the same ``agent-group`` consumer group, so
+Kafka spreads the topic partitions across them and JSON decoding, schema
+validation, prompt rendering and the synchronous DB calls of the nodes use
+every core instead of one. Workers beyond the number of partitions stay
+idle as standby members.
+
+The launcher forwards SIGTERM/SIGINT to the workers, waits for them to
+drain, and restarts any worker that dies unexpectedly with an exponential
+backoff.
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import time
+from multiprocessing.process import BaseProcess
+from typing import Dict, Optional
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+MAX_RESTART_BACKOFF_SECONDS = 60.0
+
+
+def run_worker(index: int) -> None:
+    """Entry point of a worker process."""
+    # Drop the launcher's handlers inherited through fork; the worker
+    # installs its own once its event loop is running.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Imported in the child so no client, engine or event loop created by
+    # the agent modules is ever shared across a fork.
+    from workers.agent_consumer import run_until_stopped
+
+    logger.info(f"Consumer worker {index} started.")
+    asyncio.run(run_until_stopped(index))
+
+
+class ConsumerPool:
+    """
+    Supervises a fixed number of consumer worker processes.
+    """
+
+    def __init__(self, processes: int, stop_timeout: float) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            processes: Number of worker processes to keep alive.
+            stop_timeout: Seconds a worker has to drain after SIGTERM
+                before it is killed.
+        """
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+
+        self.processes = processes
+        self.stop_timeout = stop_timeout
+        self._context = multiprocessing.get_context("fork")
+        self._workers: Dict[int, BaseProcess] = {}
+        self._failures: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._started_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(index,),
+            name=f"agent-consumer-{index}",
+        )
+        process.start()
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Started consumer worker {index} (pid {process.pid}).")
+
+    def _on_signal(self, signum, frame) -> None:
+        if not self._stopping:
+            logger.info(f"Received {signal.Signals(signum).name}, stopping consumer workers...")
+        self._stopping = True
+
+    def _check_workers(self) -> None:
+        """Schedule restarts of dead workers and start the due ones."""
+        now = time.monotonic()
+
+        for index, process in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            del self._workers[index]
+
+            # A worker that ran for a while before dying gets a fresh backoff.
+            if now - self._started_at[index] > MAX_RESTART_BACKOFF_SECONDS:
+                self._failures[index] = 0
+            failures = self._failures.get(index, 0)
+            delay = min(2 ** failures, MAX_RESTART_BACKOFF_SECONDS)
+            self._failures[index] = failures + 1
+            self._restart_at[index] = now + delay
+            logger.error(f"Consumer worker {index} (pid {process.pid}) exited with code {process.exitcode}. Restarting in {delay}s.")
+
+        for index, restart_at in list(self._restart_at.items()):
+            if restart_at <= now:
+                del self._restart_at[index]
+                self._start(index)
+
+    def _stop_workers(self) -> None:
+        """Send SIGTERM to every worker and kill those that do not drain in time."""
+        for process in self._workers.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.stop_timeout
+        for index, process in self._workers.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Consumer worker {index} (pid {process.pid}) did not stop in {self.stop_timeout}s. Killing it.")
+                process.kill()
+                process.join()
+
+    def run(self, poll_interval: float = 1.0) -> None:
+        """Start the workers and supervise them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        for index in range(self.processes):
+            self._start(index)
+
+        try:
+            while not self._stopping:
+                self._check_workers()
+                time.sleep(poll_interval)
+        finally:
+            self._stop_workers()
+            logger.info("All consumer workers stopped.")
+
+
+def main(processes: Optional[int] = None) -> None:
+    pool = ConsumerPool(
+        processes or settings.CONSUMER_PROCESSES,
+        settings.CONSUMER_STOP_TIMEOUT_SECONDS,
+    )
+    logger.info(f"Starting {pool.processes} consumer workers in group agent-group.")
+    pool.run()
+
+
+if __name__ == "__main__":
+    main()
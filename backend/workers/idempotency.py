@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, text
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def get_idempotency_key(topic: str, data: dict, raw: bytes) -> str:
+    """
+    Builds the idempotency key of a Kafka message.
+
+    The message `uuid` is qualified with the topic and a digest of the raw
+    payload: a batch of room suggestions shares one uuid, and requests sent
+    without a uuid all carry the schema's default value.
+    """
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return f"{topic}:{data.get('uuid', '')}:{digest}"
+
+
+class IdempotencyStore(ABC):
+    """
+    Remembers which messages have already been fully processed so that
+    redeliveries (after a crash or a rebalance) can be skipped.
+    """
+
+    @abstractmethod
+    async def is_processed(self, key: str) -> bool:
+        """Return True if the message identified by `key` was already processed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_processed(self, key: str) -> None:
+        """Record that the message identified by `key` has been processed."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release any resource held by the store."""
+        return None
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    Bounded LRU of processed keys, local to the process.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self._keys: OrderedDict[str, float] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key: str) -> None:
+        self._keys[key] = time.time()
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    async def is_processed(self, key: str) -> bool:
+        return key in self
+
+    async def mark_processed(self, key: str) -> None:
+        self.add(key)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """
+    Processed keys persisted in a local SQLite file, fronted by an LRU.
+
+    Survives process restarts on the same host.
+    """
+
+    def __init__(self, path: str, max_size: int = 10000) -> None:
+        self._cache = InMemoryIdempotencyStore(max_size)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_messages "
+            "(key TEXT PRIMARY KEY, processed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _select(self, key: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM processed_messages WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None
+
+    def _insert(self, key: str) -> None:
+        self._conn.execute(
+            "INSERT OR IGNORE INTO processed_messages (key, processed_at) VALUES (?, ?)",
+            (key, time.time()),
+        )
+        self._conn.commit()
+
+    async def is_processed(self, key: str) -> bool:
+        if key in self._cache:
+            return True
+        async with self._lock:
+            found = await asyncio.to_thread(self._select, key)
+        if found:
+            self._cache.add(key)
+        return found
+
+    async def mark_processed(self, key: str) -> None:
+        self._cache.add(key)
+        async with self._lock:
+            await asyncio.to_thread(self._insert, key)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class PostgresIdempotencyStore(IdempotencyStore):
+    """
+    Processed keys persisted in PostgreSQL, fronted by an LRU.
+
+    Shared by every consumer process of the group, so a partition moved to
+    another host still skips the work done before the rebalance.
+    """
+
+    def __init__(self, database_name: str = "agent_memory", max_size: int = 10000) -> None:
+        self._cache = InMemoryIdempotencyStore(max_size)
+        connection_string = (
+            f"postgresql+psycopg://{settings.LLM_DATABASE_POSTGRES_USER}:"
+            f"{settings.LLM_DATABASE_POSTGRES_PASSWORD}@"
+            f"{settings.LLM_DATABASE_POSTGRES_HOST}:"
+            f"{settings.LLM_DATABASE_POSTGRES_WRITE_PORT}/"
+            f"{database_name}"
+        )
+        self.engine = create_engine(connection_string, pool_size=2, max_overflow=2)
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS consumer_processed_messages "
+                "(key TEXT PRIMARY KEY, processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW())"
+            ))
+
+    def _select(self, key: str) -> bool:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT 1 FROM consumer_processed_messages WHERE key = :key"),
+                {"key": key},
+            ).fetchone()
+        return row is not None
+
+    def _insert(self, key: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO consumer_processed_messages (key) VALUES (:key) "
+                    "ON CONFLICT (key) DO NOTHING"
+                ),
+                {"key": key},
+            )
+
+    async def is_processed(self, key: str) -> bool:
+        if key in self._cache:
+            return True
+        found = await asyncio.to_thread(self._select, key)
+        if found:
+            self._cache.add(key)
+        return found
+
+    async def mark_processed(self, key: str) -> None:
+        self._cache.add(key)
+        await asyncio.to_thread(self._insert, key)
+
+    async def close(self) -> None:
+        self.engine.dispose()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """
+    Creates the idempotency store selected by `CONSUMER_IDEMPOTENCY_BACKEND`.
+    """
+    backend = settings.CONSUMER_IDEMPOTENCY_BACKEND
+    max_size = settings.CONSUMER_IDEMPOTENCY_CACHE_SIZE
+
+    if backend == "sqlite":
+        return SQLiteIdempotencyStore(settings.CONSUMER_IDEMPOTENCY_SQLITE_PATH, max_size)
+    if backend == "postgres":
+        return PostgresIdempotencyStore(max_size=max_size)
+    if backend != "memory":
+        logger.warning(f"Unknown idempotency backend '{backend}'. Using in-memory store.")
+    return InMemoryIdempotencyStore(max_size)
@@ -0,0 +1,227 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from core.logging_config import get_logger
+from workers.backpressure import PartitionPauser
+from workers.scheduler import KeyedScheduler
+
+logger = get_logger(__name__)
+
+
+class WeightedFairGate:
+    """
+    Capacity shared by several lanes, granted by weighted fair queuing.
+
+    Each lane has a virtual clock advanced by ``1 / weight`` every time it
+    obtains a slot. When a slot frees up, the waiting lane with the smallest
+    virtual clock goes next, so under contention a lane with weight 4 gets
+    four slots for every slot of a lane with weight 1, and no lane starves.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Initialize the gate.
+
+        Args:
+            capacity: Total number of slots shared by every lane.
+        """
+        self.capacity = capacity
+        self.weights: Dict[str, float] = {}
+        self._in_use = 0
+        self._clock = 0.0
+        self._vtime: Dict[str, float] = {}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+
+    def add_lane(self, lane: str, weight: float) -> None:
+        """Register a lane and its relative share of the capacity."""
+        self.weights[lane] = weight
+        self._vtime[lane] = self._clock
+        self._waiters[lane] = deque()
+
+    @property
+    def in_use(self) -> int:
+        """Number of slots currently held."""
+        return self._in_use
+
+    def _charge(self, lane: str) -> None:
+        # A lane coming back from idle starts at the current clock instead of
+        # spending the credit it accumulated while it had nothing to run.
+        start = max(self._vtime[lane], self._clock)
+        self._vtime[lane] = start + 1.0 / self.weights[lane]
+        self._clock = start
+
+    def _has_waiters(self) -> bool:
+        return any(self._waiters.values())
+
+    async def acquire(self, lane: str) -> None:
+        """Wait for a slot on behalf of `lane`."""
+        if self._in_use < self.capacity and not self._has_waiters():
+            self._in_use += 1
+            self._charge(lane)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before the cancellation.
+                self.release()
+            elif future in self._waiters[lane]:
+                self._waiters[lane].remove(future)
+            raise
+
+    def release(self) -> None:
+        """Return a slot and hand it to the next lane in fair order."""
+        self._in_use -= 1
+        while self._in_use < self.capacity:
+            lanes = [lane for lane, waiters in self._waiters.items() if waiters]
+            if not lanes:
+                return
+            lane = min(lanes, key=lambda name: max(self._vtime[name], self._clock))
+            future = self._waiters[lane].popleft()
+            if future.cancelled():
+                continue
+            self._in_use += 1
+            self._charge(lane)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class Lane:
+    """
+    A class of traffic (one or more topics) with its own concurrency limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        topics: List[str],
+        max_in_flight: int,
+        weight: float,
+        low_priority: bool,
+        gate: WeightedFairGate,
+    ) -> None:
+        self.name = name
+        self.topics = topics
+        self.weight = weight
+        self.low_priority = low_priority
+        self.scheduler = KeyedScheduler(
+            max_in_flight, gate=lambda: gate.slot(name)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        """True when every slot of the lane is busy and work is waiting."""
+        return (
+            self.scheduler.running >= self.scheduler.max_keys_in_flight
+            and self.scheduler.queued > 0
+        )
+
+
+class LaneRouter:
+    """
+    Routes consumed messages to per-topic lanes.
+
+    Lanes have independent concurrency limits and share the consumer's
+    total capacity through a `WeightedFairGate`. Optionally, partitions of
+    low-priority lanes are paused while a high-priority lane is saturated,
+    so large batches stop being fetched while chat replies are waiting.
+    """
+
+    PAUSE_REASON = "lanes"
+
+    def __init__(
+        self,
+        capacity: int,
+        pause_low_priority: bool = False,
+        pauser: Optional[PartitionPauser] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.pause_low_priority = pause_low_priority
+        self.pauser = pauser or PartitionPauser()
+        self.lanes: Dict[str, Lane] = {}
+        self._by_topic: Dict[str, Lane] = {}
+        self._gate = WeightedFairGate(capacity)
+
+    def add_lane(
+        self,
+        name: str,
+        topics: List[str],
+        max_in_flight: int,
+        weight: float = 1.0,
+        low_priority: bool = False,
+    ) -> Lane:
+        """Register a lane serving `topics`."""
+        self._gate.add_lane(name, weight)
+        lane = Lane(name, topics, max_in_flight, weight, low_priority, self._gate)
+        self.lanes[name] = lane
+        for topic in topics:
+            self._by_topic[topic] = lane
+        return lane
+
+    def lane_for(self, topic: str) -> Lane:
+        """Return the lane serving `topic`."""
+        return self._by_topic[topic]
+
+    @property
+    def running(self) -> int:
+        return sum(lane.scheduler.running for lane in self.lanes.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(lane.scheduler.queued for lane in self.lanes.values())
+
+    def update_pauses(self, consumer) -> None:
+        """
+        Pause low-priority partitions while a high-priority lane is saturated,
+        and resume them once it has spare capacity again.
+        """
+        if not self.pause_low_priority:
+            return
+
+        congested = any(
+            lane.saturated for lane in self.lanes.values() if not lane.low_priority
+        )
+        low_priority_topics = {
+            topic
+            for lane in self.lanes.values() if lane.low_priority
+            for topic in lane.topics
+        }
+        partitions = {
+            tp for tp in consumer.assignment() if tp.topic in low_priority_topics
+        }
+
+        if congested:
+            paused = self.pauser.pause(consumer, self.PAUSE_REASON, partitions)
+            if paused:
+                logger.info(f"High-priority lane saturated; paused {paused} low-priority partitions.")
+        elif self.pauser.held_by(self.PAUSE_REASON):
+            resumed = self.pauser.resume(consumer, self.PAUSE_REASON)
+            logger.info(f"Resumed {resumed} low-priority partitions.")
+
+    async def join(self) -> None:
+        """Wait until every lane has finished its queued work."""
+        await asyncio.gather(*(lane.scheduler.join() for lane in self.lanes.values()))
+
+    async def cancel(self) -> None:
+        """Cancel the running and queued work of every lane."""
+        await asyncio.gather(*(lane.scheduler.cancel() for lane in self.lanes.values()))
+
+
+async def watch_lanes(router: LaneRouter, consumer, interval: float = 0.5) -> None:
+    """Periodically re-evaluate which low-priority partitions to pause."""
+    while True:
+        router.update_pauses(consumer)
+        await asyncio.sleep(interval)
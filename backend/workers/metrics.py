@@ -0,0 +1,71 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+
+# Prometheus metrics of the Kafka agent consumer
+COALESCED_WORKFLOWS = Counter(
+    "agent_consumer_coalesced_workflows_total",
+    "Workflows skipped because a newer request for the same room superseded them.",
+    ["topic"],
+)
+PENDING_MESSAGES = Gauge(
+    "agent_consumer_pending_messages",
+    "Consumed messages whose processing has not finished yet.",
+)
+LANE_IN_FLIGHT = Gauge(
+    "agent_consumer_lane_in_flight",
+    "Workflows currently running, per lane.",
+    ["lane"],
+)
+LANE_QUEUED = Gauge(
+    "agent_consumer_lane_queued",
+    "Messages waiting for a slot, per lane.",
+    ["lane"],
+)
+BACKPRESSURE_ENGAGED = Gauge(
+    "agent_consumer_backpressure_engaged",
+    "1 while fetching is paused because too many messages are pending.",
+)
+PARTITION_LAG = Gauge(
+    "agent_consumer_partition_lag",
+    "Messages between the partition high watermark and the last fully processed offset.",
+    ["topic", "partition"],
+)
+QUEUE_SECONDS = Histogram(
+    "agent_consumer_queue_seconds",
+    "Time a message waited for its room's turn and a lane slot.",
+    ["topic"],
+    buckets=LATENCY_BUCKETS,
+)
+WORKFLOW_SECONDS = Histogram(
+    "agent_consumer_workflow_seconds",
+    "Time spent running the workflow of a message.",
+    ["topic"],
+    buckets=LATENCY_BUCKETS,
+)
+END_TO_END_SECONDS = Histogram(
+    "agent_consumer_end_to_end_seconds",
+    "Time from the Kafka message timestamp until it was fully processed.",
+    ["topic"],
+    buckets=LATENCY_BUCKETS,
+)
+MESSAGES_PROCESSED = Counter(
+    "agent_consumer_messages_total",
+    "Consumed messages by topic and outcome (success, duplicate, coalesced, retry, dead_letter, route_error).",
+    ["topic", "outcome"],
+)
+WEBHOOK_SECONDS = Histogram(
+    "agent_consumer_webhook_seconds",
+    "Latency of webhook requests by response status (or error).",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_DELIVERIES = Counter(
+    "agent_consumer_webhook_deliveries_total",
+    "Webhook payloads by final outcome (delivered, failed).",
+    ["outcome"],
+)
+WEBHOOK_PENDING = Gauge(
+    "agent_consumer_webhook_pending",
+    "Webhook payloads queued or being delivered.",
+)
@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
+
+from core.logging_config import get_logger
+from workers.metrics import PARTITION_LAG
+
+logger = get_logger(__name__)
+
+
+class OffsetTracker:
+    """
+    Tracks in-flight offsets per partition and computes what is safe to commit.
+
+    Messages of a partition finish out of order, so only the contiguous
+    prefix of completed offsets may be committed: the committable position
+    of a partition is its lowest offset still in flight, or the offset
+    after the highest one seen when nothing is pending.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[TopicPartition, Set[int]] = {}
+        self._next: Dict[TopicPartition, int] = {}
+        self._committed: Dict[TopicPartition, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tracked offsets that have not completed yet."""
+        return sum(len(offsets) for offsets in self._pending.values())
+
+    def track(self, tp: TopicPartition, offset: int) -> None:
+        """Register a fetched offset as in flight."""
+        self._pending.setdefault(tp, set()).add(offset)
+        self._next[tp] = max(self._next.get(tp, 0), offset + 1)
+
+    def complete(self, tp: TopicPartition, offset: int) -> None:
+        """Mark an offset as fully processed."""
+        pending = self._pending.get(tp)
+        if pending is not None:
+            pending.discard(offset)
+
+    def position(self, tp: TopicPartition) -> Optional[int]:
+        """
+        Offset up to which `tp` has been fully processed, or None if nothing
+        was consumed from it yet.
+        """
+        if tp not in self._next:
+            return None
+        pending = self._pending.get(tp)
+        return min(pending) if pending else self._next[tp]
+
+    def committable(self) -> Dict[TopicPartition, int]:
+        """
+        Returns the offsets that can be committed and have not been yet.
+
+        Offsets follow Kafka's convention: the position of the next message
+        to consume.
+        """
+        offsets = {}
+        for tp in self._next:
+            position = self.position(tp)
+            if position > self._committed.get(tp, -1):
+                offsets[tp] = position
+        return offsets
+
+    def mark_committed(self, offsets: Dict[TopicPartition, int]) -> None:
+        """Record offsets successfully committed to the broker."""
+        for tp, offset in offsets.items():
+            self._committed[tp] = max(self._committed.get(tp, -1), offset)
+
+    def forget(self, partitions: Iterable[TopicPartition]) -> None:
+        """Drop the state of partitions no longer assigned to this consumer."""
+        for tp in partitions:
+            self._pending.pop(tp, None)
+            self._next.pop(tp, None)
+            self._committed.pop(tp, None)
+
+
+async def commit_offsets(consumer: AIOKafkaConsumer, tracker: OffsetTracker) -> None:
+    """Commit every completed, contiguous offset tracked so far."""
+    offsets = tracker.committable()
+    if not offsets:
+        return
+    try:
+        await consumer.commit(offsets)
+        tracker.mark_committed(offsets)
+        logger.debug(f"Committed offsets: {offsets}")
+    except Exception as e:
+        logger.error(f"Error committing offsets {offsets}: {e}")
+
+
+async def commit_periodically(consumer: AIOKafkaConsumer, tracker: OffsetTracker, interval: float) -> None:
+    """Background loop committing completed offsets every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        await commit_offsets(consumer, tracker)
+
+
+async def report_lag(consumer: AIOKafkaConsumer, tracker: OffsetTracker, interval: float = 5.0) -> None:
+    """
+    Background loop exporting the lag of every assigned partition.
+
+    The lag counts the messages between the partition's high watermark (as
+    seen by the last fetch) and the last fully processed offset, so messages
+    still in flight count as lag.
+    """
+    reported: Set[TopicPartition] = set()
+    while True:
+        assigned = consumer.assignment()
+        for tp in reported - assigned:
+            PARTITION_LAG.remove(tp.topic, str(tp.partition))
+        reported &= assigned
+
+        for tp in assigned:
+            highwater = consumer.highwater(tp)
+            if highwater is None:
+                continue
+            position = tracker.position(tp)
+            if position is None:
+                # Nothing consumed yet: fall back to the committed offset.
+                position = await consumer.committed(tp)
+            if position is None:
+                continue
+            PARTITION_LAG.labels(tp.topic, str(tp.partition)).set(max(highwater - position, 0))
+            reported.add(tp)
+
+        await asyncio.sleep(interval)
+
+
+class CommitOnRebalance(ConsumerRebalanceListener):
+    """
+    Commits completed offsets before partitions are taken away, so the next
+    owner resumes right after the work this consumer already finished.
+    """
+
+    def __init__(self, consumer: AIOKafkaConsumer, tracker: OffsetTracker) -> None:
+        self.consumer = consumer
+        self.tracker = tracker
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        await commit_offsets(self.consumer, self.tracker)
+        self.tracker.forget(revoked)
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        logger.info(f"Partitions assigned: {sorted(str(tp) for tp in assigned)}")
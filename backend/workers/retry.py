@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+from aiokafka import AIOKafkaConsumer
+
+from conf import settings
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+Headers = Sequence[Tuple[str, bytes]]
+
+ATTEMPT_HEADER = "x-retry-attempt"
+ORIGINAL_TOPIC_HEADER = "x-original-topic"
+NOT_BEFORE_HEADER = "x-not-before"
+FAILURE_REASON_HEADER = "x-failure-reason"
+
+
+def retry_topic(topic: str, tier: int) -> str:
+    """Name of the delayed-retry topic of `topic` for a given tier (1-based)."""
+    return f"{topic}.retry.{tier}"
+
+
+def dead_letter_topic(topic: str) -> str:
+    """Name of the dead-letter topic of `topic`."""
+    return f"{topic}.dlq"
+
+
+def get_header(headers: Optional[Headers], name: str) -> Optional[str]:
+    """Return the decoded value of a Kafka header, or None if missing."""
+    for key, value in headers or ():
+        if key == name and value is not None:
+            return value.decode("utf-8")
+    return None
+
+
+def get_retry_attempt(headers: Optional[Headers]) -> int:
+    """Number of retries a message has already gone through."""
+    return int(get_header(headers, ATTEMPT_HEADER) or 0)
+
+
+class RetryPolicy:
+    """
+    Tiered retry schedule for failed messages.
+
+    A failed message is published to the retry topic of its next tier and
+    is consumed again after that tier's delay. Once every tier has been
+    used, the message goes to the dead-letter topic with its failure reason.
+    Waiting happens on the retry topics, never on the workflow workers.
+    """
+
+    def __init__(self, delays: List[float]) -> None:
+        """
+        Initialize the policy.
+
+        Args:
+            delays: Delay in seconds of each retry tier, in order.
+        """
+        self.delays = delays
+
+    def topics(self, topic: str) -> List[str]:
+        """Retry and dead-letter topics a failed `topic` message may be published to."""
+        return [retry_topic(topic, tier) for tier in range(1, len(self.delays) + 1)] + [dead_letter_topic(topic)]
+
+    def is_final_attempt(self, headers: Optional[Headers]) -> bool:
+        """Return True if a message carrying `headers` cannot be retried again."""
+        return get_retry_attempt(headers) >= len(self.delays)
+
+    async def route_failure(
+        self,
+        producer: Any,
+        topic: str,
+        value: bytes,
+        headers: Optional[Headers],
+        reason: str,
+        key: Optional[bytes] = None,
+        retryable: bool = True,
+    ) -> str:
+        """
+        Publish a failed message to its next retry tier or to the dead-letter topic.
+
+        Args:
+            producer: Started producer exposing aiokafka's `send_and_wait`.
+            topic: Topic the message was consumed from.
+            value: Raw message payload.
+            headers: Headers of the consumed message.
+            reason: Human-readable failure reason.
+            key: Partitioning key, kept so retries stay ordered per room.
+            retryable: False to skip the retry tiers (e.g. malformed payloads).
+
+        Returns:
+            The topic the message was published to.
+        """
+        original_topic = get_header(headers, ORIGINAL_TOPIC_HEADER) or topic
+        attempt = get_retry_attempt(headers)
+        # Headers of the request itself (e.g. the reply address of a caller
+        # awaiting the result) travel with it through every tier.
+        retry_headers = (ORIGINAL_TOPIC_HEADER, FAILURE_REASON_HEADER, ATTEMPT_HEADER, NOT_BEFORE_HEADER)
+        out_headers = [(name, value) for name, value in headers or () if name not in retry_headers]
+        out_headers += [
+            (ORIGINAL_TOPIC_HEADER, original_topic.encode("utf-8")),
+            (FAILURE_REASON_HEADER, reason[:1000].encode("utf-8")),
+        ]
+
+        if retryable and attempt < len(self.delays):
+            target = retry_topic(original_topic, attempt + 1)
+            not_before = time.time() + self.delays[attempt]
+            out_headers += [
+                (ATTEMPT_HEADER, str(attempt + 1).encode("utf-8")),
+                (NOT_BEFORE_HEADER, str(not_before).encode("utf-8")),
+            ]
+            logger.warning(f"Scheduling retry {attempt + 1}/{len(self.delays)} of a {original_topic} message in {self.delays[attempt]}s: {reason}")
+        else:
+            target = dead_letter_topic(original_topic)
+            out_headers.append((ATTEMPT_HEADER, str(attempt).encode("utf-8")))
+            logger.error(f"Sending {original_topic} message to dead-letter topic after {attempt} retries: {reason}")
+
+        await producer.send_and_wait(target, value, key=key, headers=out_headers)
+        return target
+
+
+async def relay_retries(consumer: Any, producer: Any) -> None:
+    """
+    Move due messages from a retry tier back to their original topic.
+
+    Every message of a tier has the same delay, so the tier is ordered by
+    due time and the relay only has to sleep until the head message is due.
+    Offsets are committed once the message has been republished.
+
+    Args:
+        consumer: Started consumer subscribed to the topics of one tier, with
+            auto-commit disabled.
+        producer: Started producer used to republish the messages.
+    """
+    async for msg in consumer:
+        not_before = float(get_header(msg.headers, NOT_BEFORE_HEADER) or 0)
+        delay = not_before - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        original_topic = get_header(msg.headers, ORIGINAL_TOPIC_HEADER)
+        if not original_topic:
+            logger.error(f"Retry message without {ORIGINAL_TOPIC_HEADER} header in {msg.topic}. Dropping.")
+        else:
+            headers = [
+                (key, value) for key, value in msg.headers
+                if key != NOT_BEFORE_HEADER
+            ]
+            await producer.send_and_wait(original_topic, msg.value, key=msg.key, headers=headers)
+        await consumer.commit()
+
+
+def create_retry_consumers(topics: List[str], policy: RetryPolicy) -> List[AIOKafkaConsumer]:
+    """
+    Create one consumer per retry tier, each subscribed to that tier's topics.
+
+    The relay sleeps between polls until the head message is due, so the
+    poll interval is raised above the longest delay to avoid being evicted
+    from the group while waiting.
+    """
+    max_poll_interval_ms = int((max(policy.delays, default=0) + 60) * 1000)
+    return [
+        AIOKafkaConsumer(
+            *[retry_topic(topic, tier) for topic in topics],
+            bootstrap_servers=settings.KAFKA_BROKER_URL,
+            group_id=f"agent-retry-group-{tier}",
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+            max_poll_interval_ms=max(max_poll_interval_ms, 300000),
+        )
+        for tier in range(1, len(policy.delays) + 1)
+    ]
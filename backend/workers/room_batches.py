@@ -0,0 +1,150 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Set
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+STATISTICS = ("frequent_words", "frequent_emojis", "frequent_hashtags", "mentioned_users")
+
+
+class RoomSuggestionBatch:
+    """Running state of one room-suggestion batch."""
+
+    def __init__(self) -> None:
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self.totals: Dict[str, Counter] = {name: Counter() for name in STATISTICS}
+        self.pending: Set[str] = set()
+        self.updated_at = time.monotonic()
+        self.changed = asyncio.Event()
+
+    def touch(self) -> None:
+        self.updated_at = time.monotonic()
+        self.changed.set()
+
+
+class RoomBatchAggregator:
+    """
+    Fan-in of room-suggestion results, keyed by batch uuid.
+
+    Each room's suggestion is folded into running `Counter` totals and a
+    short summary as soon as its workflow completes, so the final analysis
+    of a batch reads the batch's own results from memory instead of reading
+    recent rows of every batch back from the database.
+
+    Rooms are registered when their message is fetched and settled when it
+    is done, which lets the last message of a batch wait for its siblings
+    still in flight. Batches whose last message never arrives are evicted
+    after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        """
+        Initialize the aggregator.
+
+        Args:
+            ttl: Seconds of inactivity after which a batch is dropped.
+        """
+        self.ttl = ttl
+        self._batches: Dict[str, RoomSuggestionBatch] = {}
+
+    def _batch(self, uuid: str) -> RoomSuggestionBatch:
+        self._evict_expired()
+        batch = self._batches.get(uuid)
+        if batch is None:
+            batch = self._batches[uuid] = RoomSuggestionBatch()
+        return batch
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.ttl
+        for uuid in [uuid for uuid, batch in self._batches.items() if batch.updated_at < deadline]:
+            logger.warning(f"Dropping room-suggestion batch {uuid}: no activity for {self.ttl}s.")
+            del self._batches[uuid]
+
+    def expect(self, uuid: str, room_id: str) -> None:
+        """Register a room of the batch whose message has been fetched."""
+        batch = self._batch(uuid)
+        batch.pending.add(room_id)
+        batch.touch()
+
+    def settle(self, uuid: str, room_id: str) -> None:
+        """Mark a room as done, whatever its outcome."""
+        batch = self._batches.get(uuid)
+        if batch is not None:
+            batch.pending.discard(room_id)
+            batch.touch()
+
+    def add(self, uuid: str, room_id: str, suggestion: Dict[str, Any]) -> None:
+        """
+        Fold a room's suggestion into the batch totals.
+
+        A room reported twice (e.g. redelivered after a retry) replaces its
+        previous contribution instead of being counted again.
+        """
+        batch = self._batch(uuid)
+        previous = batch.rooms.get(room_id)
+        # Statistics come as {item: count} mappings, or plain lists of items.
+        counts = {name: dict(Counter(suggestion.get(name) or {})) for name in STATISTICS}
+        for name in STATISTICS:
+            if previous is not None:
+                batch.totals[name].subtract(previous[name])
+            batch.totals[name].update(counts[name])
+
+        batch.rooms[room_id] = {
+            "room_id": room_id,
+            "room_name_suggested": suggestion.get("room_name_suggested"),
+            "topics_suggested": suggestion.get("topics") or [],
+            "justification": suggestion.get("justification"),
+            "main_topics": suggestion.get("main_topic") or [],
+            **counts,
+        }
+        batch.touch()
+
+    async def wait_for_rooms(self, uuid: str, timeout: float, exclude: Optional[str] = None) -> int:
+        """
+        Wait until every registered room of the batch (but `exclude`) is settled.
+
+        Returns:
+            Number of rooms still pending when the timeout expired.
+        """
+        batch = self._batches.get(uuid)
+        if batch is None:
+            return 0
+
+        deadline = time.monotonic() + timeout
+        while batch.pending - {exclude}:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            batch.changed.clear()
+            try:
+                await asyncio.wait_for(batch.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        missing = len(batch.pending - {exclude})
+        if missing:
+            logger.warning(f"Finalizing room-suggestion batch {uuid} with {missing} rooms still pending.")
+        return missing
+
+    def summary(self, uuid: str, top: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        Return the batch's room summaries and top statistics, or None if no
+        room of the batch completed in this process.
+        """
+        batch = self._batches.get(uuid)
+        if batch is None or not batch.rooms:
+            return None
+        return {
+            "rooms": list(batch.rooms.values()),
+            **{
+                name: {key: count for key, count in batch.totals[name].most_common(top) if count > 0}
+                for name in STATISTICS
+            },
+        }
+
+    def discard(self, uuid: str) -> None:
+        """Forget a finalized batch."""
+        self._batches.pop(uuid, None)
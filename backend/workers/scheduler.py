@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+Job = Callable[[], Awaitable]
+
+
+class KeyedScheduler:
+    """
+    Runs jobs serially per key while different keys run in parallel.
+
+    Every key (e.g. a ``room_id``) owns a FIFO queue drained by a single
+    task, so jobs for the same key always complete in submission order.
+    The number of keys executing a job at the same time is capped by
+    ``max_keys_in_flight``; keys waiting for a slot do not block the
+    caller, they simply queue up.
+
+    Ordering only covers the jobs submitted to one scheduler, i.e. the
+    messages one process fetched. The consumer relies on producers keying
+    each room's requests to one partition (see
+    ``services.kafka_producer.message_key``), so a room is only ever
+    consumed by one process, in production order, whatever
+    ``CONSUMER_PROCESSES`` is. A message coming back from a retry topic
+    is produced again behind the room's newer requests and runs after them.
+    """
+
+    def __init__(
+        self,
+        max_keys_in_flight: int,
+        min_interval: float = 0.0,
+        gate: Optional[Callable[[], AbstractAsyncContextManager]] = None,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_keys_in_flight: Maximum number of keys running a job at once.
+            min_interval: Minimum delay in seconds between two consecutive
+                jobs of the same key. The delay is spent outside the
+                in-flight slot, so pacing one key never blocks the others.
+            gate: Optional factory of an async context manager entered
+                around every job once a slot is held, used to share a
+                capacity between several schedulers.
+        """
+        if max_keys_in_flight < 1:
+            raise ValueError("max_keys_in_flight must be at least 1")
+
+        self.max_keys_in_flight = max_keys_in_flight
+        self.min_interval = min_interval
+        self.gate = gate
+        self._slots = asyncio.Semaphore(max_keys_in_flight)
+        self._queues: Dict[str, Deque[Tuple[Job, asyncio.Future]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently executing."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting in the per-key queues."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def active_keys(self) -> int:
+        """Number of keys that have queued or running work."""
+        return len(self._workers)
+
+    def submit(self, key: str, job: Job) -> asyncio.Future:
+        """
+        Queue a job for the given key.
+
+        Args:
+            key: Ordering key. Jobs sharing a key run one after another.
+            job: Zero-argument callable returning an awaitable.
+
+        Returns:
+            A future resolved with the job's result (or exception).
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(key, deque())
+        queue.append((job, future))
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+
+        return future
+
+    async def _drain(self, key: str) -> None:
+        """Execute the queued jobs of a key until its queue is empty."""
+        queue = self._queues[key]
+        try:
+            while queue:
+                job, future = queue.popleft()
+                if future.cancelled():
+                    continue
+
+                async with self._slots, self._enter_gate():
+                    self._running += 1
+                    try:
+                        result = await job()
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                    finally:
+                        self._running -= 1
+
+                if self.min_interval > 0:
+                    await asyncio.sleep(self.min_interval)
+        finally:
+            for _, future in queue:
+                future.cancel()
+            self._queues.pop(key, None)
+            self._workers.pop(key, None)
+
+    def _enter_gate(self) -> AbstractAsyncContextManager:
+        return self.gate() if self.gate else nullcontext()
+
+    async def join(self) -> None:
+        """Wait until every queued and running job has finished."""
+        while self._workers:
+            await asyncio.gather(
+                *list(self._workers.values()), return_exceptions=True
+            )
+
+    async def cancel(self) -> None:
+        """Cancel every running and queued job."""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
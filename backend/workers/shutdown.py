@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Dict, List
+
+from aiokafka import TopicPartition
+
+from core.logging_config import get_logger
+from workers.offsets import OffsetTracker
+
+logger = get_logger(__name__)
+
+
+async def drain_tasks(tasks: Dict[asyncio.Task, Any], timeout: float) -> List[Any]:
+    """
+    Wait for in-flight message tasks until `timeout`, then cancel the rest.
+
+    Args:
+        tasks: Pending tasks mapped to the message each one processes.
+        timeout: Seconds to wait for the tasks to finish on their own.
+
+    Returns:
+        The messages whose processing did not finish.
+    """
+    pending = set(tasks)
+    if pending:
+        logger.info(f"Draining {len(pending)} in-flight messages for up to {timeout}s...")
+        _, pending = await asyncio.wait(pending, timeout=timeout)
+
+    unfinished = [tasks[task] for task in pending]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    if unfinished:
+        logger.warning(f"{len(unfinished)} messages did not finish before the drain deadline.")
+    return unfinished
+
+
+async def spool_messages(producer: Any, messages: List[Any], tracker: OffsetTracker) -> int:
+    """
+    Re-publish unfinished messages to their topic so they are replayed.
+
+    Once a copy is safely in Kafka, the original offset is marked complete,
+    so the final commit can move past it and the messages that did finish
+    after it are not processed again by the next owner of the partition.
+    Messages that cannot be spooled keep their offset pending and are simply
+    redelivered from the last commit.
+
+    Returns:
+        Number of messages spooled.
+    """
+    spooled = 0
+    for msg in messages:
+        try:
+            await producer.send_and_wait(msg.topic, msg.value, key=msg.key, headers=list(msg.headers or ()))
+        except Exception as e:
+            logger.error(f"Could not spool message at {msg.topic}[{msg.partition}]@{msg.offset}: {e}")
+            continue
+        tracker.complete(TopicPartition(msg.topic, msg.partition), msg.offset)
+        spooled += 1
+
+    if messages:
+        logger.info(f"Spooled {spooled}/{len(messages)} unfinished messages for replay.")
+    return spooled
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+import aiohttp
+
+from conf import settings
+from core.logging_config import get_logger
+from utils import serialization
+from workers.metrics import WEBHOOK_DELIVERIES, WEBHOOK_SECONDS
+from workers.scheduler import KeyedScheduler
+
+logger = get_logger(__name__)
+
+
+def create_webhook_session() -> aiohttp.ClientSession:
+    """
+    Creates the connection-pooled HTTP session shared by every webhook call.
+    """
+    connector = aiohttp.TCPConnector(limit=settings.WEBHOOK_MAX_CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=settings.WEBHOOK_TIMEOUT_SECONDS)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        json_serialize=serialization.dumps_str,
+    )
+
+
+class WebhookDispatcher:
+    """
+    Asynchronous delivery stage for webhook payloads.
+
+    Payloads queued with `enqueue` are delivered in order per room, waiting
+    `min_interval` seconds between two messages of the same room. The wait
+    is an `asyncio.sleep` on the room's own delivery task, so pacing never
+    blocks the event loop nor the workflows of other rooms.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        min_interval: float = settings.WEBHOOK_MESSAGE_INTERVAL_SECONDS,
+        max_retries: int = settings.WEBHOOK_MAX_RETRIES,
+        retry_backoff: float = settings.WEBHOOK_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        """
+        Initialize the dispatcher.
+
+        Args:
+            session: Shared aiohttp session used for every request.
+            min_interval: Seconds to wait between messages of the same room.
+            max_retries: Attempts per payload before giving up.
+            retry_backoff: Base delay in seconds, doubled after each failure.
+        """
+        self.session = session
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._scheduler = KeyedScheduler(
+            settings.WEBHOOK_MAX_CONNECTIONS, min_interval=min_interval
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of payloads queued or being delivered."""
+        return self._scheduler.queued + self._scheduler.running
+
+    def enqueue(self, room_id: str, url: str, payload: Dict[str, Any], uuid: str) -> asyncio.Future:
+        """
+        Queue a payload for paced delivery to the room's webhook.
+
+        Returns:
+            A future resolved with True when the webhook accepted the payload.
+        """
+        return self._scheduler.submit(
+            room_id, lambda: self.send(url, payload, uuid)
+        )
+
+    async def send(self, url: str, payload: Dict[str, Any], uuid: str) -> bool:
+        """
+        Send a payload right away, retrying with exponential backoff.
+
+        Returns:
+            True if the webhook answered 200, False once retries are exhausted.
+        """
+        headers = {
+            "Authorization": f"Bearer {settings.WEBHOOK_BEARER_TOKEN}",
+            "Content-Type": "application/json"
+        }
+
+        for attempt in range(self.max_retries):
+            started = time.monotonic()
+            try:
+                async with self.session.post(url, json=payload, headers=headers) as resp:
+                    WEBHOOK_SECONDS.labels(str(resp.status)).observe(time.monotonic() - started)
+                    if resp.status == 200:
+                        logger.info(f"Webhook sent successfully for {uuid}")
+                        WEBHOOK_DELIVERIES.labels("delivered").inc()
+                        return True
+                    error_text = await resp.text()
+                    logger.warning(f"Webhook failed for {uuid} (attempt {attempt + 1}/{self.max_retries}): {resp.status} - {error_text}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                WEBHOOK_SECONDS.labels("error").observe(time.monotonic() - started)
+                logger.warning(f"Webhook request error for {uuid} (attempt {attempt + 1}/{self.max_retries}): {e}")
+
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+        logger.error(f"Webhook for {uuid} failed after {self.max_retries} attempts.")
+        WEBHOOK_DELIVERIES.labels("failed").inc()
+        return False
+
+    async def join(self) -> None:
+        """Wait until every queued payload has been delivered."""
+        await self._scheduler.join()
+
+    async def cancel(self) -> None:
+        """Drop every queued payload and abort the deliveries in progress."""
+        await self._scheduler.cancel()
@@ -2,7 +2,7 @@
 set -e
 
 echo "Starting Kafka consumer..."
-python backend/workers/agent_consumer.py &
+python backend/workers/consumer_pool.py &
 KAFKA_PID=$!
 
 echo "Starting Uvicorn server with ${UVICORN_WORKERS:-2} workers..."